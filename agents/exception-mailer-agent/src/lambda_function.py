@@ -1,19 +1,27 @@
 import os
 import mysql.connector
 import smtplib
+from connection_manager import ConnectionManager
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 
+# --- DB CONNECTION (reused across warm invocations) ---
+def connect():
+    return mysql.connector.connect(
+        host=os.environ['DB_HOST'],
+        user=os.environ['DB_USER'],
+        password=os.environ['DB_PASSWORD'],
+        database=os.environ['DB_NAME'],
+        port=int(os.environ.get('DB_PORT', 3306))
+    )
+
+connections = ConnectionManager(connect)
+
 # --- FETCH TRADES FROM DB ---
 def fetch_trades():
+    conn = None
     try:
-        conn = mysql.connector.connect(
-            host=os.environ['DB_HOST'],
-            user=os.environ['DB_USER'],
-            password=os.environ['DB_PASSWORD'],
-            database=os.environ['DB_NAME'],
-            port=int(os.environ.get('DB_PORT', 3306))
-        )
+        conn = connections.acquire()
         cursor = conn.cursor(dictionary=True)
 
         query = "SELECT trade_id, errors, check_timestamp FROM trade_log;"
@@ -21,11 +29,13 @@ def fetch_trades():
         results = cursor.fetchall()
 
         cursor.close()
-        conn.close()
         return results
     except mysql.connector.Error as err:
         print(f"❌ Database error: {err}")
         return []
+    finally:
+        if conn:
+            connections.release(conn)
 
 # --- SEND EMAIL NOTIFICATION ---
 def send_email(trades):
@@ -0,0 +1,421 @@
+import argparse
+import collections
+import importlib.util
+import json
+import os
+import resource
+import sys
+import tempfile
+import time
+import types
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+# Run the Step Functions pipeline in-process against a local MySQL.
+#
+# Each agent's lambda_handler is imported from its src/ directory and invoked
+# in step-function.json order, feeding each stage's return value to the next
+# stage as its event, exactly like the state machine does. Per stage we record
+# wall time, rows read/written, DB round trips and peak RSS.
+#
+#   python agents/local_runner.py --init-schema --db-user root --db-name trades_market
+
+AGENTS_DIR = os.path.dirname(os.path.abspath(__file__))
+STEP_FUNCTION_PATH = os.path.join(AGENTS_DIR, 'step-function.json')
+
+Stage = collections.namedtuple('Stage', 'name function_name timeout_seconds handler_file partitioned')
+
+# --fused replaces these stages with verification-agent's fused_pipeline handler
+FUSED_FUNCTIONS = ('verification-agent', 'trade-matching-agent', 'reconciliation-agent', 'settlement-agent')
+FUSED_STAGE = Stage('Fused-Pipeline', 'verification-agent', 300, 'fused_pipeline', True)
+
+# Schema DDL and indexes live in data-ingestion's versioned migrations
+MIGRATIONS_PATH = os.path.join(os.path.dirname(AGENTS_DIR), 'data-ingestion', 'migrations.py')
+
+
+class StageStats:
+    """Counters the driver hooks below add to while a stage is running."""
+
+    def __init__(self):
+        self.round_trips = 0
+        self.rows_read = 0
+        self.rows_written = 0
+
+
+current_stats = StageStats()
+drivers_instrumented = False
+handler_modules = {}
+
+
+class LocalLambdaContext:
+    """Just enough of the Lambda context object for the agents."""
+
+    def __init__(self, function_name, timeout_seconds):
+        self.function_name = function_name
+        self.function_version = '$LATEST'
+        self.invoked_function_arn = f'arn:aws:lambda:local:000000000000:function:{function_name}'
+        self.memory_limit_in_mb = 128
+        self.aws_request_id = str(uuid.uuid4())
+        self.log_group_name = f'/aws/lambda/{function_name}'
+        self.log_stream_name = 'local'
+        self._deadline = time.monotonic() + timeout_seconds
+
+    def get_remaining_time_in_millis(self):
+        return max(0, int((self._deadline - time.monotonic()) * 1000))
+
+
+class DryRunSMTP:
+    """Stands in for smtplib.SMTP so the mailer stage runs without sending mail."""
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def starttls(self):
+        pass
+
+    def login(self, user, password):
+        pass
+
+    def send_message(self, msg):
+        print(f"[dry-run] would send '{msg['Subject']}' to {msg['To']} via {self.host}:{self.port}")
+
+
+def task_function_name(state):
+    arn = state['Arguments']['FunctionName']
+    # arn:aws:lambda:<region>:<account>:function:<name>[:<qualifier>]
+    return arn.split(':function:', 1)[1].split(':', 1)[0]
+
+
+def load_stages(path=STEP_FUNCTION_PATH):
+    """Return the Task and Map states as Stages in execution order.
+
+    A Map state becomes one partitioned stage running the Task it wraps;
+    Pass states are skipped.
+    """
+    with open(path) as f:
+        definition = json.load(f)
+    states = definition['States']
+    stages = []
+    name = definition['StartAt']
+    while name:
+        state = states[name]
+        if state['Type'] == 'Task':
+            stages.append(Stage(name, task_function_name(state), state.get('TimeoutSeconds', 60),
+                                'lambda_function', False))
+        elif state['Type'] == 'Map':
+            processor = state['ItemProcessor']
+            task = processor['States'][processor['StartAt']]
+            stages.append(Stage(name, task_function_name(task), task.get('TimeoutSeconds', 60),
+                                'lambda_function', True))
+        name = None if state.get('End') else state.get('Next')
+    return stages
+
+
+def fuse_stages(stages):
+    """Swap the four per-stage agents for the single fused handler."""
+    fused = [stage for stage in stages if stage.function_name not in FUSED_FUNCTIONS]
+    return [FUSED_STAGE] + fused
+
+
+def load_handler_module(function_name, handler_file='lambda_function'):
+    """Import agents/<function_name>/src/<handler_file>.py under a unique module name.
+
+    Modules are cached, so repeated pipeline runs in one process behave like
+    warm Lambda invocations.
+    """
+    module_name = function_name.replace('-', '_') + '_' + handler_file
+    if module_name in handler_modules:
+        return handler_modules[module_name]
+    src_dir = os.path.join(AGENTS_DIR, function_name, 'src')
+    if src_dir not in sys.path:
+        sys.path.insert(0, src_dir)
+    if handler_file != 'lambda_function':
+        # Extra handlers import their agent's lambda_function by its plain name
+        sys.modules['lambda_function'] = load_handler_module(function_name)
+    spec = importlib.util.spec_from_file_location(module_name, os.path.join(src_dir, handler_file + '.py'))
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[module_name] = module
+    spec.loader.exec_module(module)
+    handler_modules[module_name] = module
+    return module
+
+
+def localize(module, send_email):
+    """Point AWS/SMTP side effects of an agent module at local equivalents."""
+    if hasattr(module, 'load_json_from_s3'):
+        def load_json_locally(key):
+            with open(os.path.join(AGENTS_DIR, key)) as f:
+                return json.load(f)
+        module.load_json_from_s3 = load_json_locally
+    if hasattr(module, 'smtplib') and not send_email:
+        module.smtplib = types.SimpleNamespace(SMTP=DryRunSMTP, SMTPException=module.smtplib.SMTPException)
+
+
+def instrument_drivers():
+    """Count round trips and rows on both drivers the agents use."""
+    global drivers_instrumented
+    if drivers_instrumented:
+        return
+    drivers_instrumented = True
+    import pymysql.connections
+
+    conn_cls = pymysql.connections.Connection
+    execute_command = conn_cls._execute_command
+    read_query_result = conn_cls._read_query_result
+
+    def counted_execute_command(self, command, sql):
+        current_stats.round_trips += 1
+        return execute_command(self, command, sql)
+
+    def counted_read_query_result(self, *args, **kwargs):
+        affected = read_query_result(self, *args, **kwargs)
+        result = self._result
+        if result is not None and result.description is not None:
+            current_stats.rows_read += len(result.rows or ())
+        else:
+            current_stats.rows_written += affected or 0
+        return affected
+
+    conn_cls._execute_command = counted_execute_command
+    conn_cls._read_query_result = counted_read_query_result
+
+    try:
+        import mysql.connector.connection
+    except ImportError:
+        return
+    conn_cls = mysql.connector.connection.MySQLConnection
+    send_cmd = conn_cls._send_cmd
+    get_rows = conn_cls.get_rows
+    cmd_query = conn_cls.cmd_query
+
+    def counted_send_cmd(self, *args, **kwargs):
+        current_stats.round_trips += 1
+        return send_cmd(self, *args, **kwargs)
+
+    def counted_get_rows(self, *args, **kwargs):
+        rows, eof = get_rows(self, *args, **kwargs)
+        current_stats.rows_read += len(rows)
+        return rows, eof
+
+    def counted_cmd_query(self, *args, **kwargs):
+        result = cmd_query(self, *args, **kwargs)
+        if isinstance(result, dict) and 'affected_rows' in result:
+            current_stats.rows_written += result['affected_rows'] or 0
+        return result
+
+    conn_cls._send_cmd = counted_send_cmd
+    conn_cls.get_rows = counted_get_rows
+    conn_cls.cmd_query = counted_cmd_query
+
+
+def reset_peak_rss():
+    """Reset the kernel's RSS high-water mark so it covers a single stage (Linux only)."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KB on Linux and bytes on macOS; process lifetime peak
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return maxrss / (1024 * 1024) if sys.platform == 'darwin' else maxrss / 1024
+
+
+def invoke(stage, module, event):
+    """Call one agent handler and return (result, error)."""
+    context = LocalLambdaContext(stage.function_name, stage.timeout_seconds)
+    try:
+        result = module.lambda_handler(event, context)
+    except Exception as e:
+        return None, f"{type(e).__name__}: {e}"
+    status_code = result.get('statusCode') if isinstance(result, dict) else None
+    if status_code not in (None, 200):
+        return result, result.get('body')
+    return result, None
+
+
+def invoke_partitions(stage, module, event, buckets):
+    """Run every hash bucket of a Map stage concurrently, like the state machine's Map does.
+
+    Returns a merged result shaped like the Map state's output: the summed
+    partition summaries, plus each partition's handoff for the next Map
+    stage. The driver counters are shared by all partitions.
+    """
+    events = event.get('partitions') if isinstance(event, dict) else None
+    if not events or len(events) != buckets:
+        events = [{'partition': {'bucket': k, 'buckets': buckets}, 'handoff': None} for k in range(buckets)]
+    with ThreadPoolExecutor(max_workers=buckets) as pool:
+        outcomes = list(pool.map(lambda partition_event: invoke(stage, module, partition_event), events))
+
+    summary = {}
+    for result, _ in outcomes:
+        for key, value in ((result or {}).get('summary') or {}).items():
+            summary[key] = summary.get(key, 0) + value
+    partitions = [
+        {'partition': partition_event['partition'], 'handoff': (result or {}).get('handoff')}
+        for partition_event, (result, _) in zip(events, outcomes)
+    ]
+    errors = [error for _, error in outcomes if error]
+    return ({'statusCode': 500 if errors else 200, 'summary': summary, 'partitions': partitions},
+            '; '.join(errors) or None)
+
+
+def run_stage(stage, module, event, buckets=1):
+    """Invoke one agent (or each of its partitions) and return (result, timing record)."""
+    global current_stats
+    current_stats = StageStats()
+    rss_is_per_stage = reset_peak_rss()
+
+    start = time.perf_counter()
+    if stage.partitioned and buckets > 1:
+        result, error = invoke_partitions(stage, module, event, buckets)
+    else:
+        result, error = invoke(stage, module, event)
+    wall_time = time.perf_counter() - start
+
+    status_code = result.get('statusCode') if isinstance(result, dict) else None
+    # Cumulative counters of the agent's pymysql ConnectionPool, if it has one
+    pool = getattr(module, 'connections', None)
+    return result, {
+        'stage': stage.name,
+        'function': stage.function_name,
+        'wall_time_s': round(wall_time, 4),
+        'rows_read': current_stats.rows_read,
+        'rows_written': current_stats.rows_written,
+        'rows_processed': current_stats.rows_read + current_stats.rows_written,
+        'db_round_trips': current_stats.round_trips,
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+        'peak_rss_scope': 'stage' if rss_is_per_stage else 'process',
+        'status_code': status_code,
+        'partitions': buckets if stage.partitioned else 1,
+        'timed_out': wall_time > stage.timeout_seconds,
+        'db_pool': pool.stats() if hasattr(pool, 'stats') else None,
+        'error': error,
+    }
+
+
+def configure_environment(args):
+    """Export the DB/SMTP settings the agents read at import time."""
+    os.environ['DB_HOST'] = args.db_host
+    os.environ['DB_PORT'] = str(args.db_port)
+    os.environ['DB_USER'] = args.db_user
+    os.environ['DB_PASSWORD'] = args.db_password
+    os.environ['DB_NAME'] = args.db_name
+    for key, default in (('SENDER_EMAIL', 'pipeline@localhost'),
+                         ('RECEIVER_EMAIL', 'ops@localhost'),
+                         ('EMAIL_PASSWORD', ''),
+                         ('HANDOFF_DIR', os.path.join(tempfile.gettempdir(), 'trade-handoff'))):
+        os.environ.setdefault(key, default)
+
+
+def load_migrations():
+    # Loaded by path: data-ingestion/ also has a lambda_function module
+    spec = importlib.util.spec_from_file_location('migrations', MIGRATIONS_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def init_schema(args):
+    migrations = load_migrations()
+    conn = migrations.connect(args.db_host, args.db_port, args.db_user, args.db_password, args.db_name)
+    try:
+        applied = migrations.migrate(conn)
+        if applied:
+            print(f"Applied schema migrations {applied}")
+    finally:
+        conn.close()
+
+
+def verify_indexes(args):
+    """EXPLAIN the agents' access paths; see data-ingestion/migrations.py."""
+    migrations = load_migrations()
+    conn = migrations.connect(args.db_host, args.db_port, args.db_user, args.db_password, args.db_name)
+    try:
+        checks = migrations.verify_indexes(conn)
+    finally:
+        conn.close()
+    for check in checks:
+        if not check['ok']:
+            print(f"WARNING: {check['access_path']} uses {check['key']} instead of {check['expected_index']}")
+    return checks
+
+
+def run_pipeline(args, event=None):
+    """Run every stage in order and return the per-stage timing records."""
+    configure_environment(args)
+    stages = load_stages(args.step_function)
+    if args.fused:
+        stages = fuse_stages(stages)
+    modules = {}
+    for stage in stages:
+        modules[stage.name] = load_handler_module(stage.function_name, stage.handler_file)
+        localize(modules[stage.name], args.send_email)
+    instrument_drivers()
+    if args.init_schema:
+        init_schema(args)
+
+    timings = []
+    event = event if event is not None else {}
+    for stage in stages:
+        result, timing = run_stage(stage, modules[stage.name], event, args.buckets)
+        timings.append(timing)
+        print(f"{stage.name:<24} {timing['wall_time_s']:>9.3f}s  rows={timing['rows_processed']:<8} "
+              f"round_trips={timing['db_round_trips']:<8} peak_rss={timing['peak_rss_mb']}MB"
+              + (f"  ERROR: {timing['error']}" if timing['error'] else ''))
+        if timing['error'] and args.stop_on_error:
+            break
+        event = result if result is not None else {}
+    return timings
+
+
+def build_arg_parser():
+    parser = argparse.ArgumentParser(description='Run the trade pipeline locally with per-stage timings.')
+    parser.add_argument('--db-host', default=os.environ.get('DB_HOST', '127.0.0.1'))
+    parser.add_argument('--db-port', type=int, default=int(os.environ.get('DB_PORT', 3306)))
+    parser.add_argument('--db-user', default=os.environ.get('DB_USER', 'root'))
+    parser.add_argument('--db-password', default=os.environ.get('DB_PASSWORD', ''))
+    parser.add_argument('--db-name', default=os.environ.get('DB_NAME', 'trades_market'))
+    parser.add_argument('--step-function', default=STEP_FUNCTION_PATH)
+    parser.add_argument('--init-schema', action='store_true',
+                        help='apply pending schema migrations (tables and indexes) first')
+    parser.add_argument('--send-email', action='store_true',
+                        help='let the mailer really send mail (dry run by default)')
+    parser.add_argument('--stop-on-error', action='store_true')
+    parser.add_argument('--fused', action='store_true',
+                        help='run verify/match/reconcile/settle as one fused stage')
+    parser.add_argument('--buckets', type=int, default=1,
+                        help='hash partitions to fan each Map stage out over')
+    parser.add_argument('--event', default='{}', help='JSON event for the first stage')
+    parser.add_argument('--output', help='write the timings as JSON to this file')
+    return parser
+
+
+def main(argv=None):
+    args = build_arg_parser().parse_args(argv)
+    timings = run_pipeline(args, json.loads(args.event))
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(timings, f, indent=2)
+    return 1 if any(t['error'] for t in timings) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,212 @@
+import gzip
+import json
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import pymysql
+from pymysql.pool import ConnectionPool
+
+# trade_log compaction and cold archival.
+#
+# trade_log is append-only and scanned in full by the mailer and the chatbot
+# reports. This job walks it in primary-key order and, for every entry older
+# than the retention window:
+#   1. writes the raw rows, per day, to a gzip'd columnar JSON file in
+#      ARCHIVE_BUCKET (S3) or ARCHIVE_DIR (local disk, for tests and local runs),
+#   2. adds them to per-day, per-status summary rows in trade_log_daily,
+#   3. deletes them from trade_log, in the same transaction as step 2.
+# Each batch is archived before its transaction commits, so a failed batch is
+# simply redone on the next run: archival is at-least-once (the id column
+# identifies duplicates), the rollup and delete are exactly-once.
+#
+# Archive layout: trade_log/day=YYYY-MM-DD/part-<first id>-<last id>.json.gz
+#   {"table": "trade_log", "day": ..., "rows": n, "columns": {"id": [...], "trade_id": [...], ...}}
+#
+# The files are column-oriented gzip'd JSON rather than Parquet: writing
+# Parquet needs pyarrow, which alone is most of the 250MB unzipped Lambda
+# package limit, while the agents ship with vendored pure-Python
+# dependencies only. Per-column arrays still compress well and load straight
+# into a DataFrame (pandas.DataFrame(payload["columns"])).
+#
+# Entries with a NULL check_timestamp can't be aged, so they are skipped and
+# left in trade_log.
+#
+# trade_log_daily is created by data-ingestion/migrations.py (migration 5).
+
+db_host = os.environ.get("DB_HOST")
+db_user = os.environ.get("DB_USER")
+db_password = os.environ.get("DB_PASSWORD")
+db_name = os.environ.get("DB_NAME")
+db_port = int(os.environ.get("DB_PORT", "3306"))
+
+ARCHIVE_BUCKET = os.environ.get("ARCHIVE_BUCKET")
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR")
+RETENTION_DAYS = int(os.environ.get("RETENTION_DAYS", "30"))
+BATCH_ROWS = int(os.environ.get("ARCHIVE_BATCH_ROWS", "20000"))
+# Stop taking new batches when less than this much Lambda time is left
+TIME_MARGIN_MS = int(os.environ.get("MAINTENANCE_TIME_MARGIN_MS", "15000"))
+
+ARCHIVE_COLUMNS = ("id", "trade_id", "status", "errors", "check_timestamp")
+
+UPSERT_DAILY = """
+    INSERT INTO trade_log_daily (day, status, entries, error_entries, first_check, last_check)
+    VALUES (%s, %s, %s, %s, %s, %s)
+    ON DUPLICATE KEY UPDATE
+        entries = entries + VALUES(entries),
+        error_entries = error_entries + VALUES(error_entries),
+        first_check = LEAST(first_check, VALUES(first_check)),
+        last_check = GREATEST(last_check, VALUES(last_check))
+"""
+
+s3 = None
+
+
+def connect():
+    return pymysql.connect(
+        host=db_host,
+        user=db_user,
+        passwd=db_password,
+        db=db_name,
+        port=db_port,
+        autocommit=False
+    )
+
+# Reused across warm invocations
+connections = ConnectionPool(connect)
+
+
+def has_errors(errors):
+    # Agents log '[]' (or NULL) when a check passed
+    return bool(errors) and errors not in ("[]", "null")
+
+
+def write_archive(key, payload):
+    """Store one gzip'd archive file and return where it went."""
+    global s3
+    body = gzip.compress(json.dumps(payload, default=str).encode("utf-8"))
+    if ARCHIVE_BUCKET:
+        if s3 is None:
+            import boto3
+            s3 = boto3.client("s3")
+        s3.put_object(Bucket=ARCHIVE_BUCKET, Key=key, Body=body, ContentType="application/json",
+                      ContentEncoding="gzip")
+        return f"s3://{ARCHIVE_BUCKET}/{key}"
+
+    path = os.path.join(ARCHIVE_DIR, key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(body)
+    return path
+
+
+def archive_day(day, rows):
+    columns = {name: [row[i] for row in rows] for i, name in enumerate(ARCHIVE_COLUMNS)}
+    key = f"trade_log/day={day.isoformat()}/part-{rows[0][0]}-{rows[-1][0]}.json.gz"
+    return write_archive(key, {"table": "trade_log", "day": day.isoformat(), "rows": len(rows),
+                               "columns": columns})
+
+
+def rollup(rows):
+    """Per-(day, status) summary rows for UPSERT_DAILY."""
+    summary = defaultdict(lambda: [0, 0, None, None])
+    for _, _, status, errors, checked in rows:
+        entry = summary[(checked.date(), status or "")]
+        entry[0] += 1
+        entry[1] += has_errors(errors)
+        entry[2] = checked if entry[2] is None else min(entry[2], checked)
+        entry[3] = checked if entry[3] is None else max(entry[3], checked)
+    return [(day, status, *values) for (day, status), values in summary.items()]
+
+
+def compact_batch(cursor, after_id, cutoff):
+    """Archive, roll up and delete the next batch of expired entries.
+
+    Returns (last id handled, entries compacted, archive files, reached_cutoff).
+    """
+    cursor.execute(
+        "SELECT id, trade_id, status, errors, check_timestamp FROM trade_log WHERE id > %s ORDER BY id LIMIT %s",
+        (after_id, BATCH_ROWS))
+    rows = cursor.fetchall()
+
+    # Ids follow insertion order, so stop at the first entry inside the window
+    expired = []
+    last_id = after_id
+    reached_cutoff = len(rows) < BATCH_ROWS
+    for row in rows:
+        if row[4] is not None and row[4] >= cutoff:
+            reached_cutoff = True
+            break
+        last_id = row[0]
+        if row[4] is not None:
+            expired.append(row)
+    if not expired:
+        return last_id, 0, [], reached_cutoff
+
+    by_day = defaultdict(list)
+    for row in expired:
+        by_day[row[4].date()].append(row)
+    files = [archive_day(day, day_rows) for day, day_rows in sorted(by_day.items())]
+
+    cursor.executemany(UPSERT_DAILY, rollup(expired))
+    # Every id in this range was in the batch, so the range delete removes exactly
+    # those rows, less the NULL check_timestamp ones skipped above
+    cursor.execute("DELETE FROM trade_log WHERE id BETWEEN %s AND %s AND check_timestamp IS NOT NULL",
+                   (expired[0][0], expired[-1][0]))
+    return last_id, len(expired), files, reached_cutoff
+
+
+def lambda_handler(event, context):
+    event = event or {}
+    conn = None
+    cursor = None
+
+    try:
+        if not ARCHIVE_BUCKET and not ARCHIVE_DIR:
+            raise RuntimeError("Set ARCHIVE_BUCKET or ARCHIVE_DIR; refusing to delete entries without archiving them")
+
+        retention_days = int(event.get("retention_days", RETENTION_DAYS))
+        cutoff = datetime.combine(datetime.utcnow().date() - timedelta(days=retention_days), datetime.min.time())
+
+        conn = connections.acquire()
+        cursor = conn.cursor()
+
+        last_id, compacted, files, batches = 0, 0, [], 0
+        while True:
+            last_id, count, batch_files, reached_cutoff = compact_batch(cursor, last_id, cutoff)
+            conn.commit()
+            if count:
+                batches += 1
+                compacted += count
+                files.extend(batch_files)
+            if reached_cutoff:
+                break
+            if context is not None and context.get_remaining_time_in_millis() < TIME_MARGIN_MS:
+                break
+
+        return {
+            "statusCode": 200,
+            "body": json.dumps({
+                "cutoff": cutoff.isoformat(),
+                "entries_compacted": compacted,
+                "batches": batches,
+                "archive_files": files
+            }),
+            "headers": {"Content-Type": "application/json"}
+        }
+
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        print(f"Error compacting trade_log: {e}")
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"error": str(e)}),
+            "headers": {"Content-Type": "application/json"}
+        }
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            connections.release(conn)
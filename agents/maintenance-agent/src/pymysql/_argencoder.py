@@ -0,0 +1,148 @@
+"""
+Generated argument encoders for Cursor.executemany
+"""
+
+import datetime
+
+from . import converters as _converters
+from .constants import SERVER_STATUS
+
+
+DEBUG = False
+# Encoders are cached by template and plan; cleared when it grows past this
+CACHE_SIZE = 256
+
+_cache = {}
+
+
+def make_values_encoder(values, first, conn, fallback):
+    """Return an encode(args) function formatting the VALUES template `values`
+    with the escaped `args`, as ``values % cursor._escape_args(args, conn)``.
+
+    The plan is taken once from `first`, the first argument set: its shape
+    (tuple, list, or dict and its keys) and one encoder per column, picked
+    for the type of the value in that column the way conn.literal() would
+    pick it. The generated function unpacks an argument set and escapes
+    each value with its column's encoder inline, without the per-value
+    lookups in the encoders mapping. A value of any other type goes through
+    conn.literal(), and an argument set of another shape, or one that
+    raises, through fallback(args), so the results and the exceptions are
+    the same as without a plan. `fallback` itself is returned when `first`
+    isn't a tuple, list or dict.
+    """
+    shape = type(first)
+    if shape is dict:
+        keys = tuple(first)
+        if not all(type(key) is str for key in keys):
+            return fallback
+        row = first.values()
+    elif shape is tuple or shape is list:
+        keys = None
+        row = first
+    else:
+        return fallback
+
+    mapping = conn.encoders
+    backslash_escapes = not (
+        conn.server_status & SERVER_STATUS.SERVER_STATUS_NO_BACKSLASH_ESCAPES
+    )
+    columns = tuple(_column(value, mapping, backslash_escapes) for value in row)
+    key = (values, shape, keys, columns)
+    try:
+        bind = _cache.get(key)
+    except TypeError:  # unhashable custom encoder
+        bind = _build(*key)
+    else:
+        if bind is None:
+            if len(_cache) >= CACHE_SIZE:
+                _cache.clear()
+            bind = _cache[key] = _build(*key)
+    return bind(conn.literal, mapping, fallback)
+
+
+def _column(value, mapping, backslash_escapes):
+    """(type, kind, encoder) for a column whose first value is `value`."""
+    t = type(value)
+    if t is str:
+        # Connection.escape() quotes strings itself, whatever the mapping says
+        return t, ("str" if backslash_escapes else "literal"), None
+    if t is bytes or t is bytearray:
+        return t, "literal", None
+    encoder = mapping.get(t) or mapping.get(str)
+    if encoder is None or encoder in (_converters.escape_dict, _converters.escape_sequence):
+        return t, "literal", None
+    if value is None and encoder is _converters.escape_None:
+        return t, "none", None
+    if t is int and encoder is _converters.escape_int:
+        return t, "int", None
+    # isoformat() writes what escape_date/escape_datetime format, only faster
+    if t is datetime.date and encoder is _converters.escape_date:
+        return t, "date", None
+    if t is datetime.datetime and encoder is _converters.escape_datetime:
+        return t, "datetime", None
+    return t, "call", encoder
+
+
+def _build(values, shape, keys, columns):
+    namespace = {
+        "_values": values,
+        "_shape": shape,
+        "_table": _converters._escape_table,
+    }
+    lines = [
+        "def bind(_literal, _mapping, _fallback):",
+        "    def encode(row):",
+        "        if type(row) is not _shape:",
+        "            return _fallback(row)",
+        "        try:",
+    ]
+    if keys is None:
+        lines.append(f"            ({''.join(f'v{i}, ' for i in range(len(columns)))}) = row")
+    else:
+        lines += [f"            v{i} = row[{key!r}]" for i, key in enumerate(keys)]
+
+    exprs = []
+    for i, (t, kind, encoder) in enumerate(columns):
+        v = f"v{i}"
+        namespace[f"t{i}"] = t
+        if kind == "none":
+            expr = f'"NULL" if {v} is None else _literal({v})'
+        elif kind == "int":
+            expr = f"str({v}) if type({v}) is int else _literal({v})"
+        elif kind == "str":
+            expr = f"\"'\" + {v}.translate(_table) + \"'\" if type({v}) is str else _literal({v})"
+        elif kind == "date":
+            expr = f"\"'\" + {v}.isoformat() + \"'\" if type({v}) is t{i} else _literal({v})"
+        elif kind == "datetime":
+            # escape_datetime leaves out the UTC offset; isoformat() doesn't
+            expr = (
+                f"\"'\" + {v}.isoformat(' ') + \"'\""
+                f" if type({v}) is t{i} and {v}.tzinfo is None else _literal({v})"
+            )
+        elif kind == "call":
+            namespace[f"enc{i}"] = encoder
+            expr = f"enc{i}({v}, _mapping) if type({v}) is t{i} else _literal({v})"
+        else:
+            expr = f"_literal({v})"
+        exprs.append(f"({expr})")
+
+    if keys is None:
+        lines.append("            return _values % (")
+        lines += [f"                {expr}," for expr in exprs]
+        lines.append("            )")
+    else:
+        lines.append("            return _values % {")
+        lines += [f"                {key!r}: {expr}," for key, expr in zip(keys, exprs)]
+        lines.append("            }")
+    lines += [
+        "        except Exception:",
+        "            return _fallback(row)",
+        "",
+        "    return encode",
+    ]
+
+    source = "\n".join(lines)
+    if DEBUG:
+        print(source)
+    exec(compile(source, "<pymysql argument encoder>", "exec"), namespace)
+    return namespace["bind"]
@@ -0,0 +1,755 @@
+import collections
+import re
+import warnings
+from . import err
+from ._argencoder import make_values_encoder
+from ._columnar import to_numpy
+from .constants import CLIENT
+
+
+#: Regular expression for :meth:`Cursor.executemany`.
+#: executemany only supports simple bulk insert.
+#: You can use it to load large dataset.
+RE_INSERT_VALUES = re.compile(
+    r"\s*((?:INSERT|REPLACE)\b.+\bVALUES?\s*)"
+    + r"(\(\s*(?:%s|%\(.+\)s)\s*(?:,\s*(?:%s|%\(.+\)s)\s*)*\))"
+    + r"(\s*(?:ON DUPLICATE.*)?);?\s*\Z",
+    re.IGNORECASE | re.DOTALL,
+)
+
+#: Statements executemany() pipelines with execute_batch(): each one
+#: produces a single OK result whose affected row count is its own
+RE_PIPELINED = re.compile(r"\s*(?:UPDATE|DELETE)\b", re.IGNORECASE)
+
+
+#: Result of :meth:`Cursor.execute_batch`: the affected row count of each
+#: statement that ran, and the index and exception of the one that failed
+#: (None if all of them succeeded).
+BatchResult = collections.namedtuple("BatchResult", "rowcounts error_index error")
+
+
+class Cursor:
+    """
+    This is the object used to interact with the database.
+
+    Do not create an instance of a Cursor yourself. Call
+    connections.Connection.cursor().
+
+    See `Cursor <https://www.python.org/dev/peps/pep-0249/#cursor-objects>`_ in
+    the specification.
+    """
+
+    #: Max statement size which :meth:`executemany` generates.
+    #:
+    #: Max size of allowed statement is max_allowed_packet - packet_header_size.
+    #: Default value of max_allowed_packet is 1048576.
+    max_stmt_length = 1024000
+
+    def __init__(self, connection):
+        self.connection = connection
+        self.warning_count = 0
+        self.description = None
+        self.rownumber = 0
+        self.rowcount = -1
+        self.arraysize = 1
+        self._executed = None
+        self._result = None
+        self._rows = None
+
+    def close(self):
+        """
+        Closing a cursor just exhausts all remaining data.
+        """
+        conn = self.connection
+        if conn is None:
+            return
+        try:
+            while self.nextset():
+                pass
+        finally:
+            self.connection = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        del exc_info
+        self.close()
+
+    def _get_db(self):
+        if not self.connection:
+            raise err.ProgrammingError("Cursor closed")
+        return self.connection
+
+    def _check_executed(self):
+        if not self._executed:
+            raise err.ProgrammingError("execute() first")
+
+    def _conv_row(self, row):
+        return row
+
+    def setinputsizes(self, *args):
+        """Does nothing, required by DB API."""
+
+    def setoutputsizes(self, *args):
+        """Does nothing, required by DB API."""
+
+    def _nextset(self, unbuffered=False, columnar=False):
+        """Get the next query set."""
+        conn = self._get_db()
+        current_result = self._result
+        if current_result is None or current_result is not conn._result:
+            return None
+        if not current_result.has_next:
+            return None
+        self._result = None
+        self._clear_result()
+        conn.next_result(unbuffered=unbuffered, columnar=columnar)
+        self._do_get_result()
+        return True
+
+    def nextset(self):
+        return self._nextset(False)
+
+    def _escape_args(self, args, conn):
+        if isinstance(args, (tuple, list)):
+            return tuple(conn.literal(arg) for arg in args)
+        elif isinstance(args, dict):
+            return {key: conn.literal(val) for (key, val) in args.items()}
+        else:
+            # If it's not a dictionary let's try escaping it anyways.
+            # Worst case it will throw a Value error
+            return conn.escape(args)
+
+    def mogrify(self, query, args=None):
+        """
+        Returns the exact string that would be sent to the database by calling the
+        execute() method.
+
+        :param query: Query to mogrify.
+        :type query: str
+
+        :param args: Parameters used with query. (optional)
+        :type args: tuple, list or dict
+
+        :return: The query with argument binding applied.
+        :rtype: str
+
+        This method follows the extension to the DB API 2.0 followed by Psycopg.
+        """
+        conn = self._get_db()
+
+        if args is not None:
+            query = query % self._escape_args(args, conn)
+
+        return query
+
+    def execute(self, query, args=None):
+        """Execute a query.
+
+        :param query: Query to execute.
+        :type query: str
+
+        :param args: Parameters used with query. (optional)
+        :type args: tuple, list or dict
+
+        :return: Number of affected rows.
+        :rtype: int
+
+        If args is a list or tuple, %s can be used as a placeholder in the query.
+        If args is a dict, %(name)s can be used as a placeholder in the query.
+        """
+        while self.nextset():
+            pass
+
+        query = self.mogrify(query, args)
+
+        result = self._query(query)
+        self._executed = query
+        return result
+
+    def executemany(self, query, args):
+        """Run several data against one query.
+
+        :param query: Query to execute.
+        :type query: str
+
+        :param args: Sequence of sequences or mappings. It is used as parameter.
+        :type args: tuple or list
+
+        :return: Number of rows affected, if any.
+        :rtype: int or None
+
+        This method improves performance on multiple-row INSERT and
+        REPLACE, which are rewritten as multi-row statements, and on UPDATE
+        and DELETE, which are sent as multi-statement batches (see
+        execute_batch()). Otherwise it is equivalent to looping over args
+        with execute().
+        """
+        if not args:
+            return
+
+        statements = self._bulk_insert_statements(query, args)
+        if statements is not None:
+            self.rowcount = sum(self.execute(sql) for sql in statements)
+            return self.rowcount
+
+        # _pipeline_many() counts the argument sets; only inserts stream them
+        if not isinstance(args, (list, tuple)):
+            args = list(args)
+        if RE_PIPELINED.match(query) and self._pipeline_many(args):
+            result = self.execute_batch((query, arg) for arg in args)
+            if result.error is not None:
+                raise result.error
+            return self.rowcount
+
+        self.rowcount = sum(self.execute(query, arg) for arg in args)
+        return self.rowcount
+
+    def _bulk_insert_statements(self, query, args):
+        """Return the multi-row statements executemany() sends for an
+        INSERT/REPLACE ... VALUES query, or None for any other query."""
+        m = RE_INSERT_VALUES.match(query)
+        if not m:
+            return None
+        q_prefix = m.group(1) % ()
+        q_values = m.group(2).rstrip()
+        q_postfix = m.group(3) or ""
+        assert q_values[0] == "(" and q_values[-1] == ")"
+        return self._iter_execute_many(
+            q_prefix,
+            q_values,
+            q_postfix,
+            args,
+            self.max_stmt_length,
+            self._get_db().encoding,
+        )
+
+    def _pipeline_many(self, args):
+        # Switching multi-statements on and off costs a round trip each,
+        # which only pays off from three argument sets
+        conn = self._get_db()
+        return bool(conn.client_flag & CLIENT.MULTI_STATEMENTS) or len(args) > 2
+
+    def _iter_execute_many(
+        self, prefix, values, postfix, args, max_stmt_length, encoding
+    ):
+        conn = self._get_db()
+        escape = self._escape_args
+        if isinstance(prefix, str):
+            prefix = prefix.encode(encoding)
+        if isinstance(postfix, str):
+            postfix = postfix.encode(encoding)
+        sql = bytearray(prefix)
+        args = iter(args)
+        first = next(args)
+        v = values % escape(first, conn)
+        if isinstance(v, str):
+            v = v.encode(encoding, "surrogateescape")
+        sql += v
+        # The remaining argument sets are escaped by a plan made from the first
+        encode = make_values_encoder(
+            values, first, conn, lambda arg: values % escape(arg, conn)
+        )
+        for arg in args:
+            v = encode(arg)
+            if isinstance(v, str):
+                v = v.encode(encoding, "surrogateescape")
+            if len(sql) + len(v) + len(postfix) + 1 > max_stmt_length:
+                yield sql + postfix
+                sql = bytearray(prefix)
+            else:
+                sql += b","
+            sql += v
+        yield sql + postfix
+
+    def execute_batch(self, statements):
+        """Execute a sequence of independent statements in few round trips.
+
+        :param statements: SQL strings, or (query, args) pairs as for execute().
+        :type statements: iterable
+
+        :return: BatchResult(rowcounts, error_index, error)
+
+        Statements are joined with ";" into as few COM_QUERY packets as
+        max_stmt_length allows, with multi-statement support enabled for the
+        session meanwhile (COM_SET_OPTION, unless the connection was opened
+        with CLIENT.MULTI_STATEMENTS). The server runs them in order and
+        stops at the first error, which is returned rather than raised:
+        rowcounts then covers the statements before it and nothing after it
+        was run. Result sets are discarded (their row count is reported).
+        Each statement must produce exactly one result, so no CALL.
+        """
+        while self.nextset():
+            pass
+        self._clear_result()
+        conn = self._get_db()
+        toggle = not conn.client_flag & CLIENT.MULTI_STATEMENTS
+        rowcounts = []
+        error = None
+
+        if toggle:
+            conn._set_multi_statements(True)
+        try:
+            for sql in self._batch_queries(statements, conn.encoding):
+                self._executed = sql
+                try:
+                    rowcounts.append(conn.query(sql))
+                    while conn._result.has_next:
+                        rowcounts.append(conn.next_result())
+                except err.MySQLError as e:
+                    if not conn.open:
+                        raise
+                    error = e
+                    break
+        finally:
+            if toggle and conn.open:
+                conn._set_multi_statements(False)
+
+        self.rowcount = sum(rowcounts)
+        if error is None:
+            return BatchResult(rowcounts, None, None)
+        return BatchResult(rowcounts, len(rowcounts), error)
+
+    def _batch_queries(self, statements, encoding):
+        sql = bytearray()
+        for statement in statements:
+            if isinstance(statement, tuple):
+                statement = self.mogrify(*statement)
+            if isinstance(statement, str):
+                statement = statement.encode(encoding, "surrogateescape")
+            statement = statement.strip().rstrip(b";")
+            if sql and len(sql) + 1 + len(statement) > self.max_stmt_length:
+                yield sql
+                sql = bytearray()
+            if sql:
+                sql += b";"
+            sql += statement
+        if sql:
+            yield sql
+
+    def callproc(self, procname, args=()):
+        """Execute stored procedure procname with args.
+
+        :param procname: Name of procedure to execute on server.
+        :type procname: str
+
+        :param args: Sequence of parameters to use with procedure.
+        :type args: tuple or list
+
+        Returns the original args.
+
+        Compatibility warning: PEP-249 specifies that any modified
+        parameters must be returned. This is currently impossible
+        as they are only available by storing them in a server
+        variable and then retrieved by a query. Since stored
+        procedures return zero or more result sets, there is no
+        reliable way to get at OUT or INOUT parameters via callproc.
+        The server variables are named @_procname_n, where procname
+        is the parameter above and n is the position of the parameter
+        (from zero). Once all result sets generated by the procedure
+        have been fetched, you can issue a SELECT @_procname_0, ...
+        query using .execute() to get any OUT or INOUT values.
+
+        Compatibility warning: The act of calling a stored procedure
+        itself creates an empty result set. This appears after any
+        result sets generated by the procedure. This is non-standard
+        behavior with respect to the DB-API. Be sure to use nextset()
+        to advance through all result sets; otherwise you may get
+        disconnected.
+        """
+        conn = self._get_db()
+        if args:
+            fmt = f"@_{procname}_%d=%s"
+            self._query(
+                "SET %s"
+                % ",".join(
+                    fmt % (index, conn.escape(arg)) for index, arg in enumerate(args)
+                )
+            )
+            self.nextset()
+
+        q = "CALL {}({})".format(
+            procname,
+            ",".join(["@_%s_%d" % (procname, i) for i in range(len(args))]),
+        )
+        self._query(q)
+        self._executed = q
+        return args
+
+    def fetchone(self):
+        """Fetch the next row."""
+        self._check_executed()
+        if self._rows is None or self.rownumber >= len(self._rows):
+            return None
+        result = self._rows[self.rownumber]
+        self.rownumber += 1
+        return result
+
+    def fetchmany(self, size=None):
+        """Fetch several rows."""
+        self._check_executed()
+        if self._rows is None:
+            # Django expects () for EOF.
+            # https://github.com/django/django/blob/0c1518ee429b01c145cf5b34eab01b0b92f8c246/django/db/backends/mysql/features.py#L8
+            return ()
+        end = self.rownumber + (size or self.arraysize)
+        result = self._rows[self.rownumber : end]
+        self.rownumber = min(end, len(self._rows))
+        return result
+
+    def fetchall(self):
+        """Fetch all the rows."""
+        self._check_executed()
+        if self._rows is None:
+            return []
+        if self.rownumber:
+            result = self._rows[self.rownumber :]
+        else:
+            result = self._rows
+        self.rownumber = len(self._rows)
+        return result
+
+    def scroll(self, value, mode="relative"):
+        self._check_executed()
+        if mode == "relative":
+            r = self.rownumber + value
+        elif mode == "absolute":
+            r = value
+        else:
+            raise err.ProgrammingError("unknown scroll mode %s" % mode)
+
+        if not (0 <= r < len(self._rows)):
+            raise IndexError("out of range")
+        self.rownumber = r
+
+    def _query(self, q):
+        conn = self._get_db()
+        self._clear_result()
+        conn.query(q)
+        self._do_get_result()
+        return self.rowcount
+
+    def _clear_result(self):
+        self.rownumber = 0
+        self._result = None
+
+        self.rowcount = 0
+        self.warning_count = 0
+        self.description = None
+        self.lastrowid = None
+        self._rows = None
+
+    def _do_get_result(self):
+        conn = self._get_db()
+
+        self._result = result = conn._result
+
+        self.rowcount = result.affected_rows
+        self.warning_count = result.warning_count
+        self.description = result.description
+        self.lastrowid = result.insert_id
+        self._rows = result.rows
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        row = self.fetchone()
+        if row is None:
+            raise StopIteration
+        return row
+
+    def __getattr__(self, name):
+        # DB-API 2.0 optional extension says these errors can be accessed
+        # via Connection object. But MySQLdb had defined them on Cursor object.
+        if name in (
+            "Warning",
+            "Error",
+            "InterfaceError",
+            "DatabaseError",
+            "DataError",
+            "OperationalError",
+            "IntegrityError",
+            "InternalError",
+            "ProgrammingError",
+            "NotSupportedError",
+        ):
+            # Deprecated since v1.1
+            warnings.warn(
+                "PyMySQL errors hould be accessed from `pymysql` package",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+            return getattr(err, name)
+        raise AttributeError(name)
+
+
+class DictCursorMixin:
+    # You can override this to use OrderedDict or other dict-like types.
+    dict_type = dict
+
+    def _do_get_result(self):
+        super()._do_get_result()
+        fields = []
+        if self.description:
+            for f in self._result.fields:
+                name = f.name
+                if name in fields:
+                    name = f.table_name + "." + name
+                fields.append(name)
+            self._fields = fields
+
+        if fields and self._rows:
+            self._rows = [self._conv_row(r) for r in self._rows]
+
+    def _conv_row(self, row):
+        if row is None:
+            return None
+        return self.dict_type(zip(self._fields, row))
+
+
+class DictCursor(DictCursorMixin, Cursor):
+    """A cursor which returns results as a dictionary"""
+
+
+class SSCursor(Cursor):
+    """
+    Unbuffered Cursor, mainly useful for queries that return a lot of data,
+    or for connections to remote servers over a slow network.
+
+    Instead of copying every row of data into a buffer, this will fetch
+    rows as needed. The upside of this is the client uses much less memory,
+    and rows are returned much faster when traveling over a slow network
+    or if the result set is very big.
+
+    There are limitations, though. The MySQL protocol doesn't support
+    returning the total number of rows, so the only way to tell how many rows
+    there are is to iterate over every row returned. Also, it currently isn't
+    possible to scroll backwards, as only the current row is held in memory.
+    """
+
+    def _conv_row(self, row):
+        return row
+
+    def close(self):
+        conn = self.connection
+        if conn is None:
+            return
+
+        if self._result is not None and self._result is conn._result:
+            self._result._finish_unbuffered_query()
+
+        try:
+            while self.nextset():
+                pass
+        finally:
+            self.connection = None
+
+    __del__ = close
+
+    def _query(self, q):
+        conn = self._get_db()
+        self._clear_result()
+        conn.query(q, unbuffered=True)
+        self._do_get_result()
+        return self.rowcount
+
+    def nextset(self):
+        return self._nextset(unbuffered=True)
+
+    def read_next(self):
+        """Read next row."""
+        return self._conv_row(self._result._read_rowdata_packet_unbuffered())
+
+    def fetchone(self):
+        """Fetch next row."""
+        self._check_executed()
+        row = self.read_next()
+        if row is None:
+            self.warning_count = self._result.warning_count
+            return None
+        self.rownumber += 1
+        return row
+
+    def fetchall(self):
+        """
+        Fetch all, as per MySQLdb. Pretty useless for large queries, as
+        it is buffered. See fetchall_unbuffered(), if you want an unbuffered
+        generator version of this method.
+        """
+        return list(self.fetchall_unbuffered())
+
+    def fetchall_unbuffered(self):
+        """
+        Fetch all, implemented as a generator, which isn't to standard,
+        however, it doesn't make sense to return everything in a list, as that
+        would use ridiculous memory for large result sets.
+        """
+        return iter(self.fetchone, None)
+
+    def fetchmany(self, size=None):
+        """Fetch many."""
+        self._check_executed()
+        if size is None:
+            size = self.arraysize
+
+        rows = []
+        for i in range(size):
+            row = self.read_next()
+            if row is None:
+                self.warning_count = self._result.warning_count
+                break
+            rows.append(row)
+            self.rownumber += 1
+        if not rows:
+            # Django expects () for EOF.
+            # https://github.com/django/django/blob/0c1518ee429b01c145cf5b34eab01b0b92f8c246/django/db/backends/mysql/features.py#L8
+            return ()
+        return rows
+
+    def scroll(self, value, mode="relative"):
+        self._check_executed()
+
+        if mode == "relative":
+            if value < 0:
+                raise err.NotSupportedError(
+                    "Backwards scrolling not supported by this cursor"
+                )
+
+            for _ in range(value):
+                self.read_next()
+            self.rownumber += value
+        elif mode == "absolute":
+            if value < self.rownumber:
+                raise err.NotSupportedError(
+                    "Backwards scrolling not supported by this cursor"
+                )
+
+            end = value - self.rownumber
+            for _ in range(end):
+                self.read_next()
+            self.rownumber = value
+        else:
+            raise err.ProgrammingError("unknown scroll mode %s" % mode)
+
+
+class SSDictCursor(DictCursorMixin, SSCursor):
+    """An unbuffered cursor, which returns results as a dictionary"""
+
+
+class ColumnarCursor(Cursor):
+    """
+    Buffered cursor that decodes result sets column by column.
+
+    Rows are never built as tuples while reading: integer and float columns
+    go into array.array, everything else into lists (see ColumnarResult).
+    fetch_columns() returns them as {column name: column}, optionally as
+    NumPy arrays; the fetchone()/fetchmany()/fetchall() methods still work
+    and build tuples on demand.
+    """
+
+    def _query(self, q):
+        conn = self._get_db()
+        self._clear_result()
+        conn.query(q, columnar=True)
+        self._do_get_result()
+        return self.rowcount
+
+    def nextset(self):
+        return self._nextset(columnar=True)
+
+    def fetchall(self):
+        """Fetch all the rows."""
+        self._check_executed()
+        if self._rows is None:
+            return []
+        result = self._rows[self.rownumber :]
+        self.rownumber = len(self._rows)
+        return result
+
+    def fetch_columns(self, numpy=False):
+        """Fetch all remaining rows as a dict of column name to column.
+
+        With numpy=True, integer and float columns are returned as NumPy
+        arrays (sharing memory with the array.array columns), or as masked
+        arrays when they contain NULLs. NumPy must be installed for that.
+        """
+        self._check_executed()
+        result = self._result
+        if result is None or result.columns is None:
+            return {}
+
+        names = []
+        for field in result.fields:
+            name = field.name
+            if name in names:
+                name = field.table_name + "." + name
+            names.append(name)
+
+        start = self.rownumber
+        self.rownumber = len(self._rows)
+        columns = {}
+        for name, column, typecode in zip(names, result.columns, result.typecodes):
+            if start:
+                column = column[start:]
+            if numpy:
+                column = to_numpy(column, typecode)
+            columns[name] = column
+        return columns
+
+
+def _has_sequence_arg(args):
+    if isinstance(args, dict):
+        args = args.values()
+    elif not isinstance(args, (tuple, list)):
+        return False
+    return any(isinstance(arg, (tuple, list)) for arg in args)
+
+
+class PreparedCursor(Cursor):
+    """
+    Cursor that runs parameterized queries as server-side prepared statements.
+
+    execute() with args prepares the query once per connection (it is kept
+    in the connection's statement cache) and sends only the parameter values
+    in binary form on every call: no client-side escaping, and the server
+    doesn't parse the statement again. Rows come back in the binary protocol
+    and are converted to the same Python values as with Cursor.
+
+    Queries use the usual %s or %(name)s placeholders. Without args a query
+    is sent as plain text, so statements that can't be prepared still work,
+    as does the multi-row INSERT built by executemany(). So are queries with
+    a list or tuple argument (``IN %s``), which only the client-side
+    escaping can expand.
+    """
+
+    def execute(self, query, args=None):
+        """Execute a query, as a prepared statement when args is given.
+
+        :param query: Query to execute.
+        :type query: str
+
+        :param args: Parameters used with query. (optional)
+        :type args: tuple, list or dict
+
+        :return: Number of affected rows.
+        :rtype: int
+        """
+        if args is None or _has_sequence_arg(args):
+            return super().execute(query, args)
+
+        while self.nextset():
+            pass
+
+        conn = self._get_db()
+        stmt = conn._prepare(query)
+        self._clear_result()
+        conn._execute_prepared(stmt, args)
+        self._do_get_result()
+        self._executed = query
+        return self.rowcount
+
+
+class PreparedDictCursor(DictCursorMixin, PreparedCursor):
+    """A prepared cursor which returns results as a dictionary"""
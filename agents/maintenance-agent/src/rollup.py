@@ -0,0 +1,172 @@
+import json
+import os
+from datetime import timedelta
+
+from lambda_function import connections
+
+# Hourly trade_log rollup for the chatbot's reports.
+#
+# The daily/weekly/monthly reports only need counts by hour, status and error
+# text, and distinct trades per status and per error, so instead of grouping
+# raw trade_log on every request they read two tables this job keeps current:
+#
+#   trade_log_hourly         hour_start, status, error_key = SHA1(errors)   primary key
+#                            errors, entries
+#   trade_log_daily_trades   day, status, error_key, trade_id               primary key
+#                            (error_key is '' for non-error statuses)
+#
+# Hours are rebuilt whole in trade_log_hourly (delete + INSERT ... SELECT over
+# a check_timestamp range), so a re-run is idempotent. Distinct counts can't
+# be summed across hours or days, so trade_log_daily_trades keeps each
+# trade_id once per day, status and error; the reports count and list
+# DISTINCT trade_ids over it. Its rows are only ever added (INSERT IGNORE
+# makes re-runs idempotent) and are kept for DAILY_TRADES_DAYS, the monthly
+# report's window.
+#
+# rollup_watermark.rolled_up_to marks the first hour that may still change;
+# everything before it is final and never read again. Each run
+# rebuilds from the watermark up to the current hour, and the watermark only
+# passes an hour once it has been closed for SETTLE_MINUTES, to pick up
+# trade_log inserts that commit late. A steady-state run therefore reads
+# about one hour of trade_log whatever its total size; the first run
+# backfills in BACKFILL_HOURS windows.
+#
+# Finalized hours outlive the raw entries the nightly compaction deletes, so
+# monthly reports keep working after it. The tables are created by
+# data-ingestion/migrations.py (migrations 6 and 8).
+
+SETTLE_MINUTES = int(os.environ.get("ROLLUP_SETTLE_MINUTES", "10"))
+BACKFILL_HOURS = int(os.environ.get("ROLLUP_BACKFILL_HOURS", "24"))
+TIME_MARGIN_MS = int(os.environ.get("MAINTENANCE_TIME_MARGIN_MS", "15000"))
+DAILY_TRADES_DAYS = int(os.environ.get("ROLLUP_DAILY_TRADES_DAYS", "30"))
+WATERMARK_NAME = "trade_log_hourly"
+
+# Range scan on trade_log.idx_check_timestamp
+INSERT_HOURLY = """
+    INSERT INTO trade_log_hourly
+        (hour_start, status, error_key, errors, entries)
+    SELECT
+        hour_start,
+        status,
+        SHA1(errors),
+        MIN(errors),
+        COUNT(*)
+    FROM (
+        SELECT
+            DATE_FORMAT(check_timestamp, '%%Y-%%m-%%d %%H:00:00') AS hour_start,
+            COALESCE(status, '') AS status,
+            COALESCE(errors, '') AS errors,
+            trade_id
+        FROM trade_log
+        WHERE check_timestamp >= %s AND check_timestamp < %s
+    ) AS entries
+    GROUP BY hour_start, status, SHA1(errors)
+"""
+
+INSERT_DAILY_TRADES = """
+    INSERT IGNORE INTO trade_log_daily_trades (day, status, error_key, trade_id)
+    SELECT DISTINCT
+        DATE(check_timestamp),
+        COALESCE(status, ''),
+        IF(status LIKE 'ERR%%', SHA1(COALESCE(errors, '')), ''),
+        trade_id
+    FROM trade_log
+    WHERE check_timestamp >= %s AND check_timestamp < %s AND trade_id IS NOT NULL
+"""
+
+
+def floor_hour(ts):
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def load_watermark(cursor):
+    cursor.execute("SELECT rolled_up_to FROM rollup_watermark WHERE name = %s", (WATERMARK_NAME,))
+    row = cursor.fetchone()
+    if row:
+        return row[0]
+    # First run: start from the oldest entry still in trade_log
+    cursor.execute("SELECT MIN(check_timestamp) FROM trade_log")
+    oldest = cursor.fetchone()[0]
+    return floor_hour(oldest) if oldest else None
+
+
+def save_watermark(cursor, rolled_up_to):
+    cursor.execute("""
+        INSERT INTO rollup_watermark (name, rolled_up_to) VALUES (%s, %s)
+        ON DUPLICATE KEY UPDATE rolled_up_to = VALUES(rolled_up_to)
+    """, (WATERMARK_NAME, rolled_up_to))
+
+
+def rebuild_hours(cursor, start, end):
+    """Replace the hourly rows for [start, end), add its daily trades and return how many
+    hourly rows were written."""
+    cursor.execute("DELETE FROM trade_log_hourly WHERE hour_start >= %s AND hour_start < %s", (start, end))
+    cursor.execute(INSERT_HOURLY, (start, end))
+    rows = cursor.rowcount
+    cursor.execute(INSERT_DAILY_TRADES, (start, end))
+    return rows
+
+
+def prune_daily_trades(cursor, now):
+    cursor.execute("DELETE FROM trade_log_daily_trades WHERE day < %s",
+                   (now.date() - timedelta(days=DAILY_TRADES_DAYS),))
+    return cursor.rowcount
+
+
+def lambda_handler(event, context):
+    conn = None
+    cursor = None
+
+    try:
+        conn = connections.acquire()
+        cursor = conn.cursor()
+
+        # Database time, the clock the chatbot's CURDATE() reports use
+        cursor.execute("SELECT NOW()")
+        now = cursor.fetchone()[0]
+        settled = floor_hour(now - timedelta(minutes=SETTLE_MINUTES))
+        stop = floor_hour(now) + timedelta(hours=1)
+
+        watermark = load_watermark(cursor)
+        start = watermark or floor_hour(now)
+        hours, rows = 0, 0
+        while start < stop:
+            end = min(start + timedelta(hours=BACKFILL_HOURS), stop)
+            rows += rebuild_hours(cursor, start, end)
+            hours += int((end - start) / timedelta(hours=1))
+            watermark = max(start, min(end, settled))
+            save_watermark(cursor, watermark)
+            conn.commit()
+            start = end
+            if context is not None and context.get_remaining_time_in_millis() < TIME_MARGIN_MS:
+                break
+
+        pruned = prune_daily_trades(cursor, now)
+        conn.commit()
+
+        return {
+            "statusCode": 200,
+            "body": json.dumps({
+                "hours_rebuilt": hours,
+                "rollup_rows": rows,
+                "daily_trades_pruned": pruned,
+                "rolled_up_to": watermark.isoformat() if watermark else None
+            }),
+            "headers": {"Content-Type": "application/json"}
+        }
+
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        print(f"Error rolling up trade_log: {e}")
+        return {
+            "statusCode": 500,
+            "body": json.dumps({"error": str(e)}),
+            "headers": {"Content-Type": "application/json"}
+        }
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            connections.release(conn)
@@ -0,0 +1,138 @@
+import argparse
+import glob
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+
+# Import-time profile of every agent's handler module(s).
+#
+# Each handler listed in an agent's template.yml is imported in a fresh
+# interpreter with `python -X importtime`, --repeat times, from its src/
+# directory (so the vendored drivers are the ones measured). We report the
+# median cumulative import time of the handler and, for the median run, the
+# top-level packages and modules that account for it. Every Step Functions
+# run can hit five cold functions in series, so this adds up.
+#
+#   python agents/profile_imports.py
+#   python agents/profile_imports.py --agent exception-mailer-agent --top 25 --output imports.json
+
+AGENTS_DIR = os.path.dirname(os.path.abspath(__file__))
+HANDLER_RE = re.compile(r'^\s*Handler:\s*([\w.]+)\.lambda_handler\s*$', re.MULTILINE)
+IMPORTTIME_RE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$')
+
+# The handlers read these at import time; nothing connects while profiling
+PROFILE_ENV = {
+    'DB_HOST': '127.0.0.1',
+    'DB_USER': 'profile',
+    'DB_PASSWORD': '',
+    'DB_NAME': 'trades_market',
+    'SENDER_EMAIL': 'pipeline@localhost',
+    'RECEIVER_EMAIL': 'ops@localhost',
+    'EMAIL_PASSWORD': '',
+}
+
+
+def find_handlers(agent=None):
+    """Return [(agent, src_dir, module_name)] for each Handler in the agents' template.yml."""
+    handlers = []
+    for template in sorted(glob.glob(os.path.join(AGENTS_DIR, '*', 'template.yml'))):
+        agent_dir = os.path.dirname(template)
+        name = os.path.basename(agent_dir)
+        if agent and name != agent:
+            continue
+        with open(template) as f:
+            for module_name in HANDLER_RE.findall(f.read()):
+                handlers.append((name, os.path.join(agent_dir, 'src'), module_name))
+    return handlers
+
+
+def parse_importtime(stderr, module_name):
+    """Return (cumulative_us, [(name, self_us, cumulative_us)]) for the handler's import subtree."""
+    subtree = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, name = int(match[1]), int(match[2]), match[3], match[4]
+        if len(indent) == 1:
+            # A top-level import; -X importtime lists children before their parent
+            if name == module_name:
+                return cumulative_us, subtree
+            subtree = []
+        else:
+            subtree.append((name, self_us, cumulative_us))
+    return None, subtree
+
+
+def profile_once(src_dir, module_name):
+    env = dict(os.environ, **PROFILE_ENV)
+    env.pop('PYTHONPATH', None)
+    proc = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module_name}'],
+                          cwd=src_dir, env=env, capture_output=True, text=True)
+    total, modules = parse_importtime(proc.stderr, module_name)
+    if proc.returncode != 0 or total is None:
+        lines = [line for line in proc.stderr.splitlines() if not line.startswith('import time:')]
+        return {'error': lines[-1] if lines else f'exit status {proc.returncode}'}
+    return {'total_us': total, 'modules': modules}
+
+
+def summarize(runs, top):
+    errors = [run['error'] for run in runs if 'error' in run]
+    if errors:
+        return {'error': errors[0]}
+    runs = sorted(runs, key=lambda run: run['total_us'])
+    median_run = runs[len(runs) // 2]
+
+    packages = {}
+    for name, self_us, _ in median_run['modules']:
+        package = name.split('.', 1)[0]
+        packages[package] = packages.get(package, 0) + self_us
+    return {
+        'median_ms': round(statistics.median(run['total_us'] for run in runs) / 1000, 1),
+        'min_ms': round(runs[0]['total_us'] / 1000, 1),
+        'max_ms': round(runs[-1]['total_us'] / 1000, 1),
+        'modules_imported': len(median_run['modules']),
+        'top_packages_ms': {
+            package: round(us / 1000, 1)
+            for package, us in sorted(packages.items(), key=lambda item: -item[1])[:top]
+        },
+        'top_modules_self_ms': {
+            name: round(self_us / 1000, 1)
+            for name, self_us, _ in sorted(median_run['modules'], key=lambda m: -m[1])[:top]
+        },
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Profile cold-start import time of the agent handlers.')
+    parser.add_argument('--agent', help='only profile this agent directory, e.g. verification-agent')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=10, help='packages/modules to list per handler')
+    parser.add_argument('--output', help='write the profile as JSON to this file')
+    args = parser.parse_args(argv)
+
+    report = {}
+    for agent, src_dir, module_name in find_handlers(args.agent):
+        result = summarize([profile_once(src_dir, module_name) for _ in range(args.repeat)], args.top)
+        report[f'{agent}:{module_name}'] = result
+
+        print(f"\n{agent} ({module_name})")
+        if 'error' in result:
+            print(f"  import failed: {result['error']}")
+            continue
+        print(f"  median {result['median_ms']}ms (min {result['min_ms']}, max {result['max_ms']}), "
+              f"{result['modules_imported']} modules")
+        for package, ms in result['top_packages_ms'].items():
+            print(f"    {package:<32} {ms:>7.1f}ms")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 1 if any('error' in result for result in report.values()) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
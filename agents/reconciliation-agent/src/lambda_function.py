@@ -3,6 +3,9 @@ import os
 import json
 from decimal import Decimal
 from datetime import datetime
+from pymysql.pool import ConnectionPool
+from handoff import add_leftovers, publish_handoff, resolve_handoff, select_trades
+from partitioning import get_partition, partition_clause, tag_response
 
 # Database config from environment variables
 db = {
@@ -21,18 +24,28 @@ def connect(config):
         db=config['db'],
         port=config['port'],
         autocommit=False,
+        # Result sets are mostly repetitive text: far fewer bytes between regions
+        compress=True,
         cursorclass=pymysql.cursors.DictCursor
     )
 
+# Reused across warm invocations, and shared by the threads of partitioned local runs
+connections = ConnectionPool(lambda: connect(db))
+
 def lambda_handler(event, context):
-    conn = connect(db)
-    cursor = conn.cursor()
+    conn = connections.acquire()
+    cursor = conn.cursor(pymysql.cursors.PreparedDictCursor)
+    partition = None
 
     try:
-        # Step 1: Fetch all MTCH trades
-        cursor.execute("SELECT * FROM trades_data WHERE status='MTCH'")
-        matched_trades = cursor.fetchall()
+        partition = get_partition(event)
+
+        # Step 1: Fetch the handed-over MTCH trades plus leftovers, or all of them (in this partition, if any)
+        clause, params = partition_clause(partition)
+        matched_trades = select_trades(cursor, "SELECT * FROM trades_data WHERE status='MTCH'" + clause, params,
+                                       add_leftovers(cursor, resolve_handoff(event), "MTCH", partition))
 
+        advanced = []
         reconciled = 0
         skipped = 0
         timestamp = datetime.utcnow()
@@ -86,6 +99,7 @@ def lambda_handler(event, context):
                     timestamp
                 ))
                 reconciled += 1
+                advanced.append(trade_id)
                 continue
 
             # Step 5: Check if mismatch is only in order_type
@@ -137,25 +151,28 @@ def lambda_handler(event, context):
 
         conn.commit()
 
-        return {
+        summary = {
+            "reconciled_count": reconciled,
+            "skipped_order_type_mismatch": skipped,
+            "mismatches_logged": len(matched_trades) - reconciled - skipped
+        }
+        return tag_response({
             "statusCode": 200,
-            "body": json.dumps({
-                "reconciled_count": reconciled,
-                "skipped_order_type_mismatch": skipped,
-                "mismatches_logged": len(matched_trades) - reconciled - skipped
-            }),
+            "body": json.dumps(summary),
             "headers": {
                 "Content-Type": "application/json"
-            }
-        }
+            },
+            "handoff": publish_handoff(advanced, "reconciliation")
+        }, partition, summary)
 
     except Exception as e:
         conn.rollback()
-        return {
+        return tag_response({
             "statusCode": 500,
-            "body": json.dumps({"error": str(e)})
-        }
+            "body": json.dumps({"error": str(e)}),
+            "handoff": None
+        }, partition, {"failed_partitions": 1})
 
     finally:
         cursor.close()
-        conn.close()
+        connections.release(conn)
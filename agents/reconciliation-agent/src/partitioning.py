@@ -0,0 +1,53 @@
+# Partition descriptors for fanning an agent out across a Step Functions Map.
+#
+# An event may carry {"partition": {"bucket": k, "buckets": N}} to process only
+# trade_ids with CRC32(trade_id) % N == k, or {"partition": {"tickers": [...]}}
+# to process only those tickers. Hash buckets keep both legs of a trade_id in
+# the same slice, which matching and settlement rely on, so the state machine
+# uses those; ticker slices split pairs whose legs disagree on ticker and are
+# only meant for ad-hoc reruns.
+#
+# This file is identical in every agent's src/ directory.
+
+
+def get_partition(event):
+    """Return the validated partition descriptor from an event, or None for the whole table."""
+    partition = (event or {}).get("partition") if isinstance(event, dict) else None
+    if not partition:
+        return None
+
+    if "tickers" in partition:
+        tickers = partition["tickers"]
+        if isinstance(tickers, str):
+            tickers = [tickers]
+        if not tickers:
+            raise ValueError("partition.tickers must not be empty")
+        return {"tickers": sorted(tickers)}
+
+    bucket = int(partition["bucket"])
+    buckets = int(partition["buckets"])
+    if buckets < 1 or not 0 <= bucket < buckets:
+        raise ValueError(f"invalid partition bucket {bucket} of {buckets}")
+    return {"bucket": bucket, "buckets": buckets}
+
+
+def partition_clause(partition, alias=None):
+    """SQL fragment (starting with AND) and its parameters restricting a query to a partition."""
+    if partition is None:
+        return "", ()
+    prefix = f"{alias}." if alias else ""
+    if "tickers" in partition:
+        return f" AND {prefix}ticker IN %s", (partition["tickers"],)
+    return f" AND CRC32({prefix}trade_id) %% %s = %s", (partition["buckets"], partition["bucket"])
+
+
+def tag_response(response, partition, summary):
+    """Add the partition and a numeric summary to a handler response when running partitioned.
+
+    Map states merge the summaries of all partitions of a stage, so only
+    numbers belong in it. Unpartitioned responses are returned unchanged.
+    """
+    if partition is not None:
+        response["partition"] = partition
+        response["summary"] = summary
+    return response
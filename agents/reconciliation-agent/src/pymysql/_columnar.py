@@ -0,0 +1,98 @@
+"""
+Column containers for ColumnarCursor
+"""
+
+from array import array
+
+from .constants import FIELD_TYPE, FLAG
+
+
+def column_typecode(field, converter):
+    """array.array typecode for a column, or None if it is kept in a list."""
+    if converter is int:
+        if field.type_code == FIELD_TYPE.LONGLONG and field.flags & FLAG.UNSIGNED:
+            return "Q"
+        return "q"
+    if converter is float:
+        return "d"
+    return None
+
+
+class ColumnSink:
+    """Collects decoded values column by column.
+
+    Passed to Connection._read_rows in place of a row list: the generated
+    column parser appends values itself and hands over True, while rows
+    decoded the slow way arrive as tuples. NULLs in array columns are
+    stored as 0 and patched to None by finish().
+    """
+
+    def __init__(self, typecodes):
+        self.typecodes = typecodes
+        self.columns = [array(t) if t else [] for t in typecodes]
+        self.appends = [column.append for column in self.columns]
+        self.nulls = {}
+        self.count = 0
+
+    def null(self, i):
+        self.nulls.setdefault(i, []).append(self.count)
+        self.appends[i](0)
+
+    def append(self, row):
+        if row is not True:
+            # A rejected parse_into may have appended part of this row already
+            for column in self.columns:
+                del column[self.count :]
+            for rows in self.nulls.values():
+                if rows and rows[-1] == self.count:
+                    rows.pop()
+            for i in range(len(self.columns)):
+                value = row[i] if i < len(row) else None
+                if value is None and self.typecodes[i]:
+                    self.null(i)
+                else:
+                    self.appends[i](value)
+        self.count += 1
+
+    def finish(self):
+        """Return the columns; array columns that saw NULLs become lists."""
+        for i, rows in self.nulls.items():
+            column = self.columns[i] = list(self.columns[i])
+            for row in rows:
+                column[row] = None
+        return self.columns
+
+
+class ColumnRows:
+    """Read-only sequence of row tuples over columns, for the DB-API fetch methods."""
+
+    def __init__(self, columns, count):
+        self._columns = columns
+        self._count = count
+
+    def __len__(self):
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return list(zip(*(column[index] for column in self._columns)))
+        return tuple(column[index] for column in self._columns)
+
+
+def to_numpy(column, typecode):
+    """Return an array column as a NumPy array (sharing its memory), and a
+    numeric column with NULLs as a masked array. Other columns are returned
+    unchanged."""
+    if typecode is None:
+        return column
+
+    import numpy
+
+    dtype = {"q": numpy.int64, "Q": numpy.uint64, "d": numpy.float64}[typecode]
+    if isinstance(column, array):
+        return numpy.frombuffer(column, dtype=dtype)
+    mask = numpy.fromiter((value is None for value in column), bool, len(column))
+    values = numpy.fromiter(
+        (0 if value is None else value for value in column), dtype, len(column)
+    )
+    return numpy.ma.MaskedArray(values, mask=mask)
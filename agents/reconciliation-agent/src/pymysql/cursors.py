@@ -1,6 +1,10 @@
+import collections
 import re
 import warnings
 from . import err
+from ._argencoder import make_values_encoder
+from ._columnar import to_numpy
+from .constants import CLIENT
 
 
 #: Regular expression for :meth:`Cursor.executemany`.
@@ -13,6 +17,16 @@ RE_INSERT_VALUES = re.compile(
     re.IGNORECASE | re.DOTALL,
 )
 
+#: Statements executemany() pipelines with execute_batch(): each one
+#: produces a single OK result whose affected row count is its own
+RE_PIPELINED = re.compile(r"\s*(?:UPDATE|DELETE)\b", re.IGNORECASE)
+
+
+#: Result of :meth:`Cursor.execute_batch`: the affected row count of each
+#: statement that ran, and the index and exception of the one that failed
+#: (None if all of them succeeded).
+BatchResult = collections.namedtuple("BatchResult", "rowcounts error_index error")
+
 
 class Cursor:
     """
@@ -80,7 +94,7 @@ class Cursor:
     def setoutputsizes(self, *args):
         """Does nothing, required by DB API."""
 
-    def _nextset(self, unbuffered=False):
+    def _nextset(self, unbuffered=False, columnar=False):
         """Get the next query set."""
         conn = self._get_db()
         current_result = self._result
@@ -90,7 +104,7 @@ class Cursor:
             return None
         self._result = None
         self._clear_result()
-        conn.next_result(unbuffered=unbuffered)
+        conn.next_result(unbuffered=unbuffered, columnar=columnar)
         self._do_get_result()
         return True
 
@@ -167,31 +181,57 @@ class Cursor:
         :rtype: int or None
 
         This method improves performance on multiple-row INSERT and
-        REPLACE. Otherwise it is equivalent to looping over args with
-        execute().
+        REPLACE, which are rewritten as multi-row statements, and on UPDATE
+        and DELETE, which are sent as multi-statement batches (see
+        execute_batch()). Otherwise it is equivalent to looping over args
+        with execute().
         """
         if not args:
             return
 
-        m = RE_INSERT_VALUES.match(query)
-        if m:
-            q_prefix = m.group(1) % ()
-            q_values = m.group(2).rstrip()
-            q_postfix = m.group(3) or ""
-            assert q_values[0] == "(" and q_values[-1] == ")"
-            return self._do_execute_many(
-                q_prefix,
-                q_values,
-                q_postfix,
-                args,
-                self.max_stmt_length,
-                self._get_db().encoding,
-            )
+        statements = self._bulk_insert_statements(query, args)
+        if statements is not None:
+            self.rowcount = sum(self.execute(sql) for sql in statements)
+            return self.rowcount
+
+        # _pipeline_many() counts the argument sets; only inserts stream them
+        if not isinstance(args, (list, tuple)):
+            args = list(args)
+        if RE_PIPELINED.match(query) and self._pipeline_many(args):
+            result = self.execute_batch((query, arg) for arg in args)
+            if result.error is not None:
+                raise result.error
+            return self.rowcount
 
         self.rowcount = sum(self.execute(query, arg) for arg in args)
         return self.rowcount
 
-    def _do_execute_many(
+    def _bulk_insert_statements(self, query, args):
+        """Return the multi-row statements executemany() sends for an
+        INSERT/REPLACE ... VALUES query, or None for any other query."""
+        m = RE_INSERT_VALUES.match(query)
+        if not m:
+            return None
+        q_prefix = m.group(1) % ()
+        q_values = m.group(2).rstrip()
+        q_postfix = m.group(3) or ""
+        assert q_values[0] == "(" and q_values[-1] == ")"
+        return self._iter_execute_many(
+            q_prefix,
+            q_values,
+            q_postfix,
+            args,
+            self.max_stmt_length,
+            self._get_db().encoding,
+        )
+
+    def _pipeline_many(self, args):
+        # Switching multi-statements on and off costs a round trip each,
+        # which only pays off from three argument sets
+        conn = self._get_db()
+        return bool(conn.client_flag & CLIENT.MULTI_STATEMENTS) or len(args) > 2
+
+    def _iter_execute_many(
         self, prefix, values, postfix, args, max_stmt_length, encoding
     ):
         conn = self._get_db()
@@ -202,24 +242,91 @@ class Cursor:
             postfix = postfix.encode(encoding)
         sql = bytearray(prefix)
         args = iter(args)
-        v = values % escape(next(args), conn)
+        first = next(args)
+        v = values % escape(first, conn)
         if isinstance(v, str):
             v = v.encode(encoding, "surrogateescape")
         sql += v
-        rows = 0
+        # The remaining argument sets are escaped by a plan made from the first
+        encode = make_values_encoder(
+            values, first, conn, lambda arg: values % escape(arg, conn)
+        )
         for arg in args:
-            v = values % escape(arg, conn)
+            v = encode(arg)
             if isinstance(v, str):
                 v = v.encode(encoding, "surrogateescape")
             if len(sql) + len(v) + len(postfix) + 1 > max_stmt_length:
-                rows += self.execute(sql + postfix)
+                yield sql + postfix
                 sql = bytearray(prefix)
             else:
                 sql += b","
             sql += v
-        rows += self.execute(sql + postfix)
-        self.rowcount = rows
-        return rows
+        yield sql + postfix
+
+    def execute_batch(self, statements):
+        """Execute a sequence of independent statements in few round trips.
+
+        :param statements: SQL strings, or (query, args) pairs as for execute().
+        :type statements: iterable
+
+        :return: BatchResult(rowcounts, error_index, error)
+
+        Statements are joined with ";" into as few COM_QUERY packets as
+        max_stmt_length allows, with multi-statement support enabled for the
+        session meanwhile (COM_SET_OPTION, unless the connection was opened
+        with CLIENT.MULTI_STATEMENTS). The server runs them in order and
+        stops at the first error, which is returned rather than raised:
+        rowcounts then covers the statements before it and nothing after it
+        was run. Result sets are discarded (their row count is reported).
+        Each statement must produce exactly one result, so no CALL.
+        """
+        while self.nextset():
+            pass
+        self._clear_result()
+        conn = self._get_db()
+        toggle = not conn.client_flag & CLIENT.MULTI_STATEMENTS
+        rowcounts = []
+        error = None
+
+        if toggle:
+            conn._set_multi_statements(True)
+        try:
+            for sql in self._batch_queries(statements, conn.encoding):
+                self._executed = sql
+                try:
+                    rowcounts.append(conn.query(sql))
+                    while conn._result.has_next:
+                        rowcounts.append(conn.next_result())
+                except err.MySQLError as e:
+                    if not conn.open:
+                        raise
+                    error = e
+                    break
+        finally:
+            if toggle and conn.open:
+                conn._set_multi_statements(False)
+
+        self.rowcount = sum(rowcounts)
+        if error is None:
+            return BatchResult(rowcounts, None, None)
+        return BatchResult(rowcounts, len(rowcounts), error)
+
+    def _batch_queries(self, statements, encoding):
+        sql = bytearray()
+        for statement in statements:
+            if isinstance(statement, tuple):
+                statement = self.mogrify(*statement)
+            if isinstance(statement, str):
+                statement = statement.encode(encoding, "surrogateescape")
+            statement = statement.strip().rstrip(b";")
+            if sql and len(sql) + 1 + len(statement) > self.max_stmt_length:
+                yield sql
+                sql = bytearray()
+            if sql:
+                sql += b";"
+            sql += statement
+        if sql:
+            yield sql
 
     def callproc(self, procname, args=()):
         """Execute stored procedure procname with args.
@@ -529,3 +636,120 @@ class SSCursor(Cursor):
 
 class SSDictCursor(DictCursorMixin, SSCursor):
     """An unbuffered cursor, which returns results as a dictionary"""
+
+
+class ColumnarCursor(Cursor):
+    """
+    Buffered cursor that decodes result sets column by column.
+
+    Rows are never built as tuples while reading: integer and float columns
+    go into array.array, everything else into lists (see ColumnarResult).
+    fetch_columns() returns them as {column name: column}, optionally as
+    NumPy arrays; the fetchone()/fetchmany()/fetchall() methods still work
+    and build tuples on demand.
+    """
+
+    def _query(self, q):
+        conn = self._get_db()
+        self._clear_result()
+        conn.query(q, columnar=True)
+        self._do_get_result()
+        return self.rowcount
+
+    def nextset(self):
+        return self._nextset(columnar=True)
+
+    def fetchall(self):
+        """Fetch all the rows."""
+        self._check_executed()
+        if self._rows is None:
+            return []
+        result = self._rows[self.rownumber :]
+        self.rownumber = len(self._rows)
+        return result
+
+    def fetch_columns(self, numpy=False):
+        """Fetch all remaining rows as a dict of column name to column.
+
+        With numpy=True, integer and float columns are returned as NumPy
+        arrays (sharing memory with the array.array columns), or as masked
+        arrays when they contain NULLs. NumPy must be installed for that.
+        """
+        self._check_executed()
+        result = self._result
+        if result is None or result.columns is None:
+            return {}
+
+        names = []
+        for field in result.fields:
+            name = field.name
+            if name in names:
+                name = field.table_name + "." + name
+            names.append(name)
+
+        start = self.rownumber
+        self.rownumber = len(self._rows)
+        columns = {}
+        for name, column, typecode in zip(names, result.columns, result.typecodes):
+            if start:
+                column = column[start:]
+            if numpy:
+                column = to_numpy(column, typecode)
+            columns[name] = column
+        return columns
+
+
+def _has_sequence_arg(args):
+    if isinstance(args, dict):
+        args = args.values()
+    elif not isinstance(args, (tuple, list)):
+        return False
+    return any(isinstance(arg, (tuple, list)) for arg in args)
+
+
+class PreparedCursor(Cursor):
+    """
+    Cursor that runs parameterized queries as server-side prepared statements.
+
+    execute() with args prepares the query once per connection (it is kept
+    in the connection's statement cache) and sends only the parameter values
+    in binary form on every call: no client-side escaping, and the server
+    doesn't parse the statement again. Rows come back in the binary protocol
+    and are converted to the same Python values as with Cursor.
+
+    Queries use the usual %s or %(name)s placeholders. Without args a query
+    is sent as plain text, so statements that can't be prepared still work,
+    as does the multi-row INSERT built by executemany(). So are queries with
+    a list or tuple argument (``IN %s``), which only the client-side
+    escaping can expand.
+    """
+
+    def execute(self, query, args=None):
+        """Execute a query, as a prepared statement when args is given.
+
+        :param query: Query to execute.
+        :type query: str
+
+        :param args: Parameters used with query. (optional)
+        :type args: tuple, list or dict
+
+        :return: Number of affected rows.
+        :rtype: int
+        """
+        if args is None or _has_sequence_arg(args):
+            return super().execute(query, args)
+
+        while self.nextset():
+            pass
+
+        conn = self._get_db()
+        stmt = conn._prepare(query)
+        self._clear_result()
+        conn._execute_prepared(stmt, args)
+        self._do_get_result()
+        self._executed = query
+        return self.rowcount
+
+
+class PreparedDictCursor(DictCursorMixin, PreparedCursor):
+    """A prepared cursor which returns results as a dictionary"""
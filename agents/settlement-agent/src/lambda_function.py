@@ -3,6 +3,9 @@ import os
 from datetime import datetime
 from decimal import Decimal
 import json
+from pymysql.pool import ConnectionPool
+from handoff import add_leftovers, publish_handoff, resolve_handoff, select_trades
+from partitioning import get_partition, partition_clause, tag_response
 
 # Aurora DB config
 db_host = os.environ.get("DB_HOST")
@@ -11,8 +14,8 @@ db_password = os.environ.get("DB_PASSWORD")
 db_name = os.environ.get("DB_NAME")
 db_port = int(os.environ.get("DB_PORT", "3306"))
 
-def lambda_handler(event, context):
-    conn = pymysql.connect(
+def connect():
+    return pymysql.connect(
         host=db_host,
         user=db_user,
         passwd=db_password,
@@ -20,11 +23,21 @@ def lambda_handler(event, context):
         port=db_port,
         autocommit=False
     )
+
+# Reused across warm invocations, and shared by the threads of partitioned local runs
+connections = ConnectionPool(connect)
+
+def lambda_handler(event, context):
+    conn = connections.acquire()
     cursor = conn.cursor(pymysql.cursors.DictCursor)
+    partition = None
 
     try:
-        # Fetch reconciled trades ready for settlement
-        cursor.execute("""
+        partition = get_partition(event)
+        clause, params = partition_clause(partition, alias="t1")
+
+        # Fetch reconciled trades ready for settlement (the handed-over ones plus leftovers, if any)
+        trades = select_trades(cursor, """
             SELECT t1.trade_id, t1.broker_id, t1.contra_broker_id, t1.ticker, 
                    t1.quantity, t1.price, t1.date, t1.order_type,
                    t2.trade_id as contra_trade_id
@@ -34,11 +47,12 @@ def lambda_handler(event, context):
                                AND t2.broker_id = t1.contra_broker_id
             WHERE t1.status = 'RCND' AND t2.status = 'RCND'
               AND t1.broker_id < t2.broker_id
-        """)
-        trades = cursor.fetchall()
+        """ + clause, params, add_leftovers(cursor, resolve_handoff(event), "RCND", partition), alias="t1")
 
         timestamp = datetime.utcnow()
+        writes = []
         settled_count = 0
+        advanced = []
         failed_count = 0
 
         for trade in trades:
@@ -58,8 +72,8 @@ def lambda_handler(event, context):
 
             # Update both trades
             for tid in [trade_id, contra_trade_id]:
-                cursor.execute("UPDATE trades_data SET status = %s WHERE trade_id = %s", (new_status, tid))
-                cursor.execute("""
+                writes.append(("UPDATE trades_data SET status = %s WHERE trade_id = %s", (new_status, tid)))
+                writes.append(("""
                     INSERT INTO trade_log (trade_id, status, errors, check_timestamp)
                     VALUES (%s, %s, %s, %s)
                 """, (
@@ -67,38 +81,45 @@ def lambda_handler(event, context):
                     new_status,
                     json.dumps(errors) if errors else None,
                     timestamp
-                ))
+                )))
 
             if not errors:
                 settled_count += 2
+                advanced.append(trade_id)
             else:
                 failed_count += 2
 
+        # One round trip per few hundred statements instead of one each
+        result = cursor.execute_batch(writes)
+        if result.error:
+            raise result.error
         conn.commit()
 
-        return {
+        summary = {
+            "total_trades_processed": len(trades) * 2,
+            "successful_settlements": settled_count,
+            "failed_settlements": failed_count
+        }
+        return tag_response({
             "statusCode": 200,
-            "body": json.dumps({
-                "message": "Settlement completed",
-                "total_trades_processed": len(trades) * 2,
-                "successful_settlements": settled_count,
-                "failed_settlements": failed_count
-            }),
+            "body": json.dumps({"message": "Settlement completed", **summary}),
             "headers": {
                 "Content-Type": "application/json"
-            }
-        }
+            },
+            "handoff": publish_handoff(advanced, "settlement")
+        }, partition, summary)
 
     except Exception as e:
         conn.rollback()
-        return {
+        return tag_response({
             "statusCode": 500,
             "body": json.dumps({"error": str(e)}),
             "headers": {
                 "Content-Type": "application/json"
-            }
-        }
+            },
+            "handoff": None
+        }, partition, {"failed_partitions": 1})
 
     finally:
         cursor.close()
-        conn.close()
+        connections.release(conn)
@@ -3,6 +3,9 @@ import os
 from datetime import datetime
 from decimal import Decimal
 import json
+from pymysql.pool import ConnectionPool
+from handoff import add_leftovers, publish_handoff, resolve_handoff, select_trades
+from partitioning import get_partition, partition_clause, tag_response
 
 # Aurora DB config
 db_host = os.environ.get("DB_HOST")
@@ -11,8 +14,8 @@ db_password = os.environ.get("DB_PASSWORD")
 db_name = os.environ.get("DB_NAME")
 db_port = int(os.environ.get("DB_PORT", "3306"))
 
-def lambda_handler(event, context):
-    conn = pymysql.connect(
+def connect():
+    return pymysql.connect(
         host=db_host,
         user=db_user,
         passwd=db_password,
@@ -20,14 +23,25 @@ def lambda_handler(event, context):
         port=db_port,
         autocommit=False
     )
+
+# Reused across warm invocations, and shared by the threads of partitioned local runs
+connections = ConnectionPool(connect)
+
+def lambda_handler(event, context):
+    conn = connections.acquire()
     cursor = conn.cursor(pymysql.cursors.DictCursor)
+    partition = None
 
     try:
-        cursor.execute("SELECT * FROM trades_data WHERE status = 'UMAT'")
-        trades = cursor.fetchall()
+        partition = get_partition(event)
+        clause, params = partition_clause(partition)
+        trades = select_trades(cursor, "SELECT * FROM trades_data WHERE status = 'UMAT'" + clause, params,
+                               add_leftovers(cursor, resolve_handoff(event), "UMAT", partition))
 
         matched_ids = set()
+        advanced = []
         timestamp = datetime.utcnow()
+        writes = []
 
         for i, t1 in enumerate(trades):
             if t1['trade_id'] in matched_ids:
@@ -64,62 +78,70 @@ def lambda_handler(event, context):
                 matched_ids.update([t1['trade_id'], t2['trade_id']])
 
                 if not errors:
+                    advanced.append(t1['trade_id'])
                     # Update both as MTCH
                     for tid in [t1['trade_id'], t2['trade_id']]:
-                        cursor.execute("UPDATE trades_data SET status='MTCH' WHERE trade_id=%s", (tid,))
-                        cursor.execute("""
+                        writes.append(("UPDATE trades_data SET status='MTCH' WHERE trade_id=%s", (tid,)))
+                        writes.append(("""
                             INSERT INTO trade_log (trade_id, status, errors, check_timestamp)
                             VALUES (%s, %s, %s, %s)
                         """, (
                             tid, "MTCH", json.dumps([]), timestamp
-                        ))
+                        )))
                 else:
                     # Field mismatch for matched ID — log ERR2
                     for tid in [t1['trade_id'], t2['trade_id']]:
-                        cursor.execute("UPDATE trades_data SET status='ERR2' WHERE trade_id=%s", (tid,))
-                        cursor.execute("""
+                        writes.append(("UPDATE trades_data SET status='ERR2' WHERE trade_id=%s", (tid,)))
+                        writes.append(("""
                             INSERT INTO trade_log (trade_id, status, errors, check_timestamp)
                             VALUES (%s, %s, %s, %s)
                         """, (
                             tid, "ERR2", json.dumps(errors), timestamp
-                        ))
+                        )))
 
                 matched = True
                 break
 
             if not matched:
                 # No matching trade_id found in the rest — UNMT
-                cursor.execute("UPDATE trades_data SET status='UNMT' WHERE trade_id=%s", (t1['trade_id'],))
-                cursor.execute("""
+                writes.append(("UPDATE trades_data SET status='UNMT' WHERE trade_id=%s", (t1['trade_id'],)))
+                writes.append(("""
                     INSERT INTO trade_log (trade_id, status, errors, check_timestamp)
                     VALUES (%s, %s, %s, %s)
                 """, (
                     t1['trade_id'], "UNMT", json.dumps(["No matching trade_id found"]), timestamp
-                ))
+                )))
 
+        # One round trip per few hundred statements instead of one each
+        result = cursor.execute_batch(writes)
+        if result.error:
+            raise result.error
         conn.commit()
 
-        return {
+        summary = {
+            "logs_written": len(trades),
+            "matched_trades": len(matched_ids) // 2
+        }
+        return tag_response({
             "statusCode": 200,
-            "body": json.dumps({
-                "logs_written": len(trades),
-                "matched_trades": len(matched_ids) // 2
-            }),
+            "body": json.dumps(summary),
             "headers": {
                 "Content-Type": "application/json"
-            }
-        }
+            },
+            "handoff": publish_handoff(advanced, "trade-matching")
+        }, partition, summary)
 
     except Exception as e:
         conn.rollback()
-        return {
+        return tag_response({
             "statusCode": 500,
             "body": json.dumps({"error": str(e)}),
             "headers": {
                 "Content-Type": "application/json"
-            }
-        }
+            },
+            "handoff": None
+        }, partition, {"failed_partitions": 1})
 
     finally:
         cursor.close()
-        conn.close()
+        connections.release(conn)
@@ -0,0 +1,204 @@
+"""
+Generated row and column parsers for text protocol result sets
+"""
+
+import datetime
+
+from . import converters as _converters
+
+
+DEBUG = False
+# Parsers are cached by column layout; cleared when it grows past this
+CACHE_SIZE = 256
+
+_cache = {}
+
+
+def make_row_parser(columns):
+    """Return a parse_row(data, start, end) function for one result set layout.
+
+    `columns` is MySQLResult.converters, a list of (encoding, converter)
+    pairs. The generated function decodes one row packet, found at
+    data[start:end], into a tuple. It is straight-line code with the column
+    count, encodings and converters baked in, so the per-column work is one
+    length byte check, one slice and the conversion itself. It returns None
+    if the packet doesn't match the layout (fewer columns, for one); the
+    caller then falls back to MySQLResult._read_row_from_packet. Anything
+    else it raises, a converter error say, is a real error.
+    """
+    return _cached(("row", tuple(columns)), _build_row_parser)
+
+
+def make_column_parser(columns, typecodes, appends, null):
+    """Return a parse_into(data, start, end) function that decodes one row packet into columns.
+
+    Like make_row_parser, but each value is passed to the column's entry in
+    `appends` instead of being collected into a tuple, and parse_into
+    returns True. NULLs in columns with a typecode (array.array columns,
+    which can't hold None) are reported as null(column index) instead. A
+    packet that doesn't match the layout returns None and may leave some
+    columns one value longer than the others.
+    """
+    bind = _cached(("columns", tuple(columns), tuple(typecodes)), _build_column_parser)
+    return bind(appends, null)
+
+
+def _cached(key, build):
+    try:
+        parser = _cache.get(key)
+    except TypeError:  # unhashable custom converter
+        return build(*key[1:])
+    if parser is None:
+        if len(_cache) >= CACHE_SIZE:
+            _cache.clear()
+        parser = _cache[key] = build(*key[1:])
+    return parser
+
+
+def _namespace(columns):
+    return {
+        "_long": _read_long_column,
+        "_columns": columns,
+        "_datetime": _datetime,
+        "_date": _date,
+    }
+
+
+def _column_code(i, value, store, store_null, store_long, indent="    "):
+    """Decode column i at data[p] and advance p past it, or return None if the packet ends first."""
+    lines = []
+    if i:
+        lines += [
+            "if p >= end:",
+            "    return None",
+        ]
+    lines += [
+        "n = data[p]",
+        "if n < 251:",
+        "    p += 1 + n",
+        "    " + store.format(value),
+        "elif n == 251:",
+        "    p += 1",
+        "    " + store_null,
+        "else:",
+        f"    v = _long(data, p, end, _columns[{i}])",
+        "    if v is None:",
+        "        return None",
+        "    v, p = v",
+        "    " + store_long,
+    ]
+    return [indent + line for line in lines]
+
+
+def _compile(lines, namespace, name):
+    source = "\n".join(lines)
+    if DEBUG:
+        print(source)
+    exec(compile(source, "<pymysql row parser>", "exec"), namespace)
+    return namespace[name]
+
+
+def _build_row_parser(columns):
+    namespace = _namespace(columns)
+    lines = ["def parse_row(data, p, end):"]
+    values = []
+    for i, (encoding, converter) in enumerate(columns):
+        value = _conversion(i, encoding, converter, "data[p - n : p]", namespace)
+        lines += _column_code(i, value, f"v{i} = {{}}", f"v{i} = None", f"v{i} = v")
+        values.append(f"v{i}")
+    lines += [
+        "    if p != end:",
+        "        return None",
+        f"    return ({''.join(v + ', ' for v in values)})",
+    ]
+    return _compile(lines, namespace, "parse_row")
+
+
+def _build_column_parser(columns, typecodes):
+    namespace = _namespace(columns)
+    appends = "".join(f"ap{i}, " for i in range(len(columns)))
+    lines = [
+        "def bind(_appends, _null):",
+        f"    ({appends}) = _appends",
+        "",
+        "    def parse_into(data, p, end):",
+    ]
+    for i, (encoding, converter) in enumerate(columns):
+        value = _conversion(i, encoding, converter, "data[p - n : p]", namespace)
+        null = f"_null({i})" if typecodes[i] else f"ap{i}(None)"
+        lines += _column_code(i, value, f"ap{i}({{}})", null, f"ap{i}(v)", indent="        ")
+    lines += [
+        "        if p != end:",
+        "            return None",
+        "        return True",
+        "",
+        "    return parse_into",
+    ]
+    return _compile(lines, namespace, "bind")
+
+
+def _conversion(i, encoding, converter, value, namespace):
+    """Python expression converting the column bytes `value` like _read_row_from_packet does."""
+    if converter is None:
+        return value if encoding is None else f"{value}.decode({encoding!r})"
+    if converter is int or converter is float:
+        # Both accept ASCII digits as bytes; skip the decode
+        return f"{converter.__name__}({value})"
+    if converter is _converters.convert_datetime:
+        return f"_datetime({value}.decode({encoding or 'ascii'!r}))"
+    if converter is _converters.convert_date:
+        return f"_date({value}.decode({encoding or 'ascii'!r}))"
+    namespace[f"conv{i}"] = converter
+    if encoding is None:
+        return f"conv{i}({value})"
+    return f"conv{i}({value}.decode({encoding!r}))"
+
+
+def _datetime(value):
+    # fromisoformat is much faster than convert_datetime's regex and agrees
+    # with it on every well-formed DATETIME/TIMESTAMP; anything else (zero
+    # dates, invalid days) goes through convert_datetime as before.
+    if len(value) >= 19:
+        try:
+            return datetime.datetime.fromisoformat(value)
+        except ValueError:
+            pass
+    return _converters.convert_datetime(value)
+
+
+def _date(value):
+    if len(value) == 10:
+        try:
+            return datetime.date.fromisoformat(value)
+        except ValueError:
+            pass
+    return _converters.convert_date(value)
+
+
+def _read_long_column(data, p, end, column):
+    """Read a column of 251+ bytes (2, 3 or 8 byte length prefix) at data[p].
+
+    Returns (value, position after it), or None if the header is invalid or
+    the column runs past `end`.
+    """
+    n = data[p]
+    if n == 252:
+        length = data[p + 1] | data[p + 2] << 8
+        p += 3
+    elif n == 253:
+        length = data[p + 1] | data[p + 2] << 8 | data[p + 3] << 16
+        p += 4
+    elif n == 254:
+        length = int.from_bytes(data[p + 1 : p + 9], "little")
+        p += 9
+    else:
+        return None
+    if p + length > end:
+        return None
+    value = data[p : p + length]
+    encoding, converter = column
+    if encoding is not None:
+        value = value.decode(encoding)
+    if converter is not None:
+        value = converter(value)
+    return value, p + length
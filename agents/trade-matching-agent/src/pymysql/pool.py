@@ -0,0 +1,312 @@
+"""
+Thread-safe connection pool
+"""
+
+import collections
+import contextlib
+import functools
+import threading
+import time
+
+from . import err
+from .connections import Connection
+from .constants import SERVER_STATUS
+
+
+class PoolTimeoutError(err.OperationalError):
+    """No connection became available within the acquire timeout."""
+
+
+class ConnectionPool:
+    """
+    A pool of open connections shared by threads.
+
+    :param connect: Callable returning a new Connection. (default: Connection(**kwargs))
+    :param min_size: Connections opened up front and kept through idle eviction. (default: 0)
+    :param max_size: Most connections open at once, in use or idle. (default: 10)
+    :param timeout: Seconds acquire() waits for a connection when max_size
+        are in use; None waits forever. (default: 30)
+    :param max_lifetime: Seconds after which a connection is closed instead
+        of being reused; None keeps it indefinitely. (default: 3600)
+    :param max_idle: Seconds an idle connection is kept above min_size; None
+        keeps it indefinitely. (default: 600)
+    :param ping_interval: A connection idle for longer than this many seconds
+        is pinged before acquire() returns it, and replaced if the ping fails;
+        None never pings. (default: 30)
+
+    Other keyword arguments are passed to Connection when `connect` isn't given.
+
+    acquire() returns the most recently released idle connection, opening a
+    new one while fewer than max_size exist, and otherwise blocks. release()
+    resets the session for the next user: an open transaction is rolled
+    back and autocommit is restored to what the connection started with.
+    A connection that fails to reset, was left with an unfinished unbuffered
+    result, or is past max_lifetime is closed instead. stats() reports the
+    pool's size and counters for acquire waits and connections in use.
+
+    Use ``with pool.connection() as conn:`` to release automatically.
+    """
+
+    def __init__(
+        self,
+        connect=None,
+        *,
+        min_size=0,
+        max_size=10,
+        timeout=30.0,
+        max_lifetime=3600.0,
+        max_idle=600.0,
+        ping_interval=30.0,
+        **kwargs,
+    ):
+        if connect is None:
+            connect = functools.partial(Connection, **kwargs)
+        elif kwargs:
+            raise TypeError("Pass either connect or Connection arguments, not both")
+        if max_size < 1 or not 0 <= min_size <= max_size:
+            raise ValueError("Need 0 <= min_size <= max_size and max_size >= 1")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_lifetime = max_lifetime
+        self.max_idle = max_idle
+        self.ping_interval = ping_interval
+
+        self._cond = threading.Condition()
+        # (connection, released at); acquire() takes from the right
+        self._idle = collections.deque()
+        # connection -> (opened at, autocommit), for every open connection
+        self._conns = {}
+        self._size = 0  # open connections plus ones being opened
+        self._closed = False
+
+        self._in_use = 0
+        self._max_in_use = 0
+        self._acquires = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._max_wait = 0.0
+        self._timeouts = 0
+        self._opened = 0
+        self._discarded = 0
+
+        for _ in range(min_size):
+            with self._cond:
+                self._size += 1
+            conn = self._open()
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def acquire(self, timeout=-1):
+        """Return a connection, waiting up to `timeout` seconds for one
+        (default: the pool's timeout).
+
+        :raise PoolTimeoutError: If none became available in time.
+        :raise InterfaceError: If the pool is closed.
+        """
+        if timeout == -1:
+            timeout = self.timeout
+        start = time.monotonic()
+        deadline = None if timeout is None else start + timeout
+        waited = False
+        timed_out = None
+        expired = []
+
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise err.InterfaceError(0, "Connection pool is closed")
+                expired += self._evict(time.monotonic())
+                if self._idle:
+                    conn, released = self._idle.pop()
+                    break
+                if self._size < self.max_size:
+                    self._size += 1
+                    conn = released = None
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._timeouts += 1
+                    timed_out = PoolTimeoutError(
+                        f"No connection available within {timeout}s "
+                        f"({self._in_use} of {self.max_size} in use)"
+                    )
+                    break
+                waited = True
+                self._cond.wait(remaining)
+
+            now = time.monotonic()
+            if not timed_out:
+                self._acquires += 1
+                if waited:
+                    self._waits += 1
+                    self._wait_time += now - start
+                    self._max_wait = max(self._max_wait, now - start)
+                self._in_use += 1
+                self._max_in_use = max(self._max_in_use, self._in_use)
+
+        self._close_all(expired)
+        if timed_out:
+            raise timed_out
+        try:
+            if conn is None:
+                return self._open()
+            if self.ping_interval is not None and now - released > self.ping_interval:
+                try:
+                    conn.ping(reconnect=False)
+                except err.Error:
+                    # Replace it, keeping its slot
+                    with self._cond:
+                        self._forget(conn)
+                        self._size += 1
+                    self._close_all([conn])
+                    return self._open()
+            return conn
+        except BaseException:
+            with self._cond:
+                self._in_use -= 1
+                self._cond.notify()
+            raise
+
+    def release(self, conn):
+        """Reset `conn` and return it to the pool (or close it; see the class docstring)."""
+        with self._cond:
+            if conn not in self._conns:
+                raise err.ProgrammingError("Connection doesn't belong to this pool")
+            opened, autocommit = self._conns[conn]
+        try:
+            keep = self._reset(conn, opened, autocommit)
+        except Exception:
+            keep = False
+        with self._cond:
+            self._in_use -= 1
+            keep = keep and not self._closed
+            if keep:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._forget(conn)
+            self._cond.notify()
+        if not keep:
+            self._close_all([conn])
+
+    def discard(self, conn):
+        """Close an acquired connection that is known to be unusable instead of releasing it."""
+        with self._cond:
+            self._forget(conn)
+            self._in_use -= 1
+            self._cond.notify()
+        self._close_all([conn])
+
+    @contextlib.contextmanager
+    def connection(self, timeout=-1):
+        """Acquire a connection for the duration of a with block."""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Close idle connections; ones in use are closed when released."""
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            for conn in idle:
+                self._forget(conn)
+            self._cond.notify_all()
+        self._close_all(idle)
+
+    def stats(self):
+        """Return a dict of the pool's current size and its counters."""
+        with self._cond:
+            return {
+                "size": self._size,
+                "idle": len(self._idle),
+                "in_use": self._in_use,
+                "max_in_use": self._max_in_use,
+                "acquires": self._acquires,
+                "waits": self._waits,
+                "wait_time": self._wait_time,
+                "max_wait": self._max_wait,
+                "timeouts": self._timeouts,
+                "opened": self._opened,
+                "discarded": self._discarded,
+            }
+
+    def _open(self):
+        # The caller has already counted this connection in _size
+        try:
+            conn = self._connect()
+        except BaseException:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._conns[conn] = (time.monotonic(), conn.get_autocommit())
+            self._opened += 1
+        return conn
+
+    def _reset(self, conn, opened, autocommit):
+        if not conn.open:
+            return False
+        if self.max_lifetime is not None and time.monotonic() - opened > self.max_lifetime:
+            return False
+        result = conn._result
+        if result is not None and result.unbuffered_active:
+            # Draining the rest of the result could take arbitrarily long
+            return False
+        if conn.server_status & SERVER_STATUS.SERVER_STATUS_IN_TRANS:
+            conn.rollback()
+        if conn.get_autocommit() != autocommit:
+            conn.autocommit(autocommit)
+        return True
+
+    def _evict(self, now):
+        """Take expired idle connections out of the pool and return them.
+
+        Called with the lock held; the caller closes them after releasing it.
+        """
+        expired = []
+        keep = collections.deque()
+        for conn, released in self._idle:
+            opened = self._conns[conn][0]
+            if self.max_lifetime is not None and now - opened > self.max_lifetime:
+                expired.append(conn)
+            else:
+                keep.append((conn, released))
+        # Oldest-released first, down to min_size
+        while (
+            self.max_idle is not None
+            and keep
+            and self._size - len(expired) > self.min_size
+            and now - keep[0][1] > self.max_idle
+        ):
+            expired.append(keep.popleft()[0])
+        self._idle = keep
+        for conn in expired:
+            self._forget(conn)
+        return expired
+
+    def _forget(self, conn):
+        # Called with the lock held
+        if self._conns.pop(conn, None) is not None:
+            self._size -= 1
+            self._discarded += 1
+            self._cond.notify()
+
+    def _close_all(self, conns):
+        for conn in conns:
+            try:
+                conn.close()
+            except Exception:
+                pass
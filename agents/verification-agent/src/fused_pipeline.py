@@ -0,0 +1,360 @@
+import json
+import os
+from datetime import datetime
+from decimal import Decimal
+
+import pymysql
+
+from lambda_function import connections, load_json_from_s3, validate_trade
+from partitioning import get_partition, partition_clause, tag_response
+
+# Fused verify -> match -> reconcile -> settle.
+#
+# The per-stage agents each re-select their input from trades_data by status,
+# rewrite the status and append to trade_log, so every trade crosses the
+# network four times and gets four UPDATEs. This handler pulls a batch of
+# unverified trade_ids once, runs the same four checks in memory and writes
+# the final status plus the full trade_log history in one bulk write per
+# batch. Statuses and trade_log rows are the same as running the four agents
+# back to back on that batch; the per-stage Lambdas are unchanged.
+#
+# Like the reconciliation agent, every run first retries the trades left at
+# MTCH by earlier runs (not found in dtcc_data, or an order type mismatch):
+# they are reconciled and settled again before any new batch is taken.
+#
+# Batches are read with FOR UPDATE, so concurrent workers never process (and
+# log) the same legs twice: a worker that reaches legs another one holds
+# waits for its commit and then no longer sees them at the status it wants.
+#
+# Only the matching/reconciliation/settlement rules are repeated here, since
+# those agents ship as separate packages; verification reuses validate_trade.
+
+BATCH_SIZE = int(os.environ.get("FUSED_BATCH_SIZE", "5000"))
+# Stop taking new batches when less than this much Lambda time is left
+TIME_MARGIN_MS = int(os.environ.get("FUSED_TIME_MARGIN_MS", "10000"))
+
+# Oldest unverified trade_ids (in the event's partition, if any) first, with all their legs
+SELECT_BATCH = """
+    SELECT t.* FROM trades_data t
+    JOIN (
+        SELECT trade_id FROM trades_data
+        WHERE status = ''{partition}
+        GROUP BY trade_id
+        ORDER BY MIN(id)
+        LIMIT %s
+    ) batch ON batch.trade_id = t.trade_id
+    WHERE t.status = ''
+    ORDER BY t.id
+    FOR UPDATE
+"""
+
+# Trade_ids left at MTCH, after the one with first leg id %s, with their MTCH legs
+SELECT_LEFTOVERS = """
+    SELECT t.* FROM trades_data t
+    JOIN (
+        SELECT trade_id FROM trades_data
+        WHERE status = 'MTCH'{partition}
+        GROUP BY trade_id
+        HAVING MIN(id) > %s
+        ORDER BY MIN(id)
+        LIMIT %s
+    ) batch ON batch.trade_id = t.trade_id
+    WHERE t.status = 'MTCH'
+    ORDER BY t.id
+    FOR UPDATE
+"""
+
+INSERT_LOG = """
+    INSERT INTO trade_log (trade_id, status, errors, check_timestamp)
+    VALUES (%s, %s, %s, %s)
+"""
+
+RECONCILE_FIELDS = ['ticker', 'quantity', 'price', 'date', 'order_type']
+
+
+def group_by_trade_id(rows):
+    groups = {}
+    for row in rows:
+        groups.setdefault(row['trade_id'], []).append(row)
+    return groups
+
+
+def verify(trades, rules, status, log):
+    holidays = rules.get("holidays", [])
+    reference_prices = rules.get("price_validation", {}).get("reference_prices", {})
+    instruments = list(reference_prices.keys())
+    timestamp = datetime.utcnow()
+
+    for trade in trades:
+        result, errors = validate_trade(trade, rules, reference_prices, holidays, instruments)
+        log.append((trade['trade_id'], "VERF" if result == "UMAT" else "ERR1", json.dumps(errors), timestamp))
+        # Status is keyed by trade_id, so the last leg verified wins
+        status[trade['trade_id']] = result
+
+
+def match_errors(t1, t2):
+    errors = []
+    if t1['ticker'] != t2['ticker']:
+        errors.append("Mismatched ticker")
+    if Decimal(t1['price']) != Decimal(t2['price']):
+        errors.append("Mismatched price")
+    if t1['quantity'] != t2['quantity']:
+        errors.append("Mismatched quantity")
+    if t1['date'] != t2['date']:
+        errors.append("Mismatched date")
+    if t1['order_type'] == t2['order_type']:
+        errors.append("Same order_type")
+    if t1['broker_id'] != t2['contra_broker_id']:
+        errors.append("broker_id ≠ contra_broker_id")
+    if t1['contra_broker_id'] != t2['broker_id']:
+        errors.append("contra_broker_id ≠ broker_id")
+    return errors
+
+
+def match(groups, status, log):
+    timestamp = datetime.utcnow()
+    matched = 0
+
+    for trade_id, legs in groups.items():
+        if status[trade_id] != "UMAT":
+            continue
+        if len(legs) < 2:
+            status[trade_id] = "UNMT"
+            log.append((trade_id, "UNMT", json.dumps(["No matching trade_id found"]), timestamp))
+            continue
+
+        # Like the matching agent, the first two legs are paired and any others skipped
+        errors = match_errors(legs[0], legs[1])
+        result = "ERR2" if errors else "MTCH"
+        status[trade_id] = result
+        for _ in range(2):
+            log.append((trade_id, result, json.dumps(errors), timestamp))
+        matched += 1
+    return matched
+
+
+def field_value(row, field):
+    return str(Decimal(row[field])) if field == 'price' else str(row[field])
+
+
+def fields_match(trade, dtcc, fields):
+    return all(field_value(trade, f) == field_value(dtcc, f) for f in fields)
+
+
+def reconcile(groups, dtcc_groups, status, log):
+    timestamp = datetime.utcnow()
+    counts = {"reconciled_count": 0, "skipped_order_type_mismatch": 0, "mismatches_logged": 0}
+    reconciled_ids = []
+
+    for trade_id, legs in groups.items():
+        if status[trade_id] != "MTCH":
+            continue
+        dtcc_trades = dtcc_groups.get(trade_id, [])
+
+        for trade in legs:
+            if not dtcc_trades:
+                log.append((trade_id, "ERR3", json.dumps(["Not found in dtcc_data"]), timestamp))
+                continue
+
+            if any(fields_match(trade, dtcc, RECONCILE_FIELDS) for dtcc in dtcc_trades):
+                status[trade_id] = "RCND"
+                log.append((trade_id, "RCND", json.dumps([]), timestamp))
+                counts["reconciled_count"] += 1
+                continue
+
+            if any(fields_match(trade, dtcc, RECONCILE_FIELDS[:-1]) for dtcc in dtcc_trades):
+                log.append((trade_id, "SKIP", json.dumps(["Order type mismatch only, skipped reconciliation"]),
+                            timestamp))
+                counts["skipped_order_type_mismatch"] += 1
+                continue
+
+            reference_dtcc = dtcc_trades[0]
+            errors = [
+                f"Mismatch in {field}: trades_data='{field_value(trade, field)}' "
+                f"vs dtcc_data='{field_value(reference_dtcc, field)}'"
+                for field in RECONCILE_FIELDS
+                if field_value(trade, field) != field_value(reference_dtcc, field)
+            ]
+            log.append((trade_id, "ERR3", json.dumps(errors), timestamp))
+            counts["mismatches_logged"] += 1
+
+        if status[trade_id] == "RCND":
+            reconciled_ids.append(trade_id)
+    return counts, reconciled_ids
+
+
+def settle(groups, status, log):
+    timestamp = datetime.utcnow()
+    counts = {"successful_settlements": 0, "failed_settlements": 0}
+
+    for trade_id, legs in groups.items():
+        if status[trade_id] != "RCND":
+            continue
+        # Same pairing as the settlement agent's self-join on trades_data
+        pairs = [
+            (t1, t2) for t1 in legs for t2 in legs
+            if t1['broker_id'] == t2['contra_broker_id']
+            and t2['broker_id'] == t1['contra_broker_id']
+            and t1['broker_id'] < t2['broker_id']
+        ]
+        for t1, _ in pairs:
+            errors = []
+            try:
+                if Decimal(str(t1['price'])) <= 0:
+                    errors.append("Invalid price (must be positive)")
+                if t1['quantity'] <= 0:
+                    errors.append("Invalid quantity (must be positive)")
+            except Exception as e:
+                errors.append(f"Validation error: {str(e)}")
+
+            result = 'STLD' if not errors else 'ERR5'
+            status[trade_id] = result
+            for _ in range(2):
+                log.append((trade_id, result, json.dumps(errors) if errors else None, timestamp))
+            counts["successful_settlements" if not errors else "failed_settlements"] += 2
+    return counts
+
+
+def process_batch(cursor, trades, rules):
+    """Run all four stages over one batch and write the outcome. Returns per-stage counts."""
+    groups = group_by_trade_id(trades)
+    status = {}
+    log = []
+
+    verify(trades, rules, status, log)
+    matched = match(groups, status, log)
+    counts = reconcile_and_settle(cursor, groups, status, log)
+    by_status = write_outcome(cursor, status, log, "", counts.pop("reconciled_ids"))
+
+    return {
+        "trades_verified": len(trades),
+        "matched_trades": matched,
+        **counts,
+        "logs_written": len(log),
+        "final_statuses": {s: len(ids) for s, ids in by_status.items()},
+    }
+
+
+def process_leftovers(cursor, trades):
+    """Reconcile and settle trades left at MTCH by earlier runs. Returns per-stage counts."""
+    groups = group_by_trade_id(trades)
+    status = {trade_id: "MTCH" for trade_id in groups}
+    log = []
+
+    counts = reconcile_and_settle(cursor, groups, status, log)
+    by_status = write_outcome(cursor, status, log, "MTCH", counts.pop("reconciled_ids"))
+    by_status.pop("MTCH", None)  # still waiting for dtcc_data; not a change
+
+    return {
+        **counts,
+        "logs_written": len(log),
+        "final_statuses": {s: len(ids) for s, ids in by_status.items()},
+    }
+
+
+def reconcile_and_settle(cursor, groups, status, log):
+    to_reconcile = [trade_id for trade_id in groups if status[trade_id] == "MTCH"]
+    dtcc_groups = {}
+    if to_reconcile:
+        cursor.execute("SELECT * FROM dtcc_data WHERE trade_id IN %s ORDER BY id", (to_reconcile,))
+        dtcc_groups = group_by_trade_id(cursor.fetchall())
+    reconcile_counts, reconciled_ids = reconcile(groups, dtcc_groups, status, log)
+    settle_counts = settle(groups, status, log)
+    return {**reconcile_counts, **settle_counts, "reconciled_ids": reconciled_ids}
+
+
+def write_outcome(cursor, status, log, claimed_status, reconciled_ids):
+    """Write the trade_log rows and final statuses of legs read at claimed_status.
+
+    Returns the trade_ids by final status.
+    """
+    cursor.executemany(INSERT_LOG, log)
+
+    by_status = {}
+    for trade_id, final_status in status.items():
+        by_status.setdefault(final_status, []).append(trade_id)
+    updates = [(final_status, trade_ids, claimed_status)
+               for final_status, trade_ids in by_status.items() if final_status != claimed_status]
+    cursor.executemany("UPDATE trades_data SET status=%s WHERE trade_id IN %s AND status = %s", updates)
+    if reconciled_ids:
+        cursor.execute("UPDATE dtcc_data SET status='RCND' WHERE trade_id IN %s", (reconciled_ids,))
+    return by_status
+
+
+def add_counts(totals, counts):
+    for key, value in counts.items():
+        if key == "final_statuses":
+            statuses = totals.setdefault(key, {})
+            for s, n in value.items():
+                statuses[s] = statuses.get(s, 0) + n
+        else:
+            totals[key] = totals.get(key, 0) + value
+
+
+def lambda_handler(event, context):
+    conn = None
+    cursor = None
+    partition = None
+    batch_size = int((event or {}).get("batch_size", BATCH_SIZE))
+
+    try:
+        partition = get_partition(event)
+        clause, params = partition_clause(partition)
+        select_batch = SELECT_BATCH.format(partition=clause)
+        select_leftovers = SELECT_LEFTOVERS.format(partition=clause)
+        rules = load_json_from_s3('rules.json')
+
+        conn = connections.acquire()
+        cursor = conn.cursor(pymysql.cursors.DictCursor)
+
+        totals = {}
+        batches = 0
+
+        # Earlier runs' MTCH leftovers first, so this run's own are only tried once
+        after_id = 0
+        while True:
+            cursor.execute(select_leftovers, (*params, after_id, batch_size))
+            trades = cursor.fetchall()
+            if not trades:
+                break
+            after_id = max(legs[0]['id'] for legs in group_by_trade_id(trades).values())
+            add_counts(totals, process_leftovers(cursor, trades))
+            conn.commit()
+            batches += 1
+            if context is not None and context.get_remaining_time_in_millis() < TIME_MARGIN_MS:
+                break
+
+        while True:
+            cursor.execute(select_batch, (*params, batch_size))
+            trades = cursor.fetchall()
+            if not trades:
+                break
+
+            add_counts(totals, process_batch(cursor, trades, rules))
+            conn.commit()
+            batches += 1
+
+            if context is not None and context.get_remaining_time_in_millis() < TIME_MARGIN_MS:
+                break
+
+        return tag_response({
+            "statusCode": 200,
+            "body": json.dumps({"batches": batches, **totals}),
+            "headers": {"Content-Type": "application/json"}
+        }, partition, {key: value for key, value in totals.items() if key != "final_statuses"})
+
+    except Exception as e:
+        if conn:
+            conn.rollback()
+        print(f"Error in fused pipeline: {e}")
+        return tag_response({
+            "statusCode": 500,
+            "body": json.dumps({"error": str(e)}),
+            "headers": {"Content-Type": "application/json"}
+        }, partition, {"failed_partitions": 1})
+
+    finally:
+        if cursor:
+            cursor.close()
+        if conn:
+            connections.release(conn)
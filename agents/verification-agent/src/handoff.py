@@ -0,0 +1,136 @@
+import json
+import os
+
+from partitioning import partition_clause
+
+# Stage-to-stage trade_id handoff.
+#
+# Each agent returns the trade_ids it advanced as "handoff" in its response,
+# and the next agent fetches exactly those (still guarded by its status
+# filter) instead of scanning trades_data by status:
+#
+#   {"trade_ids": [...]}                                  small sets, inline
+#   {"claim_check": {"bucket": ..., "key": ...}, "count": n}   large sets in S3
+#   {"claim_check": {"path": ...}, "count": n}            large sets on local disk
+#
+# Step Functions payloads are capped at 256KB and a Map state carries every
+# partition's handoff, so lists over HANDOFF_INLINE_LIMIT go to HANDOFF_BUCKET
+# (or HANDOFF_DIR when running locally); each stage's template.yml sets
+# HANDOFF_BUCKET. With neither configured a large handoff is null, with a
+# warning, and the next stage falls back to its status scan, as it does when
+# invoked without one. Claim-check objects are left for a lifecycle rule to
+# expire, so retried stages can still read them.
+#
+# A handoff only lists what the previous stage advanced in this run. Trades an
+# earlier run left at a stage's status (the stage failed or rolled back, or
+# an outcome such as reconciliation's ERR3/SKIP kept the status) are never
+# handed over again, so add_leftovers() tops the handoff up with a bounded
+# sweep of up to HANDOFF_SWEEP_LIMIT other trade_ids at that status. The sweep
+# starts at a random id and wraps around, so a backlog larger than the limit
+# is worked through over several runs instead of the same trades every time.
+#
+# This file is identical in every agent's src/ directory.
+
+INLINE_LIMIT = int(os.environ.get("HANDOFF_INLINE_LIMIT", "500"))
+HANDOFF_BUCKET = os.environ.get("HANDOFF_BUCKET")
+HANDOFF_DIR = os.environ.get("HANDOFF_DIR")
+# trade_ids per IN (...) lookup
+FETCH_CHUNK = 5000
+# Leftover trade_ids added to a handoff per run
+SWEEP_LIMIT = int(os.environ.get("HANDOFF_SWEEP_LIMIT", "500"))
+
+
+def publish_handoff(trade_ids, stage):
+    """Return the handoff for the next stage, parking large lists in a claim-check object."""
+    trade_ids = list(dict.fromkeys(trade_ids))
+    if len(trade_ids) <= INLINE_LIMIT:
+        return {"trade_ids": trade_ids}
+
+    import uuid  # only needed here; it pulls in platform at import
+
+    body = json.dumps({"trade_ids": trade_ids})
+    key = f"handoff/{stage}/{uuid.uuid4()}.json"
+    if HANDOFF_BUCKET:
+        import boto3
+
+        boto3.client("s3").put_object(Bucket=HANDOFF_BUCKET, Key=key, Body=body.encode("utf-8"),
+                                      ContentType="application/json")
+        return {"claim_check": {"bucket": HANDOFF_BUCKET, "key": key}, "count": len(trade_ids)}
+    if HANDOFF_DIR:
+        path = os.path.join(HANDOFF_DIR, key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "w") as f:
+            f.write(body)
+        return {"claim_check": {"path": path}, "count": len(trade_ids)}
+    print(f"WARNING: {stage} handoff of {len(trade_ids)} trade_ids dropped: over HANDOFF_INLINE_LIMIT "
+          f"({INLINE_LIMIT}) and neither HANDOFF_BUCKET nor HANDOFF_DIR is set; "
+          f"the next stage will scan by status")
+    return None
+
+
+def resolve_handoff(event):
+    """Return the trade_ids handed to this stage, or None if it should scan by status."""
+    handoff = event.get("handoff") if isinstance(event, dict) else None
+    if not handoff:
+        return None
+    if "trade_ids" in handoff:
+        return handoff["trade_ids"]
+
+    claim_check = handoff["claim_check"]
+    if "path" in claim_check:
+        with open(claim_check["path"]) as f:
+            return json.load(f)["trade_ids"]
+    import boto3
+
+    obj = boto3.client("s3").get_object(Bucket=claim_check["bucket"], Key=claim_check["key"])
+    return json.loads(obj["Body"].read())["trade_ids"]
+
+
+def add_leftovers(cursor, trade_ids, status, partition):
+    """Return the handed-over trade_ids plus up to SWEEP_LIMIT others still at `status`.
+
+    None (no handoff: the stage scans by status anyway) is returned as is.
+    """
+    if trade_ids is None or SWEEP_LIMIT <= 0:
+        return trade_ids
+
+    clause, params = partition_clause(partition)
+    cursor.execute("SELECT MIN(id) AS low, MAX(id) AS high FROM trades_data WHERE status = %s", (status,))
+    bounds = cursor.fetchone()
+    if bounds["low"] is None:
+        return trade_ids
+
+    import random  # only needed with a handoff
+
+    pivot = random.randint(bounds["low"], bounds["high"])
+    handed = set(trade_ids)
+    leftovers = {}
+    # Range scans on idx_status_id: from the pivot to the end, then from the start
+    for condition in ("id >= %s", "id < %s"):
+        cursor.execute(
+            f"SELECT trade_id FROM trades_data WHERE status = %s{clause} AND {condition} ORDER BY id LIMIT %s",
+            (status, *params, pivot, 2 * SWEEP_LIMIT))
+        for row in cursor.fetchall():
+            if row["trade_id"] not in handed:
+                leftovers[row["trade_id"]] = None
+        if len(leftovers) >= SWEEP_LIMIT:
+            break
+    return list(trade_ids) + list(leftovers)[:SWEEP_LIMIT]
+
+
+def select_trades(cursor, query, params, trade_ids, alias=None):
+    """Run `query` (which ends in a WHERE clause) over the whole table, or only for `trade_ids`.
+
+    Lookups go through the unique (trade_id, order_type) index in chunks, so
+    every leg of a trade_id always comes back in the same chunk.
+    """
+    if trade_ids is None:
+        cursor.execute(query, params)
+        return list(cursor.fetchall())
+
+    column = f"{alias}.trade_id" if alias else "trade_id"
+    rows = []
+    for start in range(0, len(trade_ids), FETCH_CHUNK):
+        cursor.execute(f"{query} AND {column} IN %s", (*params, trade_ids[start:start + FETCH_CHUNK]))
+        rows.extend(cursor.fetchall())
+    return rows
@@ -1,13 +1,17 @@
 import json
-import boto3
 import pymysql
 from datetime import datetime, date
 import os
 from decimal import Decimal
+from pymysql.pool import ConnectionPool
+from handoff import add_leftovers, publish_handoff, resolve_handoff, select_trades
+from partitioning import get_partition, partition_clause, tag_response
 
 # S3 + Aurora Config
-s3 = boto3.client('s3')
 BUCKET = 'verification-agent-bucket'
+# boto3 takes longer to import than everything else here combined, so the
+# client is only created the first time rules are fetched from S3
+s3 = None
 
 # Environment variables for DB connection
 db_host = os.environ.get("DB_HOST")
@@ -16,8 +20,15 @@ db_password = os.environ.get("DB_PASSWORD")
 db_name = os.environ.get("DB_NAME")
 db_port = int(os.environ.get("DB_PORT", "3306"))
 
+def get_s3_client():
+    global s3
+    if s3 is None:
+        import boto3
+        s3 = boto3.client('s3')
+    return s3
+
 def load_json_from_s3(key):
-    obj = s3.get_object(Bucket=BUCKET, Key=key)
+    obj = get_s3_client().get_object(Bucket=BUCKET, Key=key)
     return json.loads(obj['Body'].read())
 
 def validate_trade(trade, rules, reference_prices, holidays, instruments):
@@ -61,39 +72,50 @@ def validate_trade(trade, rules, reference_prices, holidays, instruments):
 
     return "UMAT" if not errors else "ERR1", errors
 
+def connect():
+    return pymysql.connect(
+        host=db_host,
+        user=db_user,
+        passwd=db_password,
+        db=db_name,
+        port=db_port,
+        autocommit=False
+    )
+
+# Reused across warm invocations, and shared by the threads of partitioned local runs
+connections = ConnectionPool(connect)
+
 def lambda_handler(event, context):
     conn = None
     cursor = None
+    partition = None
 
     try:
+        partition = get_partition(event)
+
         # Load rule and reference data from S3
         rules = load_json_from_s3('rules.json')
         holidays = rules.get("holidays", [])
         reference_prices = rules.get("price_validation", {}).get("reference_prices", {})
         instruments = list(reference_prices.keys())
 
-        # DB connection
-        conn = pymysql.connect(
-            host=db_host,
-            user=db_user,
-            passwd=db_password,
-            db=db_name,
-            port=db_port,
-            autocommit=False
-        )
+        # DB connection (warm from the previous invocation when possible)
+        conn = connections.acquire()
         cursor = conn.cursor(pymysql.cursors.DictCursor)
 
-        # Fetch trades needing validation
-        cursor.execute("SELECT * FROM trades_data WHERE status = ''")
-        trades = cursor.fetchall()
+        # Fetch trades needing validation: the handed-over trade_ids and leftovers, or a status scan
+        clause, params = partition_clause(partition)
+        trades = select_trades(cursor, "SELECT * FROM trades_data WHERE status = ''" + clause, params,
+                               add_leftovers(cursor, resolve_handoff(event), "", partition))
         verification_logs = []
+        writes = []
 
         for trade in trades:
             status, errors = validate_trade(trade, rules, reference_prices, holidays, instruments)
             log_status = "VERF" if status == "UMAT" else "ERR1"
 
             # Log validation
-            cursor.execute("""
+            writes.append(("""
                 INSERT INTO trade_log (trade_id, status, errors, check_timestamp)
                 VALUES (%s, %s, %s, %s)
             """, (
@@ -101,10 +123,10 @@ def lambda_handler(event, context):
                 log_status,
                 json.dumps(errors),
                 datetime.utcnow()
-            ))
+            )))
 
             # Update trade status
-            cursor.execute("UPDATE trades_data SET status=%s WHERE trade_id=%s", (status, trade["trade_id"]))
+            writes.append(("UPDATE trades_data SET status=%s WHERE trade_id=%s", (status, trade["trade_id"])))
 
             verification_logs.append({
                 "trade_id": trade["trade_id"],
@@ -112,26 +134,37 @@ def lambda_handler(event, context):
                 "errors": errors
             })
 
+        # One round trip per few hundred statements instead of one each
+        result = cursor.execute_batch(writes)
+        if result.error:
+            raise result.error
         conn.commit()
 
-        return {
+        # Status is keyed by trade_id, so the last leg verified decides what advances
+        final_status = {log["trade_id"]: log["status"] for log in verification_logs}
+        return tag_response({
             "statusCode": 200,
             "body": json.dumps(verification_logs),
-            "headers": {"Content-Type": "application/json"}
-        }
+            "headers": {"Content-Type": "application/json"},
+            "handoff": publish_handoff([tid for tid, s in final_status.items() if s == "UMAT"], "verification")
+        }, partition, {
+            "verified": sum(1 for log in verification_logs if log["status"] == "UMAT"),
+            "verification_errors": sum(1 for log in verification_logs if log["status"] == "ERR1")
+        })
 
     except Exception as e:
         if conn:
             conn.rollback()
         print(f"Error verifying trades: {e}")
-        return {
+        return tag_response({
             "statusCode": 500,
             "body": json.dumps({"error": str(e)}),
-            "headers": {"Content-Type": "application/json"}
-        }
+            "headers": {"Content-Type": "application/json"},
+            "handoff": None
+        }, partition, {"failed_partitions": 1})
 
     finally:
         if cursor:
             cursor.close()
         if conn:
-            conn.close()
+            connections.release(conn)
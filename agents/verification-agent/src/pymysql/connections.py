@@ -7,16 +7,18 @@ import os
 import socket
 import struct
 import sys
-import traceback
 import warnings
+import zlib
 
 from . import _auth
+from ._columnar import ColumnRows, ColumnSink, column_typecode
+from ._prepared import PreparedStatement, make_binary_row_decoder, to_qmark
+from ._rowparser import make_column_parser, make_row_parser
 
 from .charset import charset_by_name, charset_by_id
 from .constants import CLIENT, COMMAND, CR, ER, FIELD_TYPE, SERVER_STATUS
 from . import converters
 from .cursors import Cursor
-from .optionfile import Parser
 from .protocol import (
     dump_packet,
     MysqlPacket,
@@ -27,22 +29,28 @@ from .protocol import (
 )
 from . import err, VERSION_STRING
 
-try:
-    import ssl
+# ssl, getpass, traceback and configparser (optionfile) are only imported
+# when a connection needs them, to keep them out of cold-start import time.
+ssl = None
 
-    SSL_ENABLED = True
-except ImportError:
-    ssl = None
-    SSL_ENABLED = False
 
-try:
-    import getpass
+def _import_ssl():
+    global ssl
+    if ssl is None:
+        import ssl as _ssl
 
-    DEFAULT_USER = getpass.getuser()
-    del getpass
-except (ImportError, KeyError):
-    # KeyError occurs when there's no entry in OS database for a current user.
-    DEFAULT_USER = None
+        ssl = _ssl
+    return ssl
+
+
+def _default_user():
+    try:
+        import getpass
+
+        return getpass.getuser()
+    except (ImportError, KeyError, OSError):
+        # KeyError (OSError on 3.13+) occurs when there's no entry in OS database for a current user.
+        return None
 
 DEBUG = False
 
@@ -63,6 +71,9 @@ DEFAULT_CHARSET = "utf8mb4"
 
 MAX_PACKET_LEN = 2**24 - 1
 
+# Initial size of the per-connection receive buffer; grows to the largest packet seen
+RECV_BUFFER_SIZE = 64 * 1024
+
 
 def _pack_int24(n):
     return struct.pack("<I", n)[:3]
@@ -151,7 +162,9 @@ class Connection:
         (if no authenticate method) for returning a string from the user. (experimental)
     :param server_public_key: SHA256 authentication plugin public key value. (default: None)
     :param binary_prefix: Add _binary prefix on bytes and bytearray. (default: False)
-    :param compress: Not supported.
+    :param compress: Use the compressed protocol if the server supports it. (default: False)
+    :param compress_threshold: Packets shorter than this many bytes are sent
+        uncompressed when compression is on. (default: 50)
     :param named_pipe: Not supported.
     :param db: **DEPRECATED** Alias for database.
     :param passwd: **DEPRECATED** Alias for password.
@@ -164,6 +177,9 @@ class Connection:
     _auth_plugin_name = ""
     _closed = False
     _secure = False
+    #: Prepared statements kept open per connection (least recently used
+    #: are closed first); see _prepare()
+    prepared_statement_cache_size = 64
 
     def __init__(
         self,
@@ -204,7 +220,8 @@ class Connection:
         ssl_key_password=None,
         ssl_verify_cert=None,
         ssl_verify_identity=None,
-        compress=None,  # not supported
+        compress=None,
+        compress_threshold=50,
         named_pipe=None,  # not supported
         passwd=None,  # deprecated
         db=None,  # deprecated
@@ -222,10 +239,8 @@ class Connection:
             # )
             password = passwd
 
-        if compress or named_pipe:
-            raise NotImplementedError(
-                "compress and named_pipe arguments are not supported"
-            )
+        if named_pipe:
+            raise NotImplementedError("named_pipe argument is not supported")
 
         self._local_infile = bool(local_infile)
         if self._local_infile:
@@ -241,6 +256,8 @@ class Connection:
             if not read_default_group:
                 read_default_group = "client"
 
+            from .optionfile import Parser
+
             cfg = Parser()
             cfg.read(os.path.expanduser(read_default_file))
 
@@ -285,7 +302,9 @@ class Connection:
                 if ssl_key_password is not None:
                     ssl["password"] = ssl_key_password
             if ssl:
-                if not SSL_ENABLED:
+                try:
+                    _import_ssl()
+                except ImportError:
                     raise NotImplementedError("ssl module not found")
                 self.ssl = True
                 client_flag |= CLIENT.SSL
@@ -295,7 +314,7 @@ class Connection:
         self.port = port or 3306
         if type(self.port) is not int:
             raise ValueError("port should be of type int")
-        self.user = user or DEFAULT_USER
+        self.user = user or _default_user()
         self.password = password or b""
         if isinstance(self.password, str):
             self.password = self.password.encode("latin1")
@@ -323,6 +342,8 @@ class Connection:
             client_flag |= CLIENT.CONNECT_WITH_DB
 
         self.client_flag = client_flag
+        self.compress = bool(compress or client_flag & CLIENT.COMPRESS)
+        self.compress_threshold = compress_threshold
 
         self.cursorclass = cursorclass
 
@@ -330,6 +351,19 @@ class Connection:
         self._affected_rows = 0
         self.host_info = "Not connected"
 
+        # Socket reads go into this buffer, which is reused; see _recv()
+        self._recv_buffer = bytearray(RECV_BUFFER_SIZE)
+        self._recv_view = memoryview(self._recv_buffer)
+        self._recv_pos = self._recv_end = 0
+        # With the compressed protocol on, socket reads go here first and
+        # _recv() inflates whole compressed packets into _recv_buffer
+        self._compressed = False
+        self._compressed_buffer = bytearray()
+        self._next_compressed_seq_id = 0
+
+        # Server-side prepared statements by query, in LRU order
+        self._statements = {}
+
         # specified autocommit mode. None means use server default.
         self.autocommit_mode = autocommit
 
@@ -436,7 +470,7 @@ class Connection:
             except:  # noqa
                 pass
         self._sock = None
-        self._rfile = None
+        self._recv_pos = self._recv_end = 0
 
     __del__ = _force_close
 
@@ -554,17 +588,84 @@ class Connection:
         return self.cursorclass(self)
 
     # The following methods are INTERNAL USE ONLY (called from Cursor)
-    def query(self, sql, unbuffered=False):
+    def query(self, sql, unbuffered=False, columnar=False):
         # if DEBUG:
         #     print("DEBUG: sending query:", sql)
         if isinstance(sql, str):
             sql = sql.encode(self.encoding, "surrogateescape")
         self._execute_command(COMMAND.COM_QUERY, sql)
-        self._affected_rows = self._read_query_result(unbuffered=unbuffered)
+        self._affected_rows = self._read_query_result(
+            unbuffered=unbuffered, columnar=columnar
+        )
+        return self._affected_rows
+
+    def next_result(self, unbuffered=False, columnar=False):
+        # Every result of a COM_STMT_EXECUTE uses the binary protocol
+        binary = isinstance(self._result, BinaryResult)
+        self._affected_rows = self._read_query_result(
+            unbuffered=unbuffered, columnar=columnar, binary=binary
+        )
         return self._affected_rows
 
-    def next_result(self, unbuffered=False):
-        self._affected_rows = self._read_query_result(unbuffered=unbuffered)
+    def _set_multi_statements(self, on):
+        """Allow (or stop allowing) several statements per COM_QUERY in this
+        session, for a connection opened without CLIENT.MULTI_STATEMENTS."""
+        option = 0 if on else 1  # MYSQL_OPTION_MULTI_STATEMENTS_ON / _OFF
+        self._execute_command(COMMAND.COM_SET_OPTION, struct.pack("<H", option))
+        self._read_packet()  # EOF, or an error
+
+    def _prepare(self, query):
+        """Return the PreparedStatement for a pyformat query, preparing it
+        with COM_STMT_PREPARE the first time it is seen on this connection.
+
+        Up to prepared_statement_cache_size statements stay prepared; the
+        least recently used one is closed to make room for a new one.
+        """
+        statements = self._statements
+        stmt = statements.pop(query, None)
+        if stmt is not None:
+            statements[query] = stmt
+            return stmt
+
+        sql, param_names = to_qmark(query)
+        self._execute_command(COMMAND.COM_STMT_PREPARE, sql)
+        packet = self._read_packet()
+        statement_id, column_count, param_count = struct.unpack_from(
+            "<xIHH", packet.get_all_data()
+        )
+        # Parameter and column definitions, each list ended by EOF. Only
+        # the statement id is kept: result columns are described again by
+        # every execute.
+        for count in (param_count, column_count):
+            if count:
+                for _ in range(count):
+                    self._read_packet(zero_copy=True)
+                eof_packet = self._read_packet()
+                assert eof_packet.is_eof_packet(), "Protocol error, expecting EOF"
+
+        stmt = PreparedStatement(
+            statement_id, sql, param_names, param_count, column_count
+        )
+        if param_names is not None and len(param_names) != param_count:
+            self._close_statement(stmt)
+            raise err.ProgrammingError(
+                "Placeholder count doesn't match the prepared statement"
+            )
+        while statements and len(statements) >= self.prepared_statement_cache_size:
+            self._close_statement(statements.pop(next(iter(statements))))
+        statements[query] = stmt
+        return stmt
+
+    def _close_statement(self, stmt):
+        # COM_STMT_CLOSE has no response
+        self._execute_command(
+            COMMAND.COM_STMT_CLOSE, struct.pack("<I", stmt.statement_id)
+        )
+
+    def _execute_prepared(self, stmt, args):
+        payload = stmt.execute_payload(args, self.encoding)
+        self._execute_command(COMMAND.COM_STMT_EXECUTE, payload)
+        self._affected_rows = self._read_query_result(binary=True)
         return self._affected_rows
 
     def affected_rows(self):
@@ -662,11 +763,19 @@ class Connection:
                 sock.settimeout(None)
 
             self._sock = sock
-            self._rfile = sock.makefile("rb")
+            self._recv_pos = self._recv_end = 0
             self._next_seq_id = 0
+            self._compressed = False
+            self._compressed_buffer.clear()
+            # Statements belong to the server session, which is new
+            self._statements.clear()
 
             self._get_server_information()
             self._request_authentication()
+            # Everything after the authentication result is compressed
+            if self.client_flag & CLIENT.COMPRESS:
+                self._compressed = True
+                self._compressed_chunk = memoryview(bytearray(RECV_BUFFER_SIZE))
 
             # Send "SET NAMES" query on init for:
             # - Ensure charaset (and collation) is set to the server.
@@ -696,7 +805,6 @@ class Connection:
             if self.autocommit_mode is not None:
                 self.autocommit(self.autocommit_mode)
         except BaseException as e:
-            self._rfile = None
             if sock is not None:
                 try:
                     sock.close()
@@ -710,6 +818,8 @@ class Connection:
                 )
                 # Keep original exception and traceback to investigate error.
                 exc.original_exception = e
+                import traceback
+
                 exc.traceback = traceback.format_exc()
                 if DEBUG:
                     print(exc.traceback)
@@ -732,19 +842,40 @@ class Connection:
         self._write_bytes(data)
         self._next_seq_id = (self._next_seq_id + 1) % 256
 
-    def _read_packet(self, packet_type=MysqlPacket):
+    def _read_packet(self, packet_type=MysqlPacket, zero_copy=False):
         """Read an entire "mysql packet" in its entirety from the network
         and return a MysqlPacket type that represents the results.
 
+        With zero_copy the packet wraps a memoryview of the connection's
+        receive buffer instead of a bytes copy; it is only valid until the
+        next read on this connection.
+
         :raise OperationalError: If the connection to the MySQL server is lost.
         :raise InternalError: If the packet sequence number is wrong.
         """
-        buff = bytearray()
-        while True:
-            packet_header = self._read_bytes(4)
-            # if DEBUG: dump_packet(packet_header)
+        view = self._read_packet_view()
+        packet = packet_type(view if zero_copy else bytes(view), self.encoding)
+        if packet.is_error_packet():
+            if self._result is not None and self._result.unbuffered_active is True:
+                self._result.unbuffered_active = False
+            if zero_copy:
+                packet = packet_type(bytes(view), self.encoding)
+            packet.raise_for_error()
+        return packet
+
+    def _read_packet_view(self):
+        """Read the next packet and return a memoryview of its payload.
 
-            btrl, btrh, packet_number = struct.unpack("<HBB", packet_header)
+        The view points into the receive buffer and is only valid until the
+        next read on this connection. Packets of MAX_PACKET_LEN or more
+        arrive split; their parts are joined into a separate buffer.
+        """
+        joined = None
+        while True:
+            self._recv(4)
+            btrl, btrh, packet_number = struct.unpack_from(
+                "<HBB", self._recv_buffer, self._recv_pos
+            )
             bytes_to_read = btrl + (btrh << 16)
             if packet_number != self._next_seq_id:
                 self._force_close()
@@ -760,27 +891,133 @@ class Connection:
                 )
             self._next_seq_id = (self._next_seq_id + 1) % 256
 
-            recv_data = self._read_bytes(bytes_to_read)
-            if DEBUG:
-                dump_packet(recv_data)
-            buff += recv_data
+            self._recv(4 + bytes_to_read)
+            start = self._recv_pos + 4
+            self._recv_pos = start + bytes_to_read
+            view = self._recv_view[start : self._recv_pos]
             # https://dev.mysql.com/doc/internals/en/sending-more-than-16mbyte.html
+            if bytes_to_read < MAX_PACKET_LEN and joined is None:
+                break
+            if joined is None:
+                joined = bytearray()
+            joined += view
             if bytes_to_read < MAX_PACKET_LEN:
+                view = memoryview(joined)
                 break
 
-        packet = packet_type(bytes(buff), self.encoding)
-        if packet.is_error_packet():
-            if self._result is not None and self._result.unbuffered_active is True:
-                self._result.unbuffered_active = False
-            packet.raise_for_error()
-        return packet
+        if DEBUG:
+            dump_packet(view)
+        return view
+
+    def _read_rows(self, parse_row, rows, read_row):
+        """Parse a result set's row packets straight out of the receive buffer.
+
+        Each pass takes one bytes copy of everything buffered and runs
+        `parse_row(data, start, end)` over every complete row packet in it,
+        so a batch of rows costs one copy instead of one per packet. Rows
+        parse_row returns None for, and packets that are split or not yet
+        buffered, go through _read_packet() and `read_row(packet)`. Stops at the EOF
+        packet and returns it; an error packet raises.
+        """
+        while True:
+            self._recv(4)
+            data = bytes(self._recv_view[self._recv_pos : self._recv_end])
+            end = len(data)
+            pos = 0
+            seq = self._next_seq_id
+            while end - pos >= 4:
+                length = data[pos] | data[pos + 1] << 8 | data[pos + 2] << 16
+                start = pos + 4
+                row_end = start + length
+                if (
+                    row_end > end
+                    or length == 0
+                    or length >= MAX_PACKET_LEN
+                    or data[pos + 3] != seq
+                ):
+                    break
+                first = data[start]
+                if first == 0xFF or (first == 0xFE and length < 9):
+                    break  # error or EOF packet
+                row = parse_row(data, start, row_end)
+                if row is None:
+                    row = read_row(MysqlPacket(data[start:row_end], self.encoding))
+                rows.append(row)
+                pos = row_end
+                seq = (seq + 1) % 256
+            self._recv_pos += pos
+            self._next_seq_id = seq
+            if pos:
+                continue
+
+            length = data[0] | data[1] << 8 | data[2] << 16
+            if length < MAX_PACKET_LEN and end < 4 + length:
+                self._recv(4 + length)
+                continue
+            packet = self._read_packet()
+            if packet.is_eof_packet():
+                return packet
+            rows.append(read_row(packet))
+
+    def _recv(self, size):
+        """Make sure at least `size` unread bytes are in the receive buffer.
+
+        Unread bytes are moved to the front of the buffer (a bigger one if
+        need be) when `size` would not fit after them, then the socket is
+        read with recv_into until enough has arrived.
+        """
+        if self._recv_end - self._recv_pos >= size:
+            return
+        if self._compressed:
+            while self._recv_end - self._recv_pos < size:
+                self._recv_compressed()
+            return
+        self._reserve(size)
 
-    def _read_bytes(self, num_bytes):
         self._sock.settimeout(self._read_timeout)
+        while self._recv_end - self._recv_pos < size:
+            self._recv_end += self._recv_into(self._recv_view[self._recv_end :])
+
+    def _recv_compressed(self):
+        """Read one compressed packet and append its payload to the receive buffer.
+
+        A compressed packet has a 7 byte header (payload length, sequence id,
+        uncompressed length, which is 0 if the payload was sent as is) and
+        carries a run of ordinary packets, possibly cut anywhere.
+        """
+        buffer = self._compressed_buffer
+        self._sock.settimeout(self._read_timeout)
+        while len(buffer) < 7:
+            self._recv_more(buffer)
+        length = buffer[0] | buffer[1] << 8 | buffer[2] << 16
+        self._next_compressed_seq_id = (buffer[3] + 1) % 256
+        uncompressed_length = buffer[4] | buffer[5] << 8 | buffer[6] << 16
+        while len(buffer) < 7 + length:
+            self._recv_more(buffer)
+        payload = buffer[7 : 7 + length]
+        del buffer[: 7 + length]
+        if uncompressed_length:
+            payload = zlib.decompress(payload)
+        if DEBUG:
+            print(f"compressed packet: {length} -> {len(payload)} bytes")
+
+        self._reserve(self._recv_end - self._recv_pos + len(payload))
+        self._recv_view[self._recv_end : self._recv_end + len(payload)] = payload
+        self._recv_end += len(payload)
+
+    def _recv_more(self, buffer):
+        # Append what the socket has (up to RECV_BUFFER_SIZE bytes) to buffer
+        chunk = self._compressed_chunk
+        buffer += chunk[: self._recv_into(chunk)]
+
+    def _recv_into(self, view):
+        """recv_into() from the socket, returning the (nonzero) byte count.
+
+        :raise OperationalError: If the connection to the MySQL server is lost.
+        """
         while True:
             try:
-                data = self._rfile.read(num_bytes)
-                break
+                received = self._sock.recv_into(view)
             except OSError as e:
                 if e.errno == errno.EINTR:
                     continue
@@ -793,14 +1030,32 @@ class Connection:
                 # Don't convert unknown exception to MySQLError.
                 self._force_close()
                 raise
-        if len(data) < num_bytes:
-            self._force_close()
-            raise err.OperationalError(
-                CR.CR_SERVER_LOST, "Lost connection to MySQL server during query"
-            )
-        return data
+            if not received:
+                self._force_close()
+                raise err.OperationalError(
+                    CR.CR_SERVER_LOST, "Lost connection to MySQL server during query"
+                )
+            return received
+
+    def _reserve(self, size):
+        """Make room for `size` unread bytes after _recv_pos in the receive buffer."""
+        unread = self._recv_end - self._recv_pos
+        if self._recv_pos + size > len(self._recv_buffer):
+            if size > len(self._recv_buffer):
+                buffer = bytearray(max(size, 2 * len(self._recv_buffer)))
+                buffer[:unread] = self._recv_view[self._recv_pos : self._recv_end]
+                self._recv_buffer = buffer
+                self._recv_view = memoryview(buffer)
+            else:
+                self._recv_view[:unread] = self._recv_view[
+                    self._recv_pos : self._recv_end
+                ]
+            self._recv_pos = 0
+            self._recv_end = unread
 
     def _write_bytes(self, data):
+        if self._compressed:
+            data = self._compress_packets(data)
         self._sock.settimeout(self._write_timeout)
         try:
             self._sock.sendall(data)
@@ -810,9 +1065,38 @@ class Connection:
                 CR.CR_SERVER_GONE_ERROR, f"MySQL server has gone away ({e!r})"
             )
 
-    def _read_query_result(self, unbuffered=False):
+    def _compress_packets(self, data):
+        """Wrap ordinary packets in compressed packets (see _recv_compressed).
+
+        Payloads shorter than compress_threshold, or that zlib can't shrink,
+        are sent as is.
+        """
+        out = bytearray()
+        for start in range(0, len(data), MAX_PACKET_LEN):
+            chunk = data[start : start + MAX_PACKET_LEN]
+            payload = chunk
+            uncompressed_length = 0
+            if len(chunk) >= self.compress_threshold:
+                compressed = zlib.compress(chunk)
+                if len(compressed) < len(chunk):
+                    payload = compressed
+                    uncompressed_length = len(chunk)
+            out += _pack_int24(len(payload))
+            out.append(self._next_compressed_seq_id)
+            out += _pack_int24(uncompressed_length)
+            out += payload
+            self._next_compressed_seq_id = (self._next_compressed_seq_id + 1) % 256
+        return out
+
+    def _read_query_result(self, unbuffered=False, columnar=False, binary=False):
         self._result = None
-        if unbuffered:
+        if binary:
+            result = BinaryResult(self)
+            result.read()
+        elif columnar:
+            result = ColumnarResult(self)
+            result.read()
+        elif unbuffered:
             try:
                 result = MySQLResult(self)
                 result.init_unbuffered_query()
@@ -861,6 +1145,7 @@ class Connection:
         # calling self..write_packet()
         prelude = struct.pack("<iB", packet_size, command)
         packet = prelude + sql[: packet_size - 1]
+        self._next_compressed_seq_id = 0
         self._write_bytes(packet)
         if DEBUG:
             dump_packet(packet)
@@ -882,6 +1167,11 @@ class Connection:
         if int(self.server_version.split(".", 1)[0]) >= 5:
             self.client_flag |= CLIENT.MULTI_RESULTS
 
+        if self.compress and self.server_capabilities & CLIENT.COMPRESS:
+            self.client_flag |= CLIENT.COMPRESS
+        else:
+            self.client_flag &= ~CLIENT.COMPRESS
+
         if self.user is None:
             raise ValueError("Did not specify a username")
 
@@ -897,7 +1187,6 @@ class Connection:
             self.write_packet(data_init)
 
             self._sock = self.ctx.wrap_socket(self._sock, server_hostname=self.host)
-            self._rfile = self._sock.makefile("rb")
             self._secure = True
 
         data = data_init + self.user + b"\0"
@@ -1306,7 +1595,8 @@ class MySQLResult:
         # executing a query, so we just spin, and wait for an EOF packet.
         while self.unbuffered_active:
             try:
-                packet = self.connection._read_packet()
+                # Only checked for EOF, so no need to copy it out of the buffer
+                packet = self.connection._read_packet(zero_copy=True)
             except err.OperationalError as e:
                 if e.args[0] in (
                     ER.QUERY_TIMEOUT,
@@ -1326,12 +1616,11 @@ class MySQLResult:
     def _read_rowdata_packet(self):
         """Read a rowdata packet for each data row in the result set."""
         rows = []
-        while True:
-            packet = self.connection._read_packet()
-            if self._check_packet_is_eof(packet):
-                self.connection = None  # release reference to kill cyclic reference.
-                break
-            rows.append(self._read_row_from_packet(packet))
+        packet = self.connection._read_rows(
+            self._parse_row, rows, self._read_row_from_packet
+        )
+        self._check_packet_is_eof(packet)
+        self.connection = None  # release reference to kill cyclic reference.
 
         self.affected_rows = len(rows)
         self.rows = tuple(rows)
@@ -1397,6 +1686,60 @@ class MySQLResult:
         eof_packet = self.connection._read_packet()
         assert eof_packet.is_eof_packet(), "Protocol error, expecting EOF"
         self.description = tuple(description)
+        self._parse_row = make_row_parser(self.converters)
+
+
+class ColumnarResult(MySQLResult):
+    """A buffered result decoded into per-column containers.
+
+    `columns` holds one container per column: array.array("q"/"Q") for
+    integer columns, array.array("d") for FLOAT/DOUBLE, lists for everything
+    else and for numeric columns that contain NULLs. `rows` is a ColumnRows
+    view that builds tuples only when rows are fetched.
+    """
+
+    def __init__(self, connection):
+        super().__init__(connection)
+        self.columns = None
+        self.typecodes = None
+
+    def _read_rowdata_packet(self):
+        self.typecodes = [
+            column_typecode(field, converter)
+            for field, (_, converter) in zip(self.fields, self.converters)
+        ]
+        sink = ColumnSink(self.typecodes)
+        parse_into = make_column_parser(
+            self.converters, self.typecodes, sink.appends, sink.null
+        )
+        packet = self.connection._read_rows(
+            parse_into, sink, self._read_row_from_packet
+        )
+        self._check_packet_is_eof(packet)
+        self.connection = None  # release reference to kill cyclic reference.
+
+        self.columns = sink.finish()
+        self.affected_rows = sink.count
+        self.rows = ColumnRows(self.columns, sink.count)
+
+
+class BinaryResult(MySQLResult):
+    """A buffered result of COM_STMT_EXECUTE, whose rows use the binary protocol.
+
+    Values come out as the text protocol's converters would produce them;
+    see make_binary_row_decoder.
+    """
+
+    def _get_descriptions(self):
+        super()._get_descriptions()
+        self._parse_row = make_binary_row_decoder(self.fields, self.converters)
+
+    def _read_row_from_packet(self, packet):
+        data = packet.get_all_data()
+        row = self._parse_row(data, 0, len(data))
+        if row is None:
+            raise err.InternalError("Malformed binary protocol row packet")
+        return row
 
 
 class LoadLocalFile:
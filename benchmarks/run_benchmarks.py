@@ -0,0 +1,203 @@
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+# End-to-end throughput benchmark for the agent pipeline.
+#
+# For every dataset size: truncate trades_data / dtcc_data / trade_log, seed
+# both trade tables with synthetic trades from data-generation-service's
+# generator at a controlled mismatch ratio, then drive every agent through
+# agents/local_runner.py. Results (trades/sec and min/median/max per-stage
+# latency across --repeat runs; a handful of runs can't support tail
+# percentiles) are written as JSON so runs can be diffed between commits
+# with --compare.
+#
+#   python benchmarks/run_benchmarks.py --sizes 10000,100000 --repeat 5
+#   python benchmarks/run_benchmarks.py --sizes 10000 --compare benchmarks/results/<old>.json
+#
+# Sizes count trade records (rows in trades_data), i.e. size / 2 buy/sell pairs.
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(REPO_DIR, 'benchmarks', 'results')
+sys.path.insert(0, os.path.join(REPO_DIR, 'agents'))
+sys.path.insert(0, os.path.join(REPO_DIR, 'data-generation-service'))
+# Vendored PyMySQL for seeding and migrations, which run before any agent is loaded
+sys.path.insert(0, os.path.join(REPO_DIR, 'data-ingestion'))
+
+import local_runner  # noqa: E402
+import trade_generator  # noqa: E402
+
+DEFAULT_SIZES = '1000,10000'  # pass bigger sizes explicitly; 1M takes a long time locally
+SEED_CHUNK = 5000
+
+INSERT_TRADE = """
+    INSERT IGNORE INTO {table} (
+        trade_id, broker_id, contra_broker_id, ticker,
+        order_type, quantity, price, date, trade_timestamp, status
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+"""
+
+
+def connect(args):
+    import pymysql
+
+    return pymysql.connect(host=args.db_host, port=args.db_port, user=args.db_user,
+                           password=args.db_password, database=args.db_name)
+
+
+def seed(args, size, run_index):
+    """Reset the pipeline tables and load `size` synthetic trade records into both."""
+    scenario = trade_generator.get_scenario(args.scenario, mismatch_rate=args.mismatch_ratio)
+    # Unique per run so repeated runs never collide on (trade_id, order_type)
+    prefix = f"b{run_index:02d}"
+    counter = iter(range(1, size + 1))
+
+    def trade_id_factory():
+        return f"{prefix}{next(counter):09d}"
+
+    conn = connect(args)
+    start = time.perf_counter()
+    try:
+        with conn.cursor() as cursor:
+            for table in ("trades_data", "dtcc_data", "trade_log"):
+                cursor.execute(f"TRUNCATE TABLE {table}")
+            remaining = size // 2
+            while remaining:
+                pairs = min(SEED_CHUNK, remaining)
+                remaining -= pairs
+                rows = [
+                    (t['trade_id'], t['broker_id'], t['contra_broker_id'], t['ticker'],
+                     t['order_type'], int(t['quantity']), float(t['price']), t['date'],
+                     t['trade_timestamp'], "")
+                    for t in trade_generator.generate_trade_pairs(pairs, scenario, trade_id_factory)
+                ]
+                for table in ("trades_data", "dtcc_data"):
+                    cursor.executemany(INSERT_TRADE.format(table=table), rows)
+                conn.commit()
+    finally:
+        conn.close()
+    return time.perf_counter() - start
+
+
+def latency(values):
+    return {'min': min(values), 'median': statistics.median(values), 'max': max(values)}
+
+
+def throughput(size, seconds):
+    return round(size / seconds, 1) if seconds else None
+
+
+def summarize(size, runs):
+    """Fold the per-run stage timings for one dataset size into a result record."""
+    totals = [sum(t['wall_time_s'] for t in run['stages']) for run in runs]
+    stages = {}
+    for run in runs:
+        for timing in run['stages']:
+            stages.setdefault(timing['stage'], []).append(timing)
+
+    stage_results = {}
+    for name, timings in stages.items():
+        wall_times = [t['wall_time_s'] for t in timings]
+        stage_results[name] = {
+            'latency_s': latency(wall_times),
+            'trades_per_sec': throughput(size, statistics.median(wall_times)),
+            'rows_processed': timings[-1]['rows_processed'],
+            'db_round_trips': timings[-1]['db_round_trips'],
+            'peak_rss_mb': max(t['peak_rss_mb'] for t in timings),
+            'errors': sorted({t['error'] for t in timings if t['error']}),
+        }
+    return {
+        'size': size,
+        'runs': len(runs),
+        'seed_time_s': [round(run['seed_time_s'], 3) for run in runs],
+        'pipeline_time_s': latency(totals),
+        'trades_per_sec': throughput(size, statistics.median(totals)),
+        'stages': stage_results,
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def compare(results, baseline_path):
+    """Print median stage latency deltas against an earlier results file."""
+    with open(baseline_path) as f:
+        baseline = {r['size']: r for r in json.load(f)['results']}
+    for result in results:
+        old = baseline.get(result['size'])
+        if old is None:
+            continue
+        print(f"\nsize={result['size']} vs {baseline_path}")
+        for name, stage in result['stages'].items():
+            if name not in old['stages']:
+                continue
+            old_latency = old['stages'][name]['latency_s']
+            before = old_latency.get('median', old_latency.get('p50'))  # files from before the rename
+            after = stage['latency_s']['median']
+            change = f"{(after - before) / before * 100:+.1f}%" if before else 'n/a'
+            print(f"  {name:<24} median {before:>9.3f}s -> {after:>9.3f}s  ({change})")
+
+
+def main(argv=None):
+    parser = local_runner.build_arg_parser()
+    parser.description = 'Seed synthetic trades and benchmark the agent pipeline end to end.'
+    parser.add_argument('--sizes', default=DEFAULT_SIZES, help='comma-separated trade counts')
+    parser.add_argument('--repeat', type=int, default=5, help='pipeline runs per size')
+    parser.add_argument('--mismatch-ratio', type=float, default=0.3)
+    parser.add_argument('--scenario', default='uniform', choices=sorted(trade_generator.SCENARIOS))
+    parser.add_argument('--compare', help='earlier results file to diff median latencies against')
+    args = parser.parse_args(argv)
+    args.init_schema = False  # done before seeding instead
+
+    trade_generator.load_ticker_data()
+    revision = git_revision()
+    results = []
+    run_index = 0
+    for size in (int(s) for s in args.sizes.split(',')):
+        runs = []
+        for _ in range(args.repeat):
+            run_index += 1
+            local_runner.configure_environment(args)
+            local_runner.init_schema(args)
+            seed_time = seed(args, size, run_index)
+            print(f"\n== size={size} run={len(runs) + 1}/{args.repeat} (seeded in {seed_time:.1f}s)")
+            runs.append({'seed_time_s': seed_time, 'stages': local_runner.run_pipeline(args)})
+        results.append(summarize(size, runs))
+    # Against the last (largest) dataset, so the optimizer sees realistic row counts
+    index_checks = local_runner.verify_indexes(args)
+
+    report = {
+        'git_revision': revision,
+        'timestamp': datetime.utcnow().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'scenario': args.scenario,
+        'mismatch_ratio': args.mismatch_ratio,
+        'repeat': args.repeat,
+        'results': results,
+        'index_checks': index_checks,
+    }
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"bench-{revision}-{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,164 +1,306 @@
-import csv
-import random
-from flask import Flask, jsonify
+from flask import Flask, jsonify, Response, request
 import time
-from threading import Lock
+from threading import Lock, Thread, Event, Condition
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 import sqlite3
-import copy
+import json
+
+from trade_generator import SCENARIO, generate_trade_pairs, load_ticker_data
 
 app = Flask(__name__)
 
-# Global variables with thread-safe access
-trade_pairs = []
-last_sent_records = []
+UPDATE_INTERVAL_SECONDS = int(os.environ.get('UPDATE_INTERVAL_SECONDS', 180))
+BATCH_SIZE = int(os.environ.get('BATCH_SIZE', 15))
+
+# Shared by every worker process: trade ID counter, generation lease and the
+# published snapshots. Each generation is produced once, by whichever worker
+# wins the lease, and every worker serves that same snapshot.
+DB_PATH = os.path.join(os.getcwd(), 'trade_ids.db')
+SNAPSHOT_POLL_SECONDS = float(os.environ.get('SNAPSHOT_POLL_SECONDS', 1))
+SNAPSHOT_HISTORY = 10
+DELTA_PAGE_LIMIT = 5000  # max records returned by one /get_records?since= call
+STREAM_HEARTBEAT_SECONDS = float(os.environ.get('STREAM_HEARTBEAT_SECONDS', 15))
+STREAM_BATCH_LIMIT = 500
+# How long a worker holds the lease while it generates; if it dies or fails
+# before saving the snapshot, another worker takes over after this
+GENERATION_LEASE_SECONDS = int(os.environ.get('GENERATION_LEASE_SECONDS', 30))
+
+# Published batch. The generator thread builds a new batch off-lock and swaps
+# this reference in; request threads only ever read it.
+current_snapshot = (0, b'[]', 0)  # (generation, JSON payload, log cursor), swapped as one reference
+# Serialises publishers; requests only take it (briefly) when they have to start
+# this process's generator thread, never to read the published batch
 data_lock = Lock()
-last_update_time = 0
-ticker_data = []
+records_published = Condition()  # wakes /stream clients when a snapshot is swapped in
+
+generation_thread = None
+generation_stop = Event()
+
+# SQLite setup for persistent trade IDs and shared snapshots
+def db_connect():
+    """Open the shared state DB; autocommit mode so callers control transactions"""
+    return sqlite3.connect(DB_PATH, timeout=30, isolation_level=None)
 
-# SQLite setup for persistent trade IDs
 def init_db():
-    """Initialize SQLite DB for persistent trade IDs"""
-    db_path = os.path.join(os.getcwd(), 'trade_ids.db')
-    conn = sqlite3.connect(db_path)
+    """Initialize SQLite DB for persistent trade IDs and generation snapshots"""
+    conn = db_connect()
+    # WAL lets workers read snapshots while another worker is publishing
+    conn.execute('PRAGMA journal_mode=WAL')
     conn.execute('''
         CREATE TABLE IF NOT EXISTS counters (
             name TEXT PRIMARY KEY, 
             value INTEGER
         )
     ''')
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS snapshots (
+            generation INTEGER PRIMARY KEY,
+            created_at REAL NOT NULL,
+            records TEXT NOT NULL,
+            last_seq INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    # Log of every generated trade; seq is the delta-feed cursor. Trades are
+    # kept as long as the snapshot that generated them.
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS generated_trades (
+            seq INTEGER PRIMARY KEY AUTOINCREMENT,
+            generation INTEGER NOT NULL,
+            record TEXT NOT NULL
+        )
+    ''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_generated_trades_generation ON generated_trades (generation)')
+    try:
+        # snapshots tables created before the delta feed lack the cursor column
+        conn.execute('ALTER TABLE snapshots ADD COLUMN last_seq INTEGER NOT NULL DEFAULT 0')
+    except sqlite3.OperationalError:
+        pass
     conn.execute('INSERT OR IGNORE INTO counters VALUES ("trade_id", 0)')
-    conn.commit()
+    conn.execute('INSERT OR IGNORE INTO counters VALUES ("next_generation_at", 0)')
+    # Identifies this log: seqs restart at 1 when the DB file is recreated, so
+    # delta-feed clients compare log ids before trusting a stored cursor
+    conn.execute('INSERT OR IGNORE INTO counters VALUES ("log_id", ?)', (int(time.time() * 1000),))
+    log_id = conn.execute('SELECT value FROM counters WHERE name = "log_id"').fetchone()[0]
     conn.close()
+    return log_id
 
 def generate_unique_trade_id():
     """Generate IDs that persist across restarts"""
-    with sqlite3.connect('trade_ids.db') as conn:
+    with sqlite3.connect(DB_PATH, timeout=30) as conn:
         cursor = conn.cursor()
         cursor.execute('UPDATE counters SET value = value + 1 WHERE name = "trade_id"')
         new_id = cursor.execute('SELECT value FROM counters WHERE name = "trade_id"').fetchone()[0]
     return f"tid{new_id:08d}"
 
-def load_ticker_data():
-    """Load ticker and price data from the CSV file"""
-    global ticker_data
+def claim_generation():
+    """Take the lease for the next generation if it is due.
+
+    BEGIN IMMEDIATE serialises the check-and-set across worker processes, so
+    exactly one worker generates each batch. The lease only lasts
+    GENERATION_LEASE_SECONDS; save_snapshot() schedules the next generation
+    in the same transaction that stores this one, so a failed generation is
+    retried once the lease runs out instead of a whole interval later.
+    """
+    conn = db_connect()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        due_at = conn.execute('SELECT value FROM counters WHERE name = "next_generation_at"').fetchone()[0]
+        now = time.time()
+        if now < due_at:
+            conn.execute('COMMIT')
+            return False
+        conn.execute('UPDATE counters SET value = ? WHERE name = "next_generation_at"',
+                     (now + GENERATION_LEASE_SECONDS,))
+        conn.execute('COMMIT')
+        return True
+    finally:
+        conn.close()
+
+def save_snapshot(records, payload):
+    """Append a snapshot plus its trades to the generation log and schedule the next one.
+
+    Returns (generation, last_seq) where last_seq is the log cursor after the
+    snapshot's trades.
+    """
+    conn = db_connect()
+    try:
+        conn.execute('BEGIN IMMEDIATE')
+        cursor = conn.execute('INSERT INTO snapshots (created_at, records) VALUES (?, ?)',
+                              (time.time(), payload))
+        generation = cursor.lastrowid
+        conn.executemany('INSERT INTO generated_trades (generation, record) VALUES (?, ?)',
+                         ((generation, app.json.dumps(record)) for record in records))
+        last_seq = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM generated_trades').fetchone()[0]
+        conn.execute('UPDATE snapshots SET last_seq = ? WHERE generation = ?', (last_seq, generation))
+        conn.execute('DELETE FROM snapshots WHERE generation <= ?', (generation - SNAPSHOT_HISTORY,))
+        conn.execute('DELETE FROM generated_trades WHERE generation <= ?', (generation - SNAPSHOT_HISTORY,))
+        conn.execute('UPDATE counters SET value = ? WHERE name = "next_generation_at"',
+                     (time.time() + UPDATE_INTERVAL_SECONDS,))
+        conn.execute('COMMIT')
+        return generation, last_seq
+    finally:
+        conn.close()
+
+def load_latest_snapshot(newer_than=0):
+    """Return (generation, payload, last_seq) of the latest snapshot, or None"""
+    conn = db_connect()
     try:
-        with open('tickers.csv', mode='r') as file:
-            csv_reader = csv.DictReader(file)
-            ticker_data = list(csv_reader)
-    except FileNotFoundError:
-        print("Error: tickers.csv not found.")
-        ticker_data = []
-
-def introduce_mismatch(buy_trade, sell_trade):
-    """Introduce a mismatch in one or more fields"""
-    mismatch_type = random.choice(['quantity', 'price', 'date', 'timestamp', 'multiple'])
-
-    if mismatch_type == 'quantity':
-        diff = random.randint(1, max(1, buy_trade['quantity'] // 20))
-        sell_trade['quantity'] = buy_trade['quantity'] + (diff if random.choice([True, False]) else -diff)
-
-    elif mismatch_type == 'price':
-        diff = buy_trade['price'] * random.uniform(0.001, 0.01)
-        sell_trade['price'] = round(buy_trade['price'] + (diff if random.choice([True, False]) else -diff), 2)
-
-    elif mismatch_type == 'date':
-        sell_trade['date'] = (datetime.strptime(buy_trade['date'], '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
-
-    elif mismatch_type == 'timestamp':
-        minutes_diff = random.randint(1, 30)
-        sell_trade['trade_timestamp'] = (datetime.strptime(buy_trade['trade_timestamp'], '%Y-%m-%d %H:%M:%S') + timedelta(minutes=minutes_diff)).strftime('%Y-%m-%d %H:%M:%S')
-
-    elif mismatch_type == 'multiple':
-        introduce_mismatch(buy_trade, sell_trade)
-        introduce_mismatch(buy_trade, sell_trade)
-
-    return buy_trade, sell_trade
-
-def generate_trade_pairs(count=15):
-    """Generate pairs of buy/sell trades with controlled mismatches"""
-    global ticker_data
-    all_trades = []
-
-    mismatch_indices = set(random.sample(range(count), int(count * 0.3)))  # 30% mismatch
-
-    for i in range(count):
-        ticker_info = random.choice(ticker_data)
-        quantity = random.randint(1, 500) 
-        broker1 = f"BKR{random.randint(1, 15):03d}"
-        broker2 = f"BKR{random.randint(1, 15):03d}"
-        while broker2 == broker1:
-            broker2 = f"BKR{random.randint(1, 15):03d}"
-
-        trade_id = generate_unique_trade_id()
-        now = datetime.now()
-        curr_date = now.strftime('%Y-%m-%d')
-        curr_timestamp = now.strftime('%Y-%m-%d %H:%M:%S')
-
-        buy_trade = {
-            'trade_id': trade_id,
-            'ticker': ticker_info['ticker'],
-            'broker_id': broker1,
-            'contra_broker_id': broker2,
-            'quantity': quantity,
-            'price': round(float(ticker_info['price']), 2),
-            'order_type': 'BUY',
-            'date': curr_date,
-            'trade_timestamp': curr_timestamp
-        }
-
-        sell_trade = {
-            'trade_id': trade_id,
-            'ticker': ticker_info['ticker'],
-            'broker_id': broker2,
-            'contra_broker_id': broker1,
-            'quantity': quantity,
-            'price': round(float(ticker_info['price']), 2),
-            'order_type': 'SELL',
-            'date': curr_date,
-            'trade_timestamp': curr_timestamp
-        }
-
-        # Introduce mismatch for 30% of trade pairs
-        if i in mismatch_indices:
-            buy_trade, sell_trade = introduce_mismatch(copy.deepcopy(buy_trade), copy.deepcopy(sell_trade))
-
-        all_trades.extend([buy_trade, sell_trade])
-
-    random.shuffle(all_trades)
-    return all_trades
-
-def maybe_update_records():
-    """Check if we should update records (every 10 minutes)"""
-    global last_sent_records, last_update_time, trade_pairs
-    current_time = time.time()
-    UPDATE_INTERVAL_SECONDS = 180
+        return conn.execute(
+            'SELECT generation, records, last_seq FROM snapshots WHERE generation > ? '
+            'ORDER BY generation DESC LIMIT 1', (newer_than,)
+        ).fetchone()
+    finally:
+        conn.close()
+
+def load_trades_since(cursor, limit):
+    """Return [(seq, record JSON)] for logged trades after cursor, oldest first"""
+    conn = db_connect()
+    try:
+        return conn.execute(
+            'SELECT seq, record FROM generated_trades WHERE seq > ? ORDER BY seq LIMIT ?',
+            (cursor, limit)
+        ).fetchall()
+    finally:
+        conn.close()
+
+def publish_records(records, payload, generation, last_seq):
+    """Swap in a snapshot together with its pre-rendered JSON payload"""
+    global current_snapshot
     with data_lock:
-        if current_time - last_update_time >= UPDATE_INTERVAL_SECONDS:
-            trade_pairs = generate_trade_pairs(15)
-            last_sent_records = trade_pairs.copy()
-            last_update_time = current_time
-            print(f"Updated {len(trade_pairs)} records at {time.strftime('%Y-%m-%d %H:%M:%S')}")
+        # A reader racing the swap gets either the old or the new snapshot,
+        # never a half-built one.
+        current_snapshot = (generation, payload.encode('utf-8'), last_seq)
+    with records_published:
+        records_published.notify_all()
+    print(f"Serving generation {generation} ({len(records)} records) at {time.strftime('%Y-%m-%d %H:%M:%S')}")
+
+def sync_generation():
+    """Generate the next batch if this worker holds the lease, else follow the shared snapshot"""
+    if claim_generation():
+        records = generate_trade_pairs(BATCH_SIZE, trade_id_factory=generate_unique_trade_id)
+        payload = app.json.dumps(records)
+        generation, last_seq = save_snapshot(records, payload)
+        publish_records(records, payload, generation, last_seq)
+        return
+    snapshot = load_latest_snapshot(newer_than=current_snapshot[0])
+    if snapshot is not None:
+        generation, payload, last_seq = snapshot
+        publish_records(json.loads(payload), payload, generation, last_seq)
+
+def generation_worker():
+    """Keep this worker on the current shared generation, generating when due"""
+    while not generation_stop.wait(SNAPSHOT_POLL_SECONDS):
+        try:
+            sync_generation()
+        except Exception as e:
+            # Keep serving the previous snapshot; try again next poll
+            print(f"Error syncing records: {e}")
+
+def ensure_generation_worker():
+    """Start the generator thread if this process doesn't have one yet.
+
+    Called lazily from the request path as well as at import, so workers forked
+    after import (e.g. gunicorn --preload) still get their own thread.
+    """
+    global generation_thread
+    if generation_thread is not None and generation_thread.is_alive():
+        return
+    with data_lock:
+        if generation_thread is None or not generation_thread.is_alive():
+            generation_thread = Thread(target=generation_worker, name='trade-generator', daemon=True)
+            generation_thread.start()
 
 @app.route('/get_records', methods=['GET'])
 def get_records():
-    """Endpoint to get the current set of trade records"""
-    maybe_update_records()
-    with data_lock:
-        return jsonify(last_sent_records)
+    """Endpoint to get the current set of trade records.
+
+    With ?since=<cursor>, returns exactly the trades logged after that cursor
+    instead: {"records": [...], "cursor": <next cursor>, "has_more": bool,
+    "log_id": <log id>}. The X-Cursor header on the plain response is the
+    cursor to continue from. A cursor is only meaningful for the log id it
+    came with (X-Log-Id); when that changes, start again from since=0.
+    Only the last SNAPSHOT_HISTORY generations' trades are kept.
+    """
+    ensure_generation_worker()
+    since = request.args.get('since')
+    if since is None:
+        generation, payload, last_seq = current_snapshot
+        return Response(payload, mimetype='application/json',
+                        headers={'X-Generation': str(generation), 'X-Cursor': str(last_seq),
+                                 'X-Log-Id': str(log_id)})
+
+    try:
+        cursor = int(since)
+        limit = min(int(request.args.get('limit', DELTA_PAGE_LIMIT)), DELTA_PAGE_LIMIT)
+    except ValueError:
+        return jsonify({"error": "since and limit must be integers"}), 400
+    if cursor < 0 or limit < 1:
+        return jsonify({"error": "since must be >= 0 and limit >= 1"}), 400
+
+    rows = load_trades_since(cursor, limit)
+    next_cursor = rows[-1][0] if rows else cursor
+    # Records are stored pre-rendered, so splice them in rather than re-encode
+    payload = '{"cursor":%d,"has_more":%s,"log_id":%d,"records":[%s]}' % (
+        next_cursor, 'true' if len(rows) == limit else 'false', log_id, ','.join(record for _, record in rows)
+    )
+    return Response(payload, mimetype='application/json',
+                    headers={'X-Cursor': str(next_cursor), 'X-Log-Id': str(log_id)})
+
+@app.route('/stream', methods=['GET'])
+def stream():
+    """Server-Sent Events feed pushing each trade as soon as it is published.
+
+    Every event carries its generation-log seq as the event id, so a client
+    reconnecting with Last-Event-ID (or ?last_event_id=) resumes exactly where
+    it left off. Without one, the stream starts after the current snapshot.
+    Comment lines are sent as heartbeats while no trades are flowing.
+    """
+    ensure_generation_worker()
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        cursor = int(last_event_id) if last_event_id else current_snapshot[2]
+    except ValueError:
+        return jsonify({"error": "Last-Event-ID must be an integer"}), 400
+
+    def events(cursor):
+        yield f'retry: {int(SNAPSHOT_POLL_SECONDS * 1000)}\n\n'
+        last_sent = time.time()
+        while True:
+            rows = load_trades_since(cursor, STREAM_BATCH_LIMIT)
+            if rows:
+                yield ''.join(f'id: {seq}\nevent: trade\ndata: {record}\n\n' for seq, record in rows)
+                cursor = rows[-1][0]
+                last_sent = time.time()
+                continue
+            if time.time() - last_sent >= STREAM_HEARTBEAT_SECONDS:
+                yield ': heartbeat\n\n'
+                last_sent = time.time()
+            with records_published:
+                records_published.wait(timeout=min(STREAM_HEARTBEAT_SECONDS, SNAPSHOT_POLL_SECONDS * 5))
+
+    return Response(events(cursor), mimetype='text/event-stream',
+                    headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
 
 @app.route('/health', methods=['GET'])
 def health():
-    return jsonify({"status": "ok", "timestamp": datetime.utcnow().isoformat()})
+    return jsonify({
+        "status": "ok",
+        "scenario": SCENARIO,
+        "generation": current_snapshot[0],
+        "timestamp": datetime.utcnow().isoformat()
+    })
 
 # Initialize
-init_db()
+log_id = init_db()
 load_ticker_data()
-with data_lock:
-    trade_pairs = generate_trade_pairs(15)
-    last_sent_records = trade_pairs.copy()
-    last_update_time = time.time()
+sync_generation()
+# Another worker may hold the lease for the first batch; wait for it to land
+startup_deadline = time.time() + 30
+while current_snapshot[0] == 0 and time.time() < startup_deadline:
+    time.sleep(SNAPSHOT_POLL_SECONDS)
+    sync_generation()
+ensure_generation_worker()
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
@@ -0,0 +1,216 @@
+import csv
+import copy
+import itertools
+import os
+import random
+from collections import deque
+from datetime import datetime, timedelta
+from functools import lru_cache
+
+# Trade generation shared by the Flask service (app.py) and the benchmark
+# suite. Nothing here touches Flask or the SQLite state DB; trade IDs come
+# from the trade_id_factory passed to generate_trade_pairs.
+
+TICKERS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tickers.csv')
+
+ticker_data = []
+local_trade_ids = itertools.count(1)
+
+# Scenario profiles for benchmarking the agents under realistic contention.
+# ticker_skew / broker_skew are Zipf exponents over the tickers.csv order and
+# BKR001..BKR015 (0 = uniform), intraday_curve spreads trade timestamps over a
+# U-shaped session volume curve, duplicate_rate re-sends recently generated
+# pairs verbatim. 'uniform' is the original generator behaviour.
+BROKER_COUNT = 15
+SCENARIOS = {
+    'uniform': {
+        'ticker_skew': 0.0,
+        'broker_skew': 0.0,
+        'intraday_curve': False,
+        'duplicate_rate': 0.0,
+        'mismatch_rate': 0.3,
+    },
+    'hot_ticker': {
+        'ticker_skew': 1.1,
+        'broker_skew': 0.8,
+        'intraday_curve': True,
+        'duplicate_rate': 0.02,
+        'mismatch_rate': 0.3,
+    },
+    'extreme_skew': {
+        'ticker_skew': 2.0,
+        'broker_skew': 1.5,
+        'intraday_curve': True,
+        'duplicate_rate': 0.1,
+        'mismatch_rate': 0.3,
+    },
+}
+SCENARIO = os.environ.get('SCENARIO', 'uniform')
+
+# Trading session used by the intraday curve (09:30-16:00)
+SESSION_OPEN_MINUTE = 9 * 60 + 30
+SESSION_MINUTES = 390
+INTRADAY_PEAK_RATIO = 3.0  # open/close volume relative to midday
+
+# Recently generated pairs, the pool duplicates are drawn from
+recent_pairs = deque(maxlen=1000)
+
+def load_ticker_data(path=TICKERS_PATH):
+    """Load ticker and price data from the CSV file"""
+    global ticker_data
+    try:
+        with open(path, mode='r') as file:
+            csv_reader = csv.DictReader(file)
+            ticker_data = list(csv_reader)
+    except FileNotFoundError:
+        print("Error: tickers.csv not found.")
+        ticker_data = []
+
+def introduce_mismatch(buy_trade, sell_trade):
+    """Introduce a mismatch in one or more fields"""
+    mismatch_type = random.choice(['quantity', 'price', 'date', 'timestamp', 'multiple'])
+
+    if mismatch_type == 'quantity':
+        diff = random.randint(1, max(1, buy_trade['quantity'] // 20))
+        sell_trade['quantity'] = buy_trade['quantity'] + (diff if random.choice([True, False]) else -diff)
+
+    elif mismatch_type == 'price':
+        diff = buy_trade['price'] * random.uniform(0.001, 0.01)
+        sell_trade['price'] = round(buy_trade['price'] + (diff if random.choice([True, False]) else -diff), 2)
+
+    elif mismatch_type == 'date':
+        sell_trade['date'] = (datetime.strptime(buy_trade['date'], '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
+
+    elif mismatch_type == 'timestamp':
+        minutes_diff = random.randint(1, 30)
+        sell_trade['trade_timestamp'] = (datetime.strptime(buy_trade['trade_timestamp'], '%Y-%m-%d %H:%M:%S') + timedelta(minutes=minutes_diff)).strftime('%Y-%m-%d %H:%M:%S')
+
+    elif mismatch_type == 'multiple':
+        introduce_mismatch(buy_trade, sell_trade)
+        introduce_mismatch(buy_trade, sell_trade)
+
+    return buy_trade, sell_trade
+
+def get_scenario(name=None, **overrides):
+    """Resolve a scenario profile by name, applying any per-field overrides"""
+    name = name or SCENARIO
+    if name not in SCENARIOS:
+        raise ValueError(f"Unknown scenario '{name}', expected one of {sorted(SCENARIOS)}")
+    scenario = dict(SCENARIOS[name], name=name)
+    for key, value in overrides.items():
+        if key not in scenario:
+            raise ValueError(f"Unknown scenario setting '{key}'")
+        scenario[key] = value
+    return scenario
+
+@lru_cache(maxsize=None)
+def zipf_cum_weights(n, skew):
+    """Cumulative Zipf weights for ranks 1..n (skew 0 is uniform)"""
+    total = 0.0
+    cum_weights = []
+    for rank in range(1, n + 1):
+        total += 1.0 / rank ** skew
+        cum_weights.append(total)
+    return tuple(cum_weights)
+
+@lru_cache(maxsize=None)
+def intraday_cum_weights():
+    """Cumulative per-minute volume weights for a U-shaped trading session"""
+    half = SESSION_MINUTES / 2
+    total = 0.0
+    cum_weights = []
+    for minute in range(SESSION_MINUTES):
+        total += 1.0 + (INTRADAY_PEAK_RATIO - 1.0) * ((minute - half) / half) ** 2
+        cum_weights.append(total)
+    return tuple(cum_weights)
+
+def pick_ticker(scenario):
+    if not scenario['ticker_skew']:
+        return random.choice(ticker_data)
+    cum_weights = zipf_cum_weights(len(ticker_data), scenario['ticker_skew'])
+    return random.choices(ticker_data, cum_weights=cum_weights)[0]
+
+def pick_broker(scenario):
+    if not scenario['broker_skew']:
+        return f"BKR{random.randint(1, BROKER_COUNT):03d}"
+    cum_weights = zipf_cum_weights(BROKER_COUNT, scenario['broker_skew'])
+    rank = random.choices(range(1, BROKER_COUNT + 1), cum_weights=cum_weights)[0]
+    return f"BKR{rank:03d}"
+
+def pick_trade_time(scenario):
+    """Trade time: now, or a point in today's session drawn from the volume curve"""
+    now = datetime.now()
+    if not scenario['intraday_curve']:
+        return now
+    minute = random.choices(range(SESSION_MINUTES), cum_weights=intraday_cum_weights())[0]
+    session_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return session_start + timedelta(minutes=SESSION_OPEN_MINUTE + minute, seconds=random.randint(0, 59))
+
+def next_local_trade_id():
+    """Process-local trade IDs, for callers without the persistent counter"""
+    return f"tid{next(local_trade_ids):08d}"
+
+def generate_trade_pairs(count=15, scenario=None, trade_id_factory=next_local_trade_id):
+    """Generate pairs of buy/sell trades with controlled mismatches"""
+    global ticker_data
+    if not ticker_data:
+        load_ticker_data()
+    if scenario is None or isinstance(scenario, str):
+        scenario = get_scenario(scenario)
+    all_trades = []
+
+    mismatch_indices = set(random.sample(range(count), int(count * scenario['mismatch_rate'])))
+
+    for i in range(count):
+        # Re-send an earlier pair verbatim (same trade_id) to exercise dedup
+        if recent_pairs and random.random() < scenario['duplicate_rate']:
+            buy_trade, sell_trade = random.choice(recent_pairs)
+            all_trades.extend([dict(buy_trade), dict(sell_trade)])
+            continue
+
+        ticker_info = pick_ticker(scenario)
+        quantity = random.randint(1, 500) 
+        broker1 = pick_broker(scenario)
+        broker2 = pick_broker(scenario)
+        while broker2 == broker1:
+            broker2 = pick_broker(scenario)
+
+        trade_id = trade_id_factory()
+        now = pick_trade_time(scenario)
+        curr_date = now.strftime('%Y-%m-%d')
+        curr_timestamp = now.strftime('%Y-%m-%d %H:%M:%S')
+
+        buy_trade = {
+            'trade_id': trade_id,
+            'ticker': ticker_info['ticker'],
+            'broker_id': broker1,
+            'contra_broker_id': broker2,
+            'quantity': quantity,
+            'price': round(float(ticker_info['price']), 2),
+            'order_type': 'BUY',
+            'date': curr_date,
+            'trade_timestamp': curr_timestamp
+        }
+
+        sell_trade = {
+            'trade_id': trade_id,
+            'ticker': ticker_info['ticker'],
+            'broker_id': broker2,
+            'contra_broker_id': broker1,
+            'quantity': quantity,
+            'price': round(float(ticker_info['price']), 2),
+            'order_type': 'SELL',
+            'date': curr_date,
+            'trade_timestamp': curr_timestamp
+        }
+
+        # Introduce mismatch for mismatch_rate (30% by default) of trade pairs
+        if i in mismatch_indices:
+            buy_trade, sell_trade = introduce_mismatch(copy.deepcopy(buy_trade), copy.deepcopy(sell_trade))
+
+        all_trades.extend([buy_trade, sell_trade])
+        if scenario['duplicate_rate']:
+            recent_pairs.append((buy_trade, sell_trade))
+
+    random.shuffle(all_trades)
+    return all_trades
@@ -2,37 +2,76 @@ import json
 import requests
 import pymysql
 import logging
+import migrations
+from pymysql.pool import ConnectionPool
 
 # Configure logging
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
+API_URL = "https://trades-backend-8kxo.onrender.com/get_records"
+CURSOR_TABLE = "ingestion_cursor"
+MAX_PAGES_PER_RUN = 20
+
+def connect():
+    return pymysql.connect(
+        host='trades-market.cluster-cdya8kk4eoa1.us-west-2.rds.amazonaws.com',
+        user='admin',
+        password='DTCC2025',
+        database='trades_market',
+        connect_timeout=10
+    )
+
+# Reused across warm invocations
+connections = ConnectionPool(connect)
+
+def load_cursor(cursor, source):
+    """
+    Return (cursor, log id) of the delta feed stored for source, (0, None) if
+    never ingested. The table is created by migrations.py.
+    """
+    cursor.execute(f"SELECT last_seq, log_id FROM {CURSOR_TABLE} WHERE source = %s", (source,))
+    row = cursor.fetchone()
+    return (row[0], row[1]) if row else (0, None)
+
+def save_cursor(cursor, source, last_seq, log_id):
+    cursor.execute(f"""
+        INSERT INTO {CURSOR_TABLE} (source, last_seq, log_id) VALUES (%s, %s, %s)
+        ON DUPLICATE KEY UPDATE last_seq = VALUES(last_seq), log_id = VALUES(log_id)
+    """, (source, last_seq, log_id))
+
+def fetch_new_records(since, log_id):
+    """
+    Page through /get_records?since=<cursor> and return (records, next_cursor, log_id).
+    Only trades generated after `since` are transferred. If the feed reports
+    a different log id than the one `since` belongs to, the generator's log
+    was recreated and its seqs started over, so paging restarts from 0.
+    """
+    records = []
+    for _ in range(MAX_PAGES_PER_RUN):
+        response = requests.get(API_URL, params={'since': since}, timeout=10)
+        response.raise_for_status()
+        page = response.json()
+        if log_id is not None and page['log_id'] != log_id:
+            logger.warning(f"Trade log changed ({log_id} -> {page['log_id']}), restarting from cursor 0")
+            records, since, log_id = [], 0, page['log_id']
+            continue
+        log_id = page['log_id']
+        records.extend(page['records'])
+        since = page['cursor']
+        if not page['has_more']:
+            break
+    return records, since, log_id
+
 def create_and_insert_table(cursor, table_name, data):
     """
-    Create table if not exists and insert data into it.
+    Insert data into table_name (created by migrations.py).
     Ensures unique (trade_id, order_type) pairs.
     Returns the number of inserted and skipped records.
-    """
-    # Create table with unique constraint
-    cursor.execute(f"""
-        CREATE TABLE IF NOT EXISTS {table_name} (
-            id INT AUTO_INCREMENT PRIMARY KEY,
-            trade_id VARCHAR(100),
-            broker_id VARCHAR(100),
-            contra_broker_id VARCHAR(100),
-            ticker VARCHAR(50),
-            order_type VARCHAR(20),
-            quantity INT,
-            price DECIMAL(18, 4),
-            date DATE,
-            trade_timestamp DATETIME,
-            status VARCHAR(50) DEFAULT '',
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            UNIQUE KEY unique_trade_order (trade_id, order_type)
-        )
-    """)
-    logger.info(f"Table {table_name} created or already exists with unique (trade_id, order_type) constraint.")
 
+    A record that fails to insert raises: the caller advances the cursor in
+    the same transaction, so carrying on would skip that record for good.
+    """
     # Prepare insert query with IGNORE for duplicates
     insert_query = f"""
         INSERT IGNORE INTO {table_name} (
@@ -44,97 +83,93 @@ def create_and_insert_table(cursor, table_name, data):
     inserted_count = 0
     skipped_count = 0
     for record in data:
-        try:
-            result = cursor.execute(insert_query, (
-                record['trade_id'],
-                record['broker_id'],
-                record['contra_broker_id'],
-                record['ticker'],
-                record['order_type'],
-                int(record['quantity']),
-                float(record['price']),
-                record['date'],
-                record['trade_timestamp'],
-                ""  # status column default
-            ))
-            if result == 1:
-                inserted_count += 1
-            else:
-                skipped_count += 1
-                logger.info(f"Skipped duplicate: {record['trade_id']} - {record['order_type']}")
-        except Exception as e:
-            logger.warning(f"Failed to insert into {table_name} for trade_id {record.get('trade_id')}: {str(e)}")
+        result = cursor.execute(insert_query, (
+            record['trade_id'],
+            record['broker_id'],
+            record['contra_broker_id'],
+            record['ticker'],
+            record['order_type'],
+            int(record['quantity']),
+            float(record['price']),
+            record['date'],
+            record['trade_timestamp'],
+            ""  # status column default
+        ))
+        if result == 1:
+            inserted_count += 1
+        else:
+            skipped_count += 1
+            logger.info(f"Skipped duplicate: {record['trade_id']} - {record['order_type']}")
     return inserted_count, skipped_count
 
 def lambda_handler(event, context):
     """
     Lambda function that:
-    1. Fetches trade data from API
+    1. Fetches the trades generated since the stored cursor from the API
     2. Stores structured records in MySQL tables 'trades_data' and 'dtcc_data'
+    3. Advances the cursor in the same transaction
     Ensures unique (trade_id, order_type) pairs.
     """
-    # 1. Fetch data from API
-    api_url = "https://trades-backend-8kxo.onrender.com/get_records"
-    try:
-        logger.info("Fetching data from API...")
-        response = requests.get(api_url, timeout=10)
-        response.raise_for_status()
-        data = response.json()
-
-        logger.info(f"Successfully fetched {len(data)} records from API")
-        if not data:
-            return {
-                'statusCode': 200,
-                'body': json.dumps('No records received from API')
-            }
-
-        logger.info(f"First record keys: {list(data[0].keys())}")
-
-    except requests.exceptions.RequestException as e:
-        logger.error(f"API request failed: {str(e)}")
-        return {
-            'statusCode': 500,
-            'body': json.dumps(f'API request failed: {str(e)}')
-        }
-
-    # 2. Connect to RDS and insert structured records into both tables
     conn = None
     inserted_counts = {}
     skipped_counts = {}
     try:
+        # 1. Connect to RDS and read where the previous run stopped
         logger.info("Connecting to RDS database...")
-        conn = pymysql.connect(
-            host='trades-market.cluster-cdya8kk4eoa1.us-west-2.rds.amazonaws.com',
-            user='admin',
-            password='DTCC2025',
-            database='trades_market',
-            connect_timeout=10
-        )
+        conn = connections.acquire()
+        migrations.ensure_schema(conn)
 
         with conn.cursor() as cursor:
             logger.info("Database connection established")
+            since, log_id = load_cursor(cursor, API_URL)
+
+            # 2. Fetch only the trades generated since that cursor
+            try:
+                logger.info(f"Fetching records since cursor {since}...")
+                data, next_cursor, log_id = fetch_new_records(since, log_id)
+            except requests.exceptions.RequestException as e:
+                logger.error(f"API request failed: {str(e)}")
+                return {
+                    'statusCode': 500,
+                    'body': json.dumps(f'API request failed: {str(e)}')
+                }
+
+            logger.info(f"Successfully fetched {len(data)} new records from API (cursor {since} -> {next_cursor})")
+            if not data:
+                save_cursor(cursor, API_URL, next_cursor, log_id)
+                conn.commit()
+                return {
+                    'statusCode': 200,
+                    'body': json.dumps('No records received from API')
+                }
 
-            # Insert into both tables
+            logger.info(f"First record keys: {list(data[0].keys())}")
+
+            # 3. Insert into both tables and advance the cursor in one transaction
             for table_name in ["trades_data", "dtcc_data"]:
-                logger.info(f"Creating and inserting into {table_name}...")
+                logger.info(f"Inserting into {table_name}...")
                 inserted, skipped = create_and_insert_table(cursor, table_name, data)
                 inserted_counts[table_name] = inserted
                 skipped_counts[table_name] = skipped
                 logger.info(f"Inserted {inserted} records into {table_name}. Skipped {skipped} duplicates.")
 
+            save_cursor(cursor, API_URL, next_cursor, log_id)
             conn.commit()
             logger.info(f"Successfully inserted records into both tables.")
 
-    except pymysql.MySQLError as e:
-        logger.error(f"Database error: {str(e)}")
+    except (pymysql.MySQLError, KeyError, ValueError, TypeError) as e:
+        # Nothing of this batch is kept and the cursor stays put: the next run retries it
+        logger.error(f"Ingestion failed, rolling back: {str(e)}")
+        if conn and conn.open:
+            conn.rollback()
         return {
             'statusCode': 500,
             'body': json.dumps(f'Database operation failed: {str(e)}')
         }
     finally:
-        if conn and conn.open:
-            conn.close()
-            logger.info("Database connection closed")
+        if conn:
+            connections.release(conn)
+            logger.info("Database connection released")
 
     # Return result
     return {
@@ -145,6 +180,7 @@ def lambda_handler(event, context):
             'records_received': len(data),
             'records_stored': inserted_counts,
             'records_skipped': skipped_counts,
+            'cursor': next_cursor,
             'duplicate_handling': 'INSERT IGNORE with UNIQUE (trade_id, order_type)',
             'execution_time_ms': context.get_remaining_time_in_millis(),
             'first_record_keys': list(data[0].keys()) if data else None
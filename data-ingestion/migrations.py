@@ -0,0 +1,361 @@
+import argparse
+import logging
+import os
+import sys
+
+import pymysql
+
+# Versioned schema migrations for the trades database.
+#
+# Every agent filters trades_data by status, updates it by trade_id and reads
+# trade_log by trade_id and check_timestamp; without indexes on those columns
+# each of those is a full table scan. Migrations are applied in version order
+# and recorded in schema_migrations. MySQL commits DDL implicitly, so each
+# migration is written to be safe to re-run if it fails half way. This module
+# owns every table, including the maintenance agent's rollups; the agents
+# only read and write them.
+#
+# Runs three ways:
+#   - from the ingestion Lambda, once per container (ensure_schema)
+#   - as its own Lambda handler (migrations.lambda_handler), e.g. after a deploy
+#   - locally: python data-ingestion/migrations.py --db-user root --verify
+#
+# verify_indexes() runs EXPLAIN over the agents' access paths and reports
+# which index each one uses.
+
+logger = logging.getLogger()
+logger.setLevel(logging.INFO)
+
+MIGRATIONS_TABLE = "schema_migrations"
+# Named lock serialising migrate() across ingestion containers and deploys
+MIGRATIONS_LOCK = "schema_migrations"
+LOCK_TIMEOUT_SECONDS = 60
+
+TRADE_TABLE_DDL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        trade_id VARCHAR(100),
+        broker_id VARCHAR(100),
+        contra_broker_id VARCHAR(100),
+        ticker VARCHAR(50),
+        order_type VARCHAR(20),
+        quantity INT,
+        price DECIMAL(18, 4),
+        date DATE,
+        trade_timestamp DATETIME,
+        status VARCHAR(50) DEFAULT '',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        UNIQUE KEY unique_trade_order (trade_id, order_type)
+    )
+"""
+
+TRADE_LOG_DDL = """
+    CREATE TABLE IF NOT EXISTS trade_log (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        trade_id VARCHAR(100),
+        status VARCHAR(50),
+        errors TEXT,
+        check_timestamp DATETIME
+    )
+"""
+
+INGESTION_CURSOR_DDL = """
+    CREATE TABLE IF NOT EXISTS ingestion_cursor (
+        source VARCHAR(255) PRIMARY KEY,
+        last_seq BIGINT NOT NULL DEFAULT 0,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+"""
+
+# Per-day, per-status trade_log summary kept by the compaction job
+# (agents/maintenance-agent/src/lambda_function.py)
+TRADE_LOG_DAILY_DDL = """
+    CREATE TABLE IF NOT EXISTS trade_log_daily (
+        day DATE NOT NULL,
+        status VARCHAR(50) NOT NULL,
+        entries INT NOT NULL,
+        error_entries INT NOT NULL,
+        first_check DATETIME,
+        last_check DATETIME,
+        PRIMARY KEY (day, status)
+    )
+"""
+
+# Report rollup tables kept by agents/maintenance-agent/src/rollup.py
+TRADE_LOG_HOURLY_DDL = """
+    CREATE TABLE IF NOT EXISTS trade_log_hourly (
+        hour_start DATETIME NOT NULL,
+        status VARCHAR(50) NOT NULL,
+        error_key CHAR(40) NOT NULL,
+        errors TEXT,
+        entries INT NOT NULL,
+        unique_trades INT NOT NULL,
+        PRIMARY KEY (hour_start, status, error_key)
+    )
+"""
+
+TRADE_LOG_DAILY_TRADES_DDL = """
+    CREATE TABLE IF NOT EXISTS trade_log_daily_trades (
+        day DATE NOT NULL,
+        status VARCHAR(50) NOT NULL,
+        error_key CHAR(40) NOT NULL,
+        trade_id VARCHAR(100) NOT NULL,
+        PRIMARY KEY (day, status, error_key, trade_id),
+        KEY idx_status_error_day (status, error_key, day)
+    )
+"""
+
+TRADE_LOG_ERROR_TRADES_DDL = """
+    CREATE TABLE IF NOT EXISTS trade_log_error_trades (
+        status VARCHAR(50) NOT NULL,
+        error_key CHAR(40) NOT NULL,
+        day DATE NOT NULL,
+        trade_id VARCHAR(100) NOT NULL,
+        PRIMARY KEY (status, error_key, day, trade_id)
+    )
+"""
+
+ROLLUP_WATERMARK_DDL = """
+    CREATE TABLE IF NOT EXISTS rollup_watermark (
+        name VARCHAR(64) PRIMARY KEY,
+        rolled_up_to DATETIME NOT NULL,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+    )
+"""
+
+
+def index_exists(cursor, table, index):
+    cursor.execute("""
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        LIMIT 1
+    """, (table, index))
+    return cursor.fetchone() is not None
+
+
+def column_exists(cursor, table, column):
+    cursor.execute("""
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+        LIMIT 1
+    """, (table, column))
+    return cursor.fetchone() is not None
+
+
+def add_index(cursor, table, index, columns):
+    # MySQL has no CREATE INDEX IF NOT EXISTS
+    if index_exists(cursor, table, index):
+        logger.info(f"Index {table}.{index} already exists")
+        return
+    logger.info(f"Adding index {table}.{index} ({columns})")
+    cursor.execute(f"ALTER TABLE {table} ADD INDEX {index} ({columns})")
+
+
+def create_base_tables(cursor):
+    for table in ("trades_data", "dtcc_data"):
+        cursor.execute(TRADE_TABLE_DDL.format(table=table))
+    cursor.execute(TRADE_LOG_DDL)
+
+
+def add_status_indexes(cursor):
+    # Status scans (WHERE status = 'UMAT' ...) come back in insertion order
+    for table in ("trades_data", "dtcc_data"):
+        add_index(cursor, table, "idx_status_id", "status, id")
+
+
+def add_trade_log_indexes(cursor):
+    add_index(cursor, "trade_log", "idx_trade_id_checked", "trade_id, check_timestamp")
+    add_index(cursor, "trade_log", "idx_check_timestamp", "check_timestamp")
+
+
+def create_ingestion_cursor(cursor):
+    cursor.execute(INGESTION_CURSOR_DDL)
+
+
+def add_ingestion_log_id(cursor):
+    # The generator's log id; a different one means its seqs started over
+    if not column_exists(cursor, "ingestion_cursor", "log_id"):
+        cursor.execute("ALTER TABLE ingestion_cursor ADD COLUMN log_id BIGINT NULL AFTER last_seq")
+
+
+def create_trade_log_daily(cursor):
+    cursor.execute(TRADE_LOG_DAILY_DDL)
+
+
+def create_report_rollups(cursor):
+    cursor.execute(TRADE_LOG_HOURLY_DDL)
+    cursor.execute(TRADE_LOG_ERROR_TRADES_DDL)
+    cursor.execute(ROLLUP_WATERMARK_DDL)
+
+
+def add_daily_trades(cursor):
+    # Distinct trades per day, status and error replace trade_log_error_trades
+    # and the per-hour unique_trades, which can't be added up across hours
+    cursor.execute(TRADE_LOG_DAILY_TRADES_DDL)
+    cursor.execute("DROP TABLE IF EXISTS trade_log_error_trades")
+    for column in ("unique_trades", "affected_trades"):
+        if column_exists(cursor, "trade_log_hourly", column):
+            cursor.execute(f"ALTER TABLE trade_log_hourly DROP COLUMN {column}")
+
+
+MIGRATIONS = [
+    (1, "create trades_data, dtcc_data and trade_log", create_base_tables),
+    (2, "index trades_data/dtcc_data on (status, id)", add_status_indexes),
+    (3, "index trade_log on (trade_id, check_timestamp) and (check_timestamp)", add_trade_log_indexes),
+    (4, "create ingestion_cursor", create_ingestion_cursor),
+    (5, "create trade_log_daily", create_trade_log_daily),
+    (6, "create trade_log_hourly, trade_log_error_trades and rollup_watermark", create_report_rollups),
+    (7, "add ingestion_cursor.log_id", add_ingestion_log_id),
+    (8, "create trade_log_daily_trades, drop trade_log_error_trades and trade_log_hourly.unique_trades",
+     add_daily_trades),
+]
+
+# (description, query, expected index) for verify_indexes
+ACCESS_PATHS = [
+    ("verification status scan", "SELECT * FROM trades_data WHERE status = ''", "idx_status_id"),
+    ("matching status scan", "SELECT * FROM trades_data WHERE status = 'UMAT'", "idx_status_id"),
+    ("reconciliation status scan", "SELECT * FROM trades_data WHERE status = 'MTCH'", "idx_status_id"),
+    ("status update by trade_id", "UPDATE trades_data SET status = 'MTCH' WHERE trade_id = 'x'",
+     "unique_trade_order"),
+    ("dtcc lookup by trade_id", "SELECT * FROM dtcc_data WHERE trade_id = 'x'", "unique_trade_order"),
+    ("trade_log history of a trade",
+     "SELECT * FROM trade_log WHERE trade_id = 'x' ORDER BY check_timestamp", "idx_trade_id_checked"),
+    ("trade_log time window",
+     "SELECT * FROM trade_log WHERE check_timestamp >= NOW() - INTERVAL 1 HOUR", "idx_check_timestamp"),
+]
+
+# Below this many rows the optimizer may rightly prefer a table scan
+SMALL_TABLE_ROWS = 1000
+
+
+def applied_versions(cursor):
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {MIGRATIONS_TABLE} (
+            version INT PRIMARY KEY,
+            description VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute(f"SELECT version FROM {MIGRATIONS_TABLE}")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def pending_migrations(cursor, target):
+    done = applied_versions(cursor)
+    return [m for m in MIGRATIONS if m[0] not in done and (target is None or m[0] <= target)]
+
+
+def migrate(conn, target=None):
+    """Apply every pending migration up to `target` (default: all). Returns the versions applied.
+
+    Concurrent callers queue on the MIGRATIONS_LOCK named lock, and what is
+    pending is re-read once it is held, so each migration is applied once.
+    """
+    applied = []
+    with conn.cursor() as cursor:
+        if not pending_migrations(cursor, target):
+            conn.commit()
+            return applied
+
+        cursor.execute("SELECT GET_LOCK(%s, %s)", (MIGRATIONS_LOCK, LOCK_TIMEOUT_SECONDS))
+        if cursor.fetchone()[0] != 1:
+            raise RuntimeError(f"Timed out after {LOCK_TIMEOUT_SECONDS}s waiting for the {MIGRATIONS_LOCK} lock")
+        try:
+            # Start a fresh snapshot: another container may have applied them while we waited
+            conn.commit()
+            for version, description, apply in pending_migrations(cursor, target):
+                logger.info(f"Applying migration {version}: {description}")
+                apply(cursor)
+                cursor.execute(f"INSERT INTO {MIGRATIONS_TABLE} (version, description) VALUES (%s, %s)",
+                               (version, description))
+                conn.commit()
+                applied.append(version)
+        finally:
+            cursor.execute("SELECT RELEASE_LOCK(%s)", (MIGRATIONS_LOCK,))
+            cursor.fetchone()
+    return applied
+
+
+schema_ready = False
+
+
+def ensure_schema(conn):
+    """Migrate once per Lambda container."""
+    global schema_ready
+    if not schema_ready:
+        migrate(conn)
+        schema_ready = True
+
+
+def verify_indexes(conn):
+    """EXPLAIN each access path and return one result dict per path.
+
+    A path passes when the optimizer picks the expected index, or, for
+    tables under SMALL_TABLE_ROWS, at least considers it.
+    """
+    results = []
+    with conn.cursor(pymysql.cursors.DictCursor) as cursor:
+        for description, query, expected in ACCESS_PATHS:
+            cursor.execute("EXPLAIN " + query)
+            plan = cursor.fetchone()
+            possible = (plan.get("possible_keys") or "").split(",")
+            small_table = (plan.get("rows") or 0) < SMALL_TABLE_ROWS
+            results.append({
+                "access_path": description,
+                "expected_index": expected,
+                "key": plan.get("key"),
+                "type": plan.get("type"),
+                "rows": plan.get("rows"),
+                "ok": plan.get("key") == expected or (small_table and expected in possible),
+            })
+    return results
+
+
+def connect(host, port, user, password, database):
+    return pymysql.connect(host=host, port=port, user=user, password=password, database=database,
+                           autocommit=False)
+
+
+def lambda_handler(event, context):
+    conn = connect(os.environ["DB_HOST"], int(os.environ.get("DB_PORT", "3306")), os.environ["DB_USER"],
+                   os.environ["DB_PASSWORD"], os.environ["DB_NAME"])
+    try:
+        applied = migrate(conn, (event or {}).get("target"))
+        checks = verify_indexes(conn)
+        return {
+            "statusCode": 200 if all(c["ok"] for c in checks) else 500,
+            "body": {"applied": applied, "index_checks": checks}
+        }
+    finally:
+        conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Apply schema migrations to the trades database.")
+    parser.add_argument("--db-host", default=os.environ.get("DB_HOST", "127.0.0.1"))
+    parser.add_argument("--db-port", type=int, default=int(os.environ.get("DB_PORT", 3306)))
+    parser.add_argument("--db-user", default=os.environ.get("DB_USER", "root"))
+    parser.add_argument("--db-password", default=os.environ.get("DB_PASSWORD", ""))
+    parser.add_argument("--db-name", default=os.environ.get("DB_NAME", "trades_market"))
+    parser.add_argument("--target", type=int, help="stop after this migration version")
+    parser.add_argument("--verify", action="store_true", help="EXPLAIN the agents' queries afterwards")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format="%(message)s")
+    conn = connect(args.db_host, args.db_port, args.db_user, args.db_password, args.db_name)
+    try:
+        applied = migrate(conn, args.target)
+        print(f"Applied migrations: {applied or 'none pending'}")
+        if not args.verify:
+            return 0
+        checks = verify_indexes(conn)
+        for check in checks:
+            print(f"{'ok  ' if check['ok'] else 'FAIL'} {check['access_path']:<32} key={check['key']} "
+                  f"(expected {check['expected_index']}, type={check['type']}, rows={check['rows']})")
+        return 0 if all(check["ok"] for check in checks) else 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,368 @@
+"""
+Server-side prepared statements: parameter binding and binary protocol rows
+
+https://dev.mysql.com/doc/dev/mysql-server/latest/page_protocol_command_phase_ps.html
+"""
+
+import datetime
+import re
+import struct
+from decimal import Decimal
+
+from . import converters as _converters
+from . import err
+from .constants import FIELD_TYPE, FLAG
+
+
+DEBUG = False
+
+#: pyformat placeholders (as used with Cursor.execute) and escaped percent signs
+RE_PLACEHOLDER = re.compile(r"%\(([^)]*)\)s|%s|%%")
+
+UNSIGNED_PARAM = 0x80
+
+_INT_TYPES = {
+    FIELD_TYPE.TINY: ("<b", "<B", 1),
+    FIELD_TYPE.SHORT: ("<h", "<H", 2),
+    FIELD_TYPE.YEAR: ("<h", "<H", 2),
+    FIELD_TYPE.INT24: ("<i", "<I", 4),
+    FIELD_TYPE.LONG: ("<i", "<I", 4),
+    FIELD_TYPE.LONGLONG: ("<q", "<Q", 8),
+}
+_TEMPORAL_TYPES = (FIELD_TYPE.DATE, FIELD_TYPE.DATETIME, FIELD_TYPE.TIMESTAMP)
+
+
+def to_qmark(query):
+    """Translate a pyformat query into the server's ? placeholders.
+
+    Returns (sql, param_names); param_names is None for positional (%s)
+    placeholders and the list of names, in order, for %(name)s ones.
+    """
+    names = []
+    positional = False
+
+    def replace(match):
+        nonlocal positional
+        token = match.group(0)
+        if token == "%%":
+            return "%"
+        if token == "%s":
+            positional = True
+        else:
+            names.append(match.group(1))
+        return "?"
+
+    sql = RE_PLACEHOLDER.sub(replace, query)
+    if positional and names:
+        raise err.ProgrammingError("Can't mix %s and %(name)s placeholders")
+    return sql, (names or None)
+
+
+def _lenenc(data):
+    n = len(data)
+    if n < 251:
+        return bytes((n,)) + data
+    if n < 2**16:
+        return b"\xfc" + struct.pack("<H", n) + data
+    if n < 2**24:
+        return b"\xfd" + struct.pack("<I", n)[:3] + data
+    return b"\xfe" + struct.pack("<Q", n) + data
+
+
+def _encode_int(value):
+    if -(2**63) <= value < 2**63:
+        return FIELD_TYPE.LONGLONG, 0, struct.pack("<q", value)
+    if 0 <= value < 2**64:
+        return FIELD_TYPE.LONGLONG, UNSIGNED_PARAM, struct.pack("<Q", value)
+    return FIELD_TYPE.NEWDECIMAL, 0, _lenenc(str(value).encode("ascii"))
+
+
+def _encode_time(value, negative=False):
+    # value is a timedelta (magnitude only) or a time
+    if isinstance(value, datetime.timedelta):
+        days, seconds, micro = value.days, value.seconds, value.microseconds
+        hour, minute, second = seconds // 3600, seconds // 60 % 60, seconds % 60
+    else:
+        days, hour, minute, second = 0, value.hour, value.minute, value.second
+        micro = value.microsecond
+    if micro:
+        return struct.pack("<BBIBBBI", 12, negative, days, hour, minute, second, micro)
+    return struct.pack("<BBIBBB", 8, negative, days, hour, minute, second)
+
+
+def encode_param(value, encoding):
+    """Return (type, flags, bytes) for one COM_STMT_EXECUTE parameter."""
+    if isinstance(value, bool):
+        return FIELD_TYPE.TINY, 0, struct.pack("<b", value)
+    if isinstance(value, int):
+        return _encode_int(value)
+    if isinstance(value, float):
+        return FIELD_TYPE.DOUBLE, 0, struct.pack("<d", value)
+    if isinstance(value, str):
+        return (
+            FIELD_TYPE.VAR_STRING,
+            0,
+            _lenenc(value.encode(encoding, "surrogateescape")),
+        )
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return FIELD_TYPE.BLOB, 0, _lenenc(bytes(value))
+    if isinstance(value, Decimal):
+        return FIELD_TYPE.NEWDECIMAL, 0, _lenenc(format(value, "f").encode("ascii"))
+    if isinstance(value, datetime.datetime):
+        if value.microsecond:
+            data = struct.pack(
+                "<BHBBBBBI", 11, value.year, value.month, value.day,
+                value.hour, value.minute, value.second, value.microsecond,
+            )  # fmt: skip
+        else:
+            data = struct.pack(
+                "<BHBBBBB", 7, value.year, value.month, value.day,
+                value.hour, value.minute, value.second,
+            )  # fmt: skip
+        return FIELD_TYPE.DATETIME, 0, data
+    if isinstance(value, datetime.date):
+        return (
+            FIELD_TYPE.DATE,
+            0,
+            struct.pack("<BHBB", 4, value.year, value.month, value.day),
+        )
+    if isinstance(value, datetime.timedelta):
+        negative = value < datetime.timedelta(0)
+        return FIELD_TYPE.TIME, 0, _encode_time(-value if negative else value, negative)
+    if isinstance(value, datetime.time):
+        return FIELD_TYPE.TIME, 0, _encode_time(value)
+    return FIELD_TYPE.VAR_STRING, 0, _lenenc(str(value).encode(encoding))
+
+
+class PreparedStatement:
+    """A statement prepared on one connection (see Connection._prepare)."""
+
+    __slots__ = ("statement_id", "sql", "param_names", "param_count", "column_count")
+
+    def __init__(self, statement_id, sql, param_names, param_count, column_count):
+        self.statement_id = statement_id
+        self.sql = sql
+        self.param_names = param_names
+        self.param_count = param_count
+        self.column_count = column_count
+
+    def bind(self, args):
+        """Return the parameter values for `args`, in placeholder order."""
+        if self.param_names is not None:
+            if not isinstance(args, dict):
+                raise err.ProgrammingError("Named placeholders need a dict of args")
+            try:
+                return [args[name] for name in self.param_names]
+            except KeyError as e:
+                raise err.ProgrammingError(f"Missing value for %({e.args[0]})s")
+        if isinstance(args, dict):
+            values = [args] if self.param_count == 1 else list(args)
+        elif isinstance(args, (tuple, list)):
+            values = args
+        else:
+            values = (args,)
+        if len(values) != self.param_count:
+            raise err.ProgrammingError(
+                f"Statement takes {self.param_count} parameters, {len(values)} given"
+            )
+        return values
+
+    def execute_payload(self, args, encoding):
+        """COM_STMT_EXECUTE payload (after the command byte) binding `args`."""
+        values = self.bind(args)
+        payload = bytearray(struct.pack("<IBI", self.statement_id, 0, 1))
+        if not values:
+            return bytes(payload)
+
+        null_bitmap = bytearray((len(values) + 7) // 8)
+        types = bytearray()
+        data = bytearray()
+        for i, value in enumerate(values):
+            if value is None:
+                null_bitmap[i >> 3] |= 1 << (i & 7)
+                types += bytes((FIELD_TYPE.NULL, 0))
+                continue
+            type_code, flags, encoded = encode_param(value, encoding)
+            types += bytes((type_code, flags))
+            data += encoded
+        payload += null_bitmap
+        payload.append(1)  # new_params_bound_flag: types follow
+        payload += types
+        payload += data
+        return bytes(payload)
+
+
+def make_binary_row_decoder(fields, columns):
+    """Return decode_row(data, start, end) for this result set's binary protocol rows.
+
+    `columns` is MySQLResult.converters. Integer, float and temporal columns
+    are decoded from their binary form; with the default converters they
+    produce the same values as the text protocol, with custom ones the
+    converter gets the text protocol's string. Everything else is sent as a
+    length-encoded string and converted exactly like a text protocol column.
+    decode_row returns None for a packet that doesn't match the layout.
+    """
+    decoders = [
+        _column_decoder(field, encoding, converter)
+        for field, (encoding, converter) in zip(fields, columns)
+    ]
+    # Row packet: 0x00 header, NULL bitmap (bits offset by 2), then values
+    bitmap_size = (len(decoders) + 7 + 2) // 8
+
+    def decode_row(data, start, end):
+        if data[start] != 0:
+            return None  # not a binary protocol row packet
+        bitmap = data[start + 1 : start + 1 + bitmap_size]
+        p = start + 1 + bitmap_size
+        row = []
+        for i, decode in enumerate(decoders):
+            bit = i + 2
+            if bitmap[bit >> 3] & (1 << (bit & 7)):
+                row.append(None)
+            else:
+                value, p = decode(data, p)
+                row.append(value)
+        if p != end:
+            return None
+        return tuple(row)
+
+    return decode_row
+
+
+def _column_decoder(field, encoding, converter):
+    type_code = field.type_code
+    if type_code in _INT_TYPES:
+        signed, unsigned, size = _INT_TYPES[type_code]
+        unpack = struct.Struct(unsigned if field.flags & FLAG.UNSIGNED else signed).unpack_from
+        native = converter is int
+
+        def decode_int(data, p):
+            value = unpack(data, p)[0]
+            if not native:
+                value = _as_text(str(value), encoding, converter)
+            return value, p + size
+
+        return decode_int
+
+    if type_code == FIELD_TYPE.DOUBLE:
+        native = converter is float
+
+        def decode_double(data, p):
+            value = struct.unpack_from("<d", data, p)[0]
+            if not native:
+                value = _as_text(repr(value), encoding, converter)
+            return value, p + 8
+
+        return decode_double
+
+    if type_code == FIELD_TYPE.FLOAT:
+        native = converter is float
+
+        def decode_float(data, p):
+            value = _float32(data[p : p + 4])
+            if not native:
+                value = _as_text(repr(value), encoding, converter)
+            return value, p + 4
+
+        return decode_float
+
+    if type_code in _TEMPORAL_TYPES:
+        default = (
+            _converters.convert_date
+            if type_code == FIELD_TYPE.DATE
+            else _converters.convert_datetime
+        )
+
+        def decode_temporal(data, p):
+            length = data[p]
+            parts = struct.unpack_from("<HBBBBBI", data[p + 1 : p + 1 + length].ljust(11, b"\0"))
+            text = _temporal_text(type_code, parts)
+            if converter is default:
+                value = _temporal_value(type_code, parts, text)
+            else:
+                value = _as_text(text, encoding, converter)
+            return value, p + 1 + length
+
+        return decode_temporal
+
+    if type_code == FIELD_TYPE.TIME:
+
+        def decode_time(data, p):
+            length = data[p]
+            negative, days, hour, minute, second, micro = struct.unpack_from(
+                "<BIBBBI", data[p + 1 : p + 1 + length].ljust(12, b"\0")
+            )
+            if converter is _converters.convert_timedelta:
+                value = datetime.timedelta(
+                    days=days, hours=hour, minutes=minute, seconds=second,
+                    microseconds=micro,
+                )  # fmt: skip
+                value = -value if negative else value
+            else:
+                hours = days * 24 + hour
+                text = f"{'-' if negative else ''}{hours:02d}:{minute:02d}:{second:02d}"
+                if micro:
+                    text += f".{micro:06d}"
+                value = _as_text(text, encoding, converter)
+            return value, p + 1 + length
+
+        return decode_time
+
+    def decode_string(data, p):
+        length = data[p]
+        if length < 251:
+            p += 1
+        elif length == 252:
+            length = struct.unpack_from("<H", data, p + 1)[0]
+            p += 3
+        elif length == 253:
+            length = struct.unpack_from("<I", data[p + 1 : p + 4] + b"\0")[0]
+            p += 4
+        else:
+            length = struct.unpack_from("<Q", data, p + 1)[0]
+            p += 9
+        value = data[p : p + length]
+        if encoding is not None:
+            value = value.decode(encoding)
+        if converter is not None:
+            value = converter(value)
+        return value, p + length
+
+    return decode_string
+
+
+def _float32(raw):
+    # The shortest decimal that round-trips to the same FLOAT, which is what
+    # the server prints in the text protocol (1.1, not 1.100000023841858)
+    value = struct.unpack("<f", raw)[0]
+    for digits in range(6, 10):
+        candidate = float(f"{value:.{digits}g}")
+        if struct.pack("<f", candidate) == raw:
+            return candidate
+    return value
+
+
+def _as_text(text, encoding, converter):
+    # What the text protocol would have produced for this value
+    value = text if encoding is not None else text.encode("ascii")
+    return converter(value) if converter is not None else value
+
+
+def _temporal_text(type_code, parts):
+    year, month, day, hour, minute, second, micro = parts
+    text = f"{year:04d}-{month:02d}-{day:02d}"
+    if type_code != FIELD_TYPE.DATE:
+        text += f" {hour:02d}:{minute:02d}:{second:02d}"
+        if micro:
+            text += f".{micro:06d}"
+    return text
+
+
+def _temporal_value(type_code, parts, text):
+    # Invalid and zero dates come back as strings, as with the text protocol
+    try:
+        if type_code == FIELD_TYPE.DATE:
+            return datetime.date(*parts[:3])
+        return datetime.datetime(*parts)
+    except ValueError:
+        return text
@@ -0,0 +1,444 @@
+"""
+asyncio connection and cursor
+
+    conn = await pymysql.aio.connect(host=..., user=..., database=...)
+    async with conn.cursor() as cur:
+        await cur.execute("SELECT id, status FROM trades_data WHERE status = %s", ("MTCH",))
+        async for row in cur:
+            ...
+    await conn.close()
+
+An AsyncConnection wraps an ordinary Connection, which it uses as its
+protocol engine: commands are built by the Connection, sent through an
+asyncio StreamWriter, and each response is read from the StreamReader into
+the Connection's receive buffer until it is complete (an OK or error packet,
+or a result set through its closing EOF). The Connection then parses it
+from the buffer without blocking, so results decode exactly as they do on
+a blocking connection, with the same packet classes and row parsers.
+
+The handshake and authentication (every plugin in _auth.py, SET NAMES,
+init_command, ...) also run on the Connection, in a worker thread that
+reads from and writes to the streams through the event loop.
+
+A connection runs one command at a time; use one connection per task for
+concurrent queries. Not supported: SSL, the compressed protocol, LOAD DATA
+LOCAL INFILE, unbuffered cursors and prepared statements.
+"""
+
+import asyncio
+
+from . import err
+from .connections import MAX_PACKET_LEN, Connection
+from .constants import COMMAND, CR
+from .cursors import Cursor, DictCursorMixin
+
+
+async def connect(**kwargs):
+    """Open an AsyncConnection; takes the same arguments as pymysql.connect()."""
+    conn = AsyncConnection(**kwargs)
+    await conn.connect()
+    return conn
+
+
+class _StreamSocket:
+    """Stands in for the Connection's socket.
+
+    While the blocking handshake runs in a worker thread, reads and writes
+    are handed to the event loop. Afterwards writes go straight into the
+    StreamWriter's buffer (AsyncConnection drains it), and the Connection
+    must never need to read: AsyncConnection buffers every response first.
+    """
+
+    def __init__(self, reader, writer, loop):
+        self.reader = reader
+        self.writer = writer
+        self.loop = loop
+        self.threaded = False
+
+    def settimeout(self, timeout):
+        pass
+
+    def sendall(self, data):
+        if self.threaded:
+            self.loop.call_soon_threadsafe(self.writer.write, bytes(data))
+        else:
+            self.writer.write(data)
+
+    def recv_into(self, view):
+        if not self.threaded:
+            raise err.InternalError("Blocking read on an AsyncConnection")
+        data = asyncio.run_coroutine_threadsafe(
+            self.reader.read(len(view)), self.loop
+        ).result()
+        view[: len(data)] = data
+        return len(data)
+
+    def close(self):
+        try:
+            if self.threaded:
+                self.loop.call_soon_threadsafe(self.writer.close)
+            else:
+                self.writer.close()
+        except Exception:
+            pass
+
+
+class AsyncConnection:
+    """
+    asyncio counterpart of Connection; see the module docstring.
+
+    Takes the same arguments as Connection (`defer_connect` is implied:
+    await connect() to open it). Methods that talk to the server are
+    coroutines; escaping and the state accessors are plain methods.
+    """
+
+    def __init__(self, **kwargs):
+        # The Connection keeps its own cursorclass: it runs init_command with it
+        self.cursorclass = kwargs.pop("cursorclass", None) or AsyncCursor
+        kwargs["defer_connect"] = True
+        self._conn = Connection(**kwargs)
+        self._writer = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self.open:
+            await self.close()
+
+    @property
+    def open(self):
+        return self._conn.open
+
+    @property
+    def encoding(self):
+        return self._conn.encoding
+
+    @property
+    def encoders(self):
+        return self._conn.encoders
+
+    @property
+    def server_status(self):
+        return self._conn.server_status
+
+    @property
+    def _result(self):
+        return self._conn._result
+
+    def escape(self, obj, mapping=None):
+        return self._conn.escape(obj, mapping)
+
+    def literal(self, obj):
+        return self._conn.literal(obj)
+
+    def escape_string(self, s):
+        return self._conn.escape_string(s)
+
+    def get_autocommit(self):
+        return self._conn.get_autocommit()
+
+    def insert_id(self):
+        return self._conn.insert_id()
+
+    def affected_rows(self):
+        return self._conn.affected_rows()
+
+    def thread_id(self):
+        return self._conn.thread_id()
+
+    def get_server_info(self):
+        return self._conn.get_server_info()
+
+    def cursor(self, cursor=None):
+        """Create a new AsyncCursor (or an instance of `cursor`)."""
+        if cursor:
+            return cursor(self)
+        return self.cursorclass(self)
+
+    async def connect(self):
+        conn = self._conn
+        if conn.ssl:
+            raise err.NotSupportedError("SSL is not supported by AsyncConnection")
+        if conn.compress:
+            raise err.NotSupportedError(
+                "compress is not supported by AsyncConnection"
+            )
+        loop = asyncio.get_running_loop()
+        try:
+            if conn.unix_socket:
+                opening = asyncio.open_unix_connection(conn.unix_socket)
+            else:
+                opening = asyncio.open_connection(
+                    conn.host,
+                    conn.port,
+                    local_addr=(conn.bind_address, 0) if conn.bind_address else None,
+                )
+            reader, writer = await asyncio.wait_for(opening, conn.connect_timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            raise err.OperationalError(
+                CR.CR_CONN_HOST_ERROR,
+                f"Can't connect to MySQL server on {conn.host!r} ({e!r})",
+            )
+
+        sock = _StreamSocket(reader, writer, loop)
+        sock.threaded = True
+        try:
+            await loop.run_in_executor(None, conn.connect, sock)
+        finally:
+            sock.threaded = False
+        if conn.unix_socket:
+            conn.host_info = "Localhost via UNIX socket"
+        else:
+            conn.host_info = "socket %s:%d" % (conn.host, conn.port)
+        self._writer = writer
+
+    async def close(self):
+        """Send the quit message and close the connection."""
+        conn = self._conn
+        writer = self._writer
+        conn.close()
+        if writer is not None:
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def query(self, sql):
+        if isinstance(sql, str):
+            sql = sql.encode(self._conn.encoding, "surrogateescape")
+        await self._command(COMMAND.COM_QUERY, sql)
+        return await self._read_query_result()
+
+    async def next_result(self):
+        return await self._read_query_result()
+
+    async def begin(self):
+        await self._simple_command(COMMAND.COM_QUERY, "BEGIN")
+
+    async def commit(self):
+        await self._simple_command(COMMAND.COM_QUERY, "COMMIT")
+
+    async def rollback(self):
+        await self._simple_command(COMMAND.COM_QUERY, "ROLLBACK")
+
+    async def select_db(self, db):
+        await self._simple_command(COMMAND.COM_INIT_DB, db)
+
+    async def autocommit(self, value):
+        conn = self._conn
+        conn.autocommit_mode = bool(value)
+        if conn.autocommit_mode != conn.get_autocommit():
+            await self._simple_command(
+                COMMAND.COM_QUERY,
+                "SET AUTOCOMMIT = %s" % conn.escape(conn.autocommit_mode),
+            )
+
+    async def ping(self, reconnect=True):
+        """Check if the server is alive, reconnecting if it isn't and `reconnect` is set."""
+        if self._conn._sock is None:
+            if not reconnect:
+                raise err.Error("Already closed")
+            await self.connect()
+            reconnect = False
+        try:
+            await self._simple_command(COMMAND.COM_PING, b"")
+        except Exception:
+            if not reconnect:
+                raise
+            self._conn._force_close()
+            await self.connect()
+            await self.ping(False)
+
+    async def _simple_command(self, command, payload):
+        await self._command(command, payload)
+        await self._buffer_response()
+        self._conn._read_ok_packet()
+
+    async def _command(self, command, payload):
+        conn = self._conn
+        if conn._sock is None:
+            raise err.InterfaceError(0, "")
+        # The Connection would read any remaining results itself; do it here
+        while conn._result is not None and conn._result.has_next:
+            await self.next_result()
+        conn._execute_command(command, payload)
+        try:
+            await self._writer.drain()
+        except OSError as e:
+            conn._force_close()
+            raise err.OperationalError(
+                CR.CR_SERVER_GONE_ERROR, f"MySQL server has gone away ({e!r})"
+            )
+
+    async def _read_query_result(self):
+        conn = self._conn
+        await self._buffer_response()
+        conn._affected_rows = conn._read_query_result()
+        return conn._affected_rows
+
+    async def _buffer_response(self):
+        """Read until the receive buffer holds one complete response."""
+        first, length, offset = await self._scan_packet(0)
+        if first == 0xFF or (first == 0 and length >= 7):
+            return  # error or OK packet
+        if first == 0xFB:
+            self._conn._force_close()
+            raise err.NotSupportedError(
+                "LOAD DATA LOCAL INFILE is not supported by AsyncConnection"
+            )
+        # A result set: column definitions, EOF, rows, then EOF or an error
+        for rows in (False, True):
+            while True:
+                first, length, offset = await self._scan_packet(offset)
+                if first == 0xFE and length < 9:
+                    break
+                if rows and first == 0xFF:
+                    return
+
+    async def _scan_packet(self, offset):
+        """Buffer the packet `offset` bytes past _recv_pos (with its
+        continuation packets, if any) and return (first payload byte,
+        payload length, offset of the next packet)."""
+        conn = self._conn
+        first = None
+        total = 0
+        while True:
+            await self._fill(offset + 4)
+            start = conn._recv_pos + offset
+            length = int.from_bytes(conn._recv_buffer[start : start + 3], "little")
+            await self._fill(offset + 4 + length)
+            if first is None and length:
+                first = conn._recv_buffer[conn._recv_pos + offset + 4]
+            offset += 4 + length
+            total += length
+            if length < MAX_PACKET_LEN:
+                return first, total, offset
+
+    async def _fill(self, size):
+        """Read from the stream until `size` unread bytes are buffered."""
+        conn = self._conn
+        if conn._recv_end - conn._recv_pos >= size:
+            return
+        conn._reserve(size)
+        reader = conn._sock.reader
+        while conn._recv_end - conn._recv_pos < size:
+            free = len(conn._recv_buffer) - conn._recv_end
+            try:
+                data = await asyncio.wait_for(reader.read(free), conn._read_timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                conn._force_close()
+                raise err.OperationalError(
+                    CR.CR_SERVER_LOST,
+                    f"Lost connection to MySQL server during query ({e!r})",
+                )
+            if not data:
+                conn._force_close()
+                raise err.OperationalError(
+                    CR.CR_SERVER_LOST, "Lost connection to MySQL server during query"
+                )
+            conn._recv_view[conn._recv_end : conn._recv_end + len(data)] = data
+            conn._recv_end += len(data)
+
+
+class AsyncCursor(Cursor):
+    """
+    Buffered cursor for AsyncConnection.
+
+    execute(), executemany(), nextset(), close() and the fetch methods are
+    coroutines; rows can also be read with ``async for``.
+    """
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        row = super().fetchone()
+        if row is None:
+            raise StopAsyncIteration
+        return row
+
+    def __iter__(self):
+        raise TypeError("Use 'async for' to iterate over an AsyncCursor")
+
+    async def close(self):
+        """Read any remaining results and detach the cursor."""
+        if self.connection is None:
+            return
+        try:
+            while await self.nextset():
+                pass
+        finally:
+            self.connection = None
+
+    async def execute(self, query, args=None):
+        """Execute a query; see Cursor.execute()."""
+        while await self.nextset():
+            pass
+
+        query = self.mogrify(query, args)
+
+        result = await self._query(query)
+        self._executed = query
+        return result
+
+    async def executemany(self, query, args):
+        """Run a query against each of args; see Cursor.executemany()."""
+        if not args:
+            return
+
+        statements = self._bulk_insert_statements(query, args)
+        rows = 0
+        if statements is not None:
+            for sql in statements:
+                rows += await self.execute(sql)
+        else:
+            for arg in args:
+                rows += await self.execute(query, arg)
+        self.rowcount = rows
+        return rows
+
+    async def callproc(self, procname, args=()):
+        raise err.NotSupportedError("callproc is not supported by AsyncCursor")
+
+    async def execute_batch(self, statements):
+        raise err.NotSupportedError("execute_batch is not supported by AsyncCursor")
+
+    async def nextset(self):
+        conn = self._get_db()
+        current_result = self._result
+        if current_result is None or current_result is not conn._result:
+            return None
+        if not current_result.has_next:
+            return None
+        self._result = None
+        self._clear_result()
+        await conn.next_result()
+        self._do_get_result()
+        return True
+
+    async def fetchone(self):
+        return super().fetchone()
+
+    async def fetchmany(self, size=None):
+        return super().fetchmany(size)
+
+    async def fetchall(self):
+        return super().fetchall()
+
+    async def _query(self, q):
+        conn = self._get_db()
+        self._clear_result()
+        await conn.query(q)
+        self._do_get_result()
+        return self.rowcount
+
+
+class AsyncDictCursor(DictCursorMixin, AsyncCursor):
+    """An AsyncCursor which returns results as a dictionary"""
@@ -0,0 +1,36 @@
+import os
+import sys
+
+import pytest
+
+# Runs against a real MySQL database, e.g. a local one:
+#   DB_HOST=127.0.0.1 DB_USER=root DB_NAME=trades_market python -m pytest data-ingestion/tests
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import migrations  # noqa: E402
+
+pytestmark = pytest.mark.skipif(not os.environ.get("DB_HOST"), reason="DB_HOST is not set")
+
+
+@pytest.fixture
+def conn():
+    conn = migrations.connect(os.environ["DB_HOST"], int(os.environ.get("DB_PORT", "3306")),
+                              os.environ.get("DB_USER", "root"), os.environ.get("DB_PASSWORD", ""),
+                              os.environ.get("DB_NAME", "trades_market"))
+    yield conn
+    conn.close()
+
+
+def test_migrate_applies_every_version(conn):
+    migrations.migrate(conn)
+    with conn.cursor() as cursor:
+        assert migrations.applied_versions(cursor) >= {version for version, _, _ in migrations.MIGRATIONS}
+    assert migrations.migrate(conn) == []
+
+
+@pytest.mark.parametrize("path", migrations.ACCESS_PATHS, ids=[path[0] for path in migrations.ACCESS_PATHS])
+def test_access_path_uses_its_index(conn, path):
+    migrations.migrate(conn)
+    description, _, expected = path
+    check = next(c for c in migrations.verify_indexes(conn) if c["access_path"] == description)
+    assert check["ok"], f"{description}: key={check['key']}, expected {expected}"
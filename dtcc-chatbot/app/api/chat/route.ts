@@ -158,7 +158,10 @@ async function generateReport(reportType: string) {
   try {
     connection = await mysql.createConnection(dbConfig);
     
-    let dateFilter = '';
+    // Start of the report window; entry counts come from the trade_log_hourly
+    // rollup (agents/maintenance-agent/src/rollup.py), distinct and affected
+    // trades from trade_log_daily_trades, only the CSV rows from trade_log
+    let windowStart = '';
     let reportTitle = '';
     
     const now = new Date();
@@ -166,62 +169,84 @@ async function generateReport(reportType: string) {
     switch (reportType.toLowerCase()) {
       case 'daily':
       case 'today':
-        dateFilter = 'DATE(check_timestamp) = CURDATE()';
+        windowStart = 'CURDATE()';
         reportTitle = `Daily Trade Processing Report - ${now.toDateString()}`;
         break;
       case 'weekly':
-        dateFilter = 'check_timestamp >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)';
+        windowStart = 'DATE_SUB(CURDATE(), INTERVAL 7 DAY)';
         reportTitle = `Weekly Trade Processing Report - Last 7 Days`;
         break;
       case 'monthly':
-        dateFilter = 'check_timestamp >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)';
+        windowStart = 'DATE_SUB(CURDATE(), INTERVAL 30 DAY)';
         reportTitle = `Monthly Trade Processing Report - Last 30 Days`;
         break;
       default:
-        dateFilter = 'DATE(check_timestamp) = CURDATE()';
+        windowStart = 'CURDATE()';
         reportTitle = `Trade Processing Report - ${now.toDateString()}`;
     }
     
     // Get summary statistics
     const [statusSummary] = await connection.execute(`
       SELECT 
-        status,
-        COUNT(*) as total_count,
-        COUNT(DISTINCT trade_id) as unique_trades
-      FROM trade_log 
-      WHERE ${dateFilter}
-      GROUP BY status 
-      ORDER BY total_count DESC
+        h.status,
+        h.total_count,
+        COALESCE(u.unique_trades, 0) as unique_trades
+      FROM (
+        SELECT status, CAST(SUM(entries) AS UNSIGNED) as total_count
+        FROM trade_log_hourly 
+        WHERE hour_start >= ${windowStart}
+        GROUP BY status
+      ) h
+      LEFT JOIN (
+        SELECT status, COUNT(DISTINCT trade_id) as unique_trades
+        FROM trade_log_daily_trades 
+        WHERE day >= ${windowStart}
+        GROUP BY status
+      ) u ON u.status = h.status
+      ORDER BY h.total_count DESC
     `);
     
-    // Get error details
+    // Get error details, each affected trade listed once across the window
     const [errorDetails] = await connection.execute(`
       SELECT 
-        status,
-        errors,
-        COUNT(*) as error_count,
-        GROUP_CONCAT(DISTINCT trade_id SEPARATOR ', ') as affected_trades
-      FROM trade_log 
-      WHERE ${dateFilter} AND status IN ('ERR1', 'ERR2', 'ERR3')
-      GROUP BY status, errors
-      ORDER BY error_count DESC
-      LIMIT 20
+        e.status,
+        e.errors,
+        e.error_count,
+        GROUP_CONCAT(DISTINCT t.trade_id ORDER BY t.trade_id SEPARATOR ', ') as affected_trades
+      FROM (
+        SELECT 
+          status,
+          error_key,
+          MIN(errors) as errors,
+          CAST(SUM(entries) AS UNSIGNED) as error_count
+        FROM trade_log_hourly 
+        WHERE hour_start >= ${windowStart} AND status IN ('ERR1', 'ERR2', 'ERR3')
+        GROUP BY status, error_key
+        ORDER BY error_count DESC
+        LIMIT 20
+      ) e
+      LEFT JOIN trade_log_daily_trades t
+        ON t.status = e.status AND t.error_key = e.error_key AND t.day >= ${windowStart}
+      GROUP BY e.status, e.error_key, e.errors, e.error_count
+      ORDER BY e.error_count DESC
     `);
     
     // Get processing timeline
     const [timelineData] = await connection.execute(`
       SELECT 
-        DATE(check_timestamp) as processing_date,
-        HOUR(check_timestamp) as processing_hour,
+        DATE(hour_start) as processing_date,
+        HOUR(hour_start) as processing_hour,
         status,
-        COUNT(*) as count
-      FROM trade_log 
-      WHERE ${dateFilter}
-      GROUP BY DATE(check_timestamp), HOUR(check_timestamp), status
-      ORDER BY processing_date DESC, processing_hour DESC
+        CAST(SUM(entries) AS UNSIGNED) as count
+      FROM trade_log_hourly 
+      WHERE hour_start >= ${windowStart}
+      GROUP BY hour_start, status
+      ORDER BY hour_start DESC
     `);
     
-    // Get detailed trade data for CSV
+    // Get detailed trade data for CSV. These are raw trade_log rows, so they
+    // only reach back as far as the nightly compaction's retention
+    // (RETENTION_DAYS, 30 by default); older entries are in the cold archive.
     const [detailedData] = await connection.execute(`
       SELECT 
         trade_id,
@@ -230,7 +255,7 @@ async function generateReport(reportType: string) {
         check_timestamp,
         id
       FROM trade_log 
-      WHERE ${dateFilter}
+      WHERE check_timestamp >= ${windowStart}
       ORDER BY check_timestamp DESC
     `);
     
@@ -472,7 +497,8 @@ function formatReportSummary(reportData: any): string {
   
   // Add download section
   report += `## 📥 Download Options\n\n`;
-  report += `**CSV Report Available**: ${detailedData.length.toLocaleString()} records ready for download\n\n`;
+  report += `**CSV Report Available**: ${detailedData.length.toLocaleString()} records ready for download`;
+  report += ` (entries older than the 30-day trade_log retention are archived and not included)\n\n`;
   report += `\`\`\`csv\n`;
   report += csvContent.split('\n').slice(0, 6).join('\n'); // Show first 5 rows + header as preview
   if (detailedData.length > 5) {
@@ -514,19 +540,19 @@ async function generateStatusSummary(): Promise<string> {
     connection = await mysql.createConnection(dbConfig);
     
     const [statusCounts] = await connection.execute(`
-      SELECT status, COUNT(*) as count 
-      FROM trade_log 
-      WHERE DATE(check_timestamp) = CURDATE() 
+      SELECT status, CAST(SUM(entries) AS UNSIGNED) as count 
+      FROM trade_log_hourly 
+      WHERE hour_start >= CURDATE() 
       GROUP BY status 
       ORDER BY count DESC
     `);
     
     const [errorBreakdown] = await connection.execute(`
-      SELECT status, errors, COUNT(*) as count
-      FROM trade_log 
+      SELECT status, MIN(errors) as errors, CAST(SUM(entries) AS UNSIGNED) as count
+      FROM trade_log_hourly 
       WHERE status IN ('ERR1', 'ERR2', 'ERR3') 
-      AND DATE(check_timestamp) = CURDATE()
-      GROUP BY status, errors
+      AND hour_start >= CURDATE()
+      GROUP BY status, error_key
       ORDER BY count DESC
       LIMIT 10
     `);
@@ -32,11 +32,12 @@ async function generateReport(reportType: string) {
   try {
     connection = await mysql.createConnection(dbConfig);
 
+    // Raw rows for the CSV export; range predicates so idx_check_timestamp applies
     let dateFilter = '';
     switch (reportType.toLowerCase()) {
       case 'daily':
       case 'today':
-        dateFilter = 'DATE(check_timestamp) = CURDATE()';
+        dateFilter = 'check_timestamp >= CURDATE()';
         break;
       case 'weekly':
         dateFilter = 'check_timestamp >= DATE_SUB(CURDATE(), INTERVAL 7 DAY)';
@@ -45,7 +46,7 @@ async function generateReport(reportType: string) {
         dateFilter = 'check_timestamp >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)';
         break;
       default:
-        dateFilter = 'DATE(check_timestamp) = CURDATE()';
+        dateFilter = 'check_timestamp >= CURDATE()';
     }
 
     const [detailedData] = await connection.execute(`